@@ -0,0 +1,57 @@
+"""
+This script tests local narration time-fitting.
+
+The first part runs offline on a synthetic "narration" (a tone surrounded by
+silence) and prints how it is trimmed, time-stretched and padded for several
+target lengths, together with the processing time. The second part fits a real
+narration stored in GCS; set AUDIO_FIT_TEST_URI to an MP3 from the text to
+speech tool to run it.
+"""
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from video_producer_agent.audio_fit import fit_narration_to_duration, fit_samples
+
+load_dotenv()
+
+
+def run_offline_fit_example():
+    """
+    Fits a 3 second tone with 0.8s of leading and 1s of trailing silence to several targets.
+    """
+    print("--- Offline fit of a synthetic narration ---")
+    sample_rate = 24000
+    t = np.arange(int(sample_rate * 3.0)) / sample_rate
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    samples = np.concatenate([
+        np.zeros(int(sample_rate * 0.8), dtype=np.float32),
+        tone,
+        np.zeros(int(sample_rate * 1.0), dtype=np.float32),
+    ])
+
+    for target in (2.5, 4.0, 6.0, 8.0):
+        started = time.perf_counter()
+        _, report = fit_samples(samples, sample_rate, target)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"target {target:4.1f}s -> {report} ({elapsed_ms:.1f} ms)")
+
+
+def run_gcs_fit_example():
+    """
+    Fits a narration stored in GCS to a 6 second scene.
+    """
+    audio_uri = os.getenv("AUDIO_FIT_TEST_URI")
+    if not audio_uri:
+        print("\nSKIPPING GCS FIT: AUDIO_FIT_TEST_URI environment variable is not set.")
+        return
+    print(f"\n--- Fitting {audio_uri} to 6 seconds ---")
+    print(fit_narration_to_duration(audio_uri, 6.0))
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_offline_fit_example()
+    run_gcs_fit_example()
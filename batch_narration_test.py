@@ -0,0 +1,51 @@
+"""
+This script tests batch narration synthesis.
+
+It calls `synthesize_narrations` from the `video_producer_agent` with the narration
+for several scenes at once and prints every audio URI with its measured duration,
+along with the wall-clock time of the whole batch (which should be close to the
+slowest single scene rather than the sum of all of them).
+Requires GOOGLE_CLOUD_BUCKET to be set.
+"""
+import asyncio
+import pprint
+from dotenv import load_dotenv
+
+from video_producer_agent.batch_narration import synthesize_narrations
+from video_producer_agent.tools import gcs_uri_to_public_url
+
+load_dotenv()
+
+SCENE_NARRATIONS = [
+    "Some friendships... start with a single look.",
+    "Every morning, a new adventure. Every evening, a warm welcome home.",
+    "Through rain, through snow - always by your side.",
+    "Find your new best friend today. Visit your local shelter.",
+]
+
+
+async def run_batch_narration_example():
+    """
+    Synthesizes four scene narrations in one call with a single voice.
+    """
+    print("\n--- Starting Batch Narration Example ---")
+
+    result = await synthesize_narrations(
+        texts=SCENE_NARRATIONS,
+        voice_categories=["chirp_female_leda"],
+        speaking_rates=[1.0],
+    )
+
+    if isinstance(result, str):
+        print(f"Tool returned an error: {result}")
+        return
+
+    pprint.pprint(result, indent=1)
+    for narration in result["narrations"]:
+        if "uri" in narration:
+            print(f"Scene {narration['index'] + 1} ({narration['duration']}s): {gcs_uri_to_public_url(narration['uri'])}")
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_batch_narration_example())
@@ -0,0 +1,91 @@
+"""
+This script tests headless batch production from a JSONL file.
+
+It first writes a small JSONL file mixing a structured plan, a brief and a
+request in the requests.jsonl format, prints how each line is read, and shows
+the summary (throughput and median stage times) of a set of recorded results
+offline. It then produces two short commercials with run_batch, two at a time,
+and prints the manifest and the commercials-per-hour throughput. Requires
+GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_BUCKET, Veo, Lyria and the Transcoder API
+for the second part.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from dotenv import load_dotenv
+
+from video_producer_agent.batch import load_briefs, run_batch, summarize
+
+load_dotenv()
+
+PLANS = [
+    {"id": "lighthouse", "scenes": [
+        {"video_prompt": "A lighthouse on a cliff at dusk, its beam sweeping over calm waves.",
+         "narration": "Some lights never stop looking out for you.", "voice_category": "chirp_female_leda"},
+        {"video_prompt": "A small sailboat gliding into a harbor at night, warm windows on the shore.",
+         "narration": "Coastal Mutual. Insurance that brings you home.", "voice_category": "chirp_female_leda"},
+    ], "music_prompt": "Gentle acoustic guitar, hopeful and warm."},
+    {"id": "bakery", "scenes": [
+        {"video_prompt": "Fresh sourdough loaves cooling on a wooden rack in a sunlit bakery.",
+         "narration": "Baked before sunrise, every single day.", "voice_category": "chirp_male_charon"},
+        {"video_prompt": "A paper bag of warm bread handed over a counter, steam rising.",
+         "narration": "Corner Loaf. Come in while it is warm.", "voice_category": "chirp_male_charon"},
+    ]},
+]
+
+
+def _write_jsonl(records) -> str:
+    path = os.path.join(tempfile.mkdtemp(), "briefs.jsonl")
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return path
+
+
+def run_load_example():
+    """
+    Reads a mixed JSONL file and summarizes recorded results.
+    """
+    print("\n--- Batch Input and Summary Example (offline) ---")
+    path = _write_jsonl([
+        PLANS[0],
+        {"id": "shelter", "brief": "A 30 second spot for a dog adoption shelter. Warm and hopeful."},
+        {"request_id": "req-7", "title": "Summer sale", "body": "Upbeat ad for a bike shop's summer sale."},
+    ])
+    for entry in load_briefs(path):
+        if "plan" in entry:
+            print(f"{entry['id']:<12} plan with {len(entry['plan']['scenes'])} scenes")
+        else:
+            print(f"{entry['id']:<12} brief: {entry['brief'][:60]!r}")
+
+    stages = lambda video, mux: [  # noqa: E731
+        {"stage": "x/commercial/scene-1/video/veo operation", "used_s": video, "budget_s": 900, "status": "ok"},
+        {"stage": "x/commercial/scene-1/mux/transcoder job", "used_s": mux, "budget_s": 300, "status": "ok"},
+    ]
+    results = [
+        {"id": "a", "status": "SUCCEEDED", "wall_s": 310.0, "stages": stages(180.0, 60.0)},
+        {"id": "b", "status": "SUCCEEDED", "wall_s": 290.0, "stages": stages(150.0, 75.0)},
+        {"id": "c", "status": "FAILED", "wall_s": 95.0, "stages": stages(90.0, 0.0)},
+    ]
+    print(json.dumps(summarize(results, wall_seconds=600.0), indent=2))
+
+
+async def run_batch_example():
+    """
+    Produces two commercials concurrently and prints the manifest and throughput.
+    """
+    print("\n--- Batch Production Example ---")
+    path = _write_jsonl(PLANS)
+    summary = await run_batch(path, concurrency=2, max_scenes=4)
+    with open(path.replace(".jsonl", ".results.jsonl")) as f:
+        for line in f:
+            result = json.loads(line)
+            print(f"{result['id']}: {result['status']} {result.get('final_public_url') or result.get('error')}")
+    print(json.dumps(summary, indent=2))
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_load_example()
+    asyncio.run(run_batch_example())
@@ -0,0 +1,182 @@
+"""
+This script tests session cancellation of background jobs and in-flight backend work.
+
+It first starts two simulated background jobs and a blocking tool call that
+poll like the Veo and Transcoder waits under one session's token offline,
+cancels the session and prints how long each took to stop, then shows that the session's next tool call gets a
+fresh token, and that the tool calls of one session share its token while another
+session gets its own. Next, two sessions wait on one shared (coalesced) generation: cancelling
+the first leaves the second's result intact, and the generation is only cancelled
+once every waiting session is. It then starts a real Veo generation as a background job,
+cancels it after a few seconds and prints the cancellation report (operation
+cancelled, partial outputs deleted) and the time until the job stopped.
+Requires GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_BUCKET and Veo access for the
+second part.
+"""
+import asyncio
+import os
+import tempfile
+import time
+from dotenv import load_dotenv
+
+os.environ.setdefault("PROGRESS_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "job_durations.db"))
+
+from video_producer_agent.cancellation import (
+    OperationCancelled,
+    bind_cancellation,
+    bind_session,
+    cancel_session,
+    cancellable_sleep,
+    current_token,
+    get_session_token,
+)
+from video_producer_agent.progress import get_progress, start_job
+
+load_dotenv()
+
+SESSION_ID = "cancellation-test"
+
+
+async def _simulated_wait(poll_interval_seconds: float) -> str:
+    for _ in range(100):
+        await cancellable_sleep(poll_interval_seconds)
+    return "gs://byron-alpha-vpagent/muxed/never.mp4"
+
+
+def _start_under_session(func, *args, **kwargs):
+    """Starts a background job the way bind_cancellation runs tools: under the session's token."""
+    async def start():
+        bind_session(SESSION_ID)
+        return start_job(func.__name__, func, *args, **kwargs)
+
+    return asyncio.ensure_future(start())
+
+
+def _progress_under_session(job_id: str):
+    """Follows a job the way the agent does: get_progress only sees the session's own jobs."""
+    async def progress():
+        bind_session(SESSION_ID)
+        return await get_progress(job_id, wait_seconds=10)
+
+    return asyncio.ensure_future(progress())
+
+
+async def run_cancellation_example():
+    """
+    Cancels two polling jobs and measures how quickly they stop.
+    """
+    print("\n--- Cancellation Example (offline) ---")
+    first_token = get_session_token(SESSION_ID)
+    jobs = [await _start_under_session(_simulated_wait, interval) for interval in (5, 15)]
+
+    async def blocking_tool():
+        # A tool waiting in the agent's own turn (e.g. a scene agent's mux) rather than in a job.
+        bind_session(SESSION_ID)
+        try:
+            await _simulated_wait(15)
+        except OperationCancelled as e:
+            return f"{e} after {time.monotonic() - cancelled_at:.2f}s"
+
+    blocking = asyncio.ensure_future(blocking_tool())
+    await asyncio.sleep(2)
+    cancelled_at = time.monotonic()
+    report = await cancel_session(SESSION_ID, "user changed the concept")
+    print(f"report: {report}")
+    print(f"blocking tool: {await blocking}")
+    for job in jobs:
+        progress = await _progress_under_session(job.job_id)
+        print(f"job {job.job_id} {progress['state']} {time.monotonic() - cancelled_at:.2f}s after the cancel: "
+              f"{progress.get('error')}")
+    print(f"next call gets a fresh token: {get_session_token(SESSION_ID) is not first_token}")
+
+
+def run_session_scope_example():
+    """
+    Binds tool calls the way ADK runs them: each call gets its own context over the session's state.
+    """
+    from types import SimpleNamespace
+
+    from google.adk.sessions.state import State
+
+    print("\n--- Session Scope Example (offline) ---")
+
+    def tool_call_token(session_state: dict):
+        bind_cancellation(None, {}, SimpleNamespace(state=State(value=session_state, delta={})))
+        return current_token()
+
+    session_a, session_b = {}, {}
+    first, second, other = tool_call_token(session_a), tool_call_token(session_a), tool_call_token(session_b)
+    print(f"session a: {first.scope} then {second.scope}; session b: {other.scope}")
+    assert first is second and first is not other
+
+
+async def run_veo_cancellation_example():
+    """
+    Starts a real Veo generation, cancels it and prints the report.
+    """
+    from video_producer_agent.video_generation_tool import video_generation_tool
+
+    print("\n--- Veo Cancellation Example ---")
+    job = await _start_under_session(
+        video_generation_tool,
+        prompt="A satellite floating through outer space with the moon and some stars in the background.",
+        duration_seconds=5,
+    )
+    await asyncio.sleep(15)
+    cancelled_at = time.monotonic()
+    print(f"report: {await cancel_session(SESSION_ID, 'cancellation test')}")
+    progress = await _progress_under_session(job.job_id)
+    print(f"job {progress['state']} {time.monotonic() - cancelled_at:.2f}s after the cancel: {progress.get('error')}")
+
+
+async def run_shared_generation_example():
+    """
+    Cancels the sessions waiting on one coalesced generation, one at a time.
+    """
+    from video_producer_agent.generation_ledger import coalesce_async
+
+    os.environ.setdefault("GENERATION_LEDGER_DB", os.path.join(tempfile.mkdtemp(), "generation_ledger.db"))
+    print("\n--- Shared Generation Example (offline) ---")
+    runs = {"started": 0, "cancelled": 0}
+
+    async def produce(seconds: float):
+        runs["started"] += 1
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            runs["cancelled"] += 1
+            raise
+        return [f"gs://example-bucket/shared/{runs['started']}.mp4"]
+
+    async def wait_in(session_id: str, params: dict, seconds: float):
+        bind_session(session_id)
+        try:
+            return await coalesce_async("simulated", params, lambda: produce(seconds))
+        except OperationCancelled as e:
+            return str(e)
+
+    params = {"prompt": f"shared {time.time()}"}
+    waits = [asyncio.ensure_future(wait_in(session, params, 2.0)) for session in ("session-a", "session-b")]
+    await asyncio.sleep(0.5)
+    await cancel_session("session-a", "user changed the concept")
+    results = await asyncio.gather(*waits)
+    print(f"after cancelling session-a: {results}, runs {runs}")
+    assert isinstance(results[1], tuple) and runs == {"started": 1, "cancelled": 0}
+
+    params = {"prompt": f"abandoned {time.time()}"}
+    waits = [asyncio.ensure_future(wait_in(session, params, 10.0)) for session in ("session-c", "session-d")]
+    await asyncio.sleep(0.5)
+    for session in ("session-c", "session-d"):
+        await cancel_session(session, "stop")
+    results = await asyncio.gather(*waits)
+    await asyncio.sleep(0.1)
+    print(f"after cancelling both sessions: {results}, runs {runs}")
+    assert runs == {"started": 2, "cancelled": 1}
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_cancellation_example())
+    run_session_scope_example()
+    asyncio.run(run_shared_generation_example())
+    asyncio.run(run_veo_cancellation_example())
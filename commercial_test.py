@@ -0,0 +1,68 @@
+"""
+This script tests one-call commercial production.
+
+It first validates a plan offline: missing speaking rates are solved from the
+narration predictor and a narration too long for an 8 second clip is rejected
+before anything is generated. It then produces a three-scene commercial with
+music using a single `produce_commercial` call.
+Requires GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET to be set for the second part.
+"""
+import asyncio
+import pprint
+from dotenv import load_dotenv
+
+from video_producer_agent.commercial import normalize_scene, produce_commercial
+
+load_dotenv()
+
+SCENES = [
+    {
+        "video_prompt": "A close-up of a girl holding adorable golden retriever puppy in the park, sunlight.",
+        "narration": "Some friendships... start with a single look.",
+        "voice_category": "chirp_female_leda",
+    },
+    {
+        "video_prompt": "A golden retriever puppy running across a sunny meadow, slow motion, cinematic.",
+        "narration": "Every day, a new adventure... and a reason to smile.",
+        "voice_category": "chirp_female_leda",
+        "speaking_rate": 1.1,
+    },
+    {
+        "video_prompt": "A puppy asleep on a cozy blanket by a window at sunset, warm tones.",
+        "narration": "Find your new best friend today.",
+        "voice_category": "chirp_female_leda",
+    },
+]
+
+
+def run_plan_validation_example():
+    """
+    Normalizes the plan and shows that an overlong narration is rejected up front.
+    """
+    print("\n--- Plan Validation Example (offline) ---")
+    plan = [normalize_scene(i, scene) for i, scene in enumerate(SCENES)]
+    pprint.pprint([(scene["voice_category"], scene["speaking_rate"]) for scene in plan])
+
+    too_long = dict(SCENES[0], narration=" ".join(["This sentence keeps going and going."] * 8))
+    try:
+        normalize_scene(0, too_long)
+        print("Unexpected: the overlong narration was accepted.")
+    except ValueError as e:
+        print(f"Rejected as expected: {e}")
+
+
+async def run_produce_commercial_example():
+    """
+    Produces the whole commercial in one call.
+    """
+    print("\n--- Produce Commercial Example ---")
+    result = await produce_commercial(
+        SCENES, music_prompt="A warm, uplifting acoustic guitar piece with light percussion."
+    )
+    pprint.pprint(result, indent=1)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_plan_validation_example()
+    asyncio.run(run_produce_commercial_example())
@@ -0,0 +1,139 @@
+"""
+This script tests context caching and replays a production session as a latency benchmark.
+
+It first shows offline that the cache fingerprint only changes when the
+instruction or the tools change, and that looking up the cache never waits for
+a (simulated, slow) cache creation. It then replays the turns of a recorded
+production session against Gemini twice: once sending the full instruction and
+tool declarations on every turn (before), and once referencing a cached-content
+resource created by `ContextCache` (after). For each turn it prints the time to
+first token, prompt tokens and cached tokens, followed by the median of each run.
+Requires GOOGLE_CLOUD_PROJECT and the Gemini API (Vertex AI or API key) for the
+second part.
+"""
+import statistics
+import time
+from types import SimpleNamespace
+from dotenv import load_dotenv
+
+from video_producer_agent.context_cache import ContextCache, context_fingerprint
+
+load_dotenv()
+
+# User and model turns of a typical session, replayed one prefix at a time.
+SESSION = [
+    ("user", "Make a 30 second commercial for a dog adoption shelter. Warm, hopeful, a female voice."),
+    ("model", "Here is the plan: 4 scenes. Scene 1: a girl meets a golden retriever puppy in the park... Shall I start?"),
+    ("user", "Make scene 3 about an older dog instead of a puppy, then go ahead."),
+    ("model", "Updated scene 3: an older dog resting by a fireplace with its new family. Producing now."),
+    ("user", "The narration in scene 2 feels rushed. Can you slow it down?"),
+    ("model", "Scene 2 narration is now at speaking rate 0.95 and I re-rendered only that scene."),
+    ("user", "Great. Add softer music and give me the final link."),
+]
+
+
+def run_fingerprint_example():
+    """
+    Shows that editing the instruction invalidates the cache while identical context reuses it.
+    """
+    print("\n--- Fingerprint Example (offline) ---")
+    first = context_fingerprint("gemini-2.5-pro-preview-03-25", "You are a producer.", None)
+    same = context_fingerprint("gemini-2.5-pro-preview-03-25", "You are a producer.", None)
+    edited = context_fingerprint("gemini-2.5-pro-preview-03-25", "You are a director.", None)
+    print(f"identical context -> same cache: {first == same}")
+    print(f"edited instruction -> new cache: {first != edited}")
+
+
+def run_non_blocking_example():
+    """
+    Shows that a turn without a ready cache is sent at once while the cache is created in the background.
+    """
+    print("\n--- Non-blocking Lookup Example (offline) ---")
+
+    def slow_create(model, config):
+        time.sleep(1.0)
+        return SimpleNamespace(name="cachedContents/simulated", usage_metadata=None)
+
+    client = SimpleNamespace(caches=SimpleNamespace(create=slow_create))
+    cache = ContextCache(client=client, ttl_seconds=600)
+    started = time.monotonic()
+    first = cache.cache_name("gemini-2.5-pro-preview-03-25", "You are a producer.", None)
+    lookup_seconds = time.monotonic() - started
+    print(f"first turn: cache {first}, lookup took {lookup_seconds:.3f}s (creation takes 1s)")
+    assert first is None and lookup_seconds < 0.5
+    ready = cache.cache_name("gemini-2.5-pro-preview-03-25", "You are a producer.", None, wait=True)
+    print(f"after the background creation: cache {ready}")
+    assert ready == "cachedContents/simulated"
+
+
+def _agent_context():
+    from google.adk.tools import FunctionTool
+    from google.genai import types
+
+    from video_producer_agent.agent import root_agent
+
+    declarations = [
+        (tool if isinstance(tool, FunctionTool) else FunctionTool(tool))._get_declaration() for tool in root_agent.tools
+    ]
+    return root_agent.model, root_agent.instruction, [types.Tool(function_declarations=declarations)]
+
+
+def _replay(client, model, config) -> list:
+    from google.genai import types
+
+    timings = []
+    for turn in range(1, len(SESSION) + 1, 2):
+        contents = [
+            types.Content(role=role, parts=[types.Part.from_text(text=text)]) for role, text in SESSION[:turn]
+        ]
+        started = time.monotonic()
+        first_token = None
+        usage = None
+        for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+            if first_token is None:
+                first_token = time.monotonic() - started
+            usage = chunk.usage_metadata or usage
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        cached_tokens = getattr(usage, "cached_content_token_count", None)
+        print(f"  turn {turn}: first token {first_token:.2f}s, prompt tokens {prompt_tokens}, cached {cached_tokens}")
+        timings.append(first_token)
+    return timings
+
+
+def run_replay_benchmark():
+    """
+    Replays the session without and with the context cache and compares time to first token.
+    """
+    from google.genai import types
+
+    from video_producer_agent.veo_client import get_genai_client
+
+    print("\n--- Replay Benchmark ---")
+    client = get_genai_client()
+    model, instruction, tools = _agent_context()
+    disable_calls = types.AutomaticFunctionCallingConfig(disable=True)
+
+    print("Before (full instruction and tools every turn):")
+    before = _replay(client, model, types.GenerateContentConfig(
+        system_instruction=instruction, tools=tools, automatic_function_calling=disable_calls,
+    ))
+
+    cache = ContextCache(client=client, ttl_seconds=600)
+    name = cache.cache_name(model, instruction, tools, wait=True)
+    if not name:
+        print("Context cache could not be created; nothing to compare.")
+        return
+    print(f"After (cached content {name}):")
+    after = _replay(client, model, types.GenerateContentConfig(
+        cached_content=name, automatic_function_calling=disable_calls,
+    ))
+    print(f"Median time to first token: before {statistics.median(before):.2f}s, "
+          f"after {statistics.median(after):.2f}s")
+    client.caches.delete(name=name)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_fingerprint_example()
+    run_non_blocking_example()
+    run_replay_benchmark()
@@ -0,0 +1,99 @@
+"""
+This script tests deadline propagation and stage budgets across a production run.
+
+It first renders a simulated three-scene timeline offline through the timeline
+graph under one run deadline: scene 2's simulated Veo wait overruns its stage
+budget, the render stops at once (cancelling scene 3's Transcoder wait) and the
+script prints the error with the stage that used up the budget and the stage
+report. A second simulated run overruns the run's own deadline instead. It then
+calls produce_commercial with a deliberately tight deadline and prints how soon
+it failed and which stage it names. Requires GOOGLE_CLOUD_PROJECT,
+GOOGLE_CLOUD_BUCKET, Veo and the Transcoder API for the last part.
+"""
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from dotenv import load_dotenv
+
+os.environ.setdefault("RENDER_CACHE_DB", os.path.join(tempfile.mkdtemp(), "render_cache.db"))
+
+from video_producer_agent.cancellation import cancellable_sleep
+from video_producer_agent.deadline import DeadlineExceeded, production_deadline, stage
+from video_producer_agent.timeline import TimelineBuild, deadline_error, gather_or_abort
+
+load_dotenv()
+
+POLL_SECONDS = 0.5
+
+
+async def _simulated_scene(build: TimelineBuild, index: int, veo_seconds: float, transcoder_seconds: float) -> dict:
+    name = f"scene-{index + 1}"
+
+    async def wait(label: str, budget: float, seconds: float) -> dict:
+        # Polls like veo_client.wait_for_operation and transcoder_jobs.wait_for_transcoder_job.
+        with stage(label, budget):
+            for _ in range(int(seconds / POLL_SECONDS)):
+                await cancellable_sleep(POLL_SECONDS)
+        return {"uri": f"gs://byron-alpha-vpagent/simulated/{name}-{uuid.uuid4().hex[:6]}.mp4"}
+
+    # Fresh inputs every run, so nothing comes from the render cache.
+    inputs = {"run": uuid.uuid4().hex}
+    await build.node(f"{name}/narration", "simulated_narration", inputs, lambda: wait("tts", 10, 0.5))
+    await build.node(f"{name}/video", "simulated_video", inputs, lambda: wait("veo operation", 4, veo_seconds))
+    return await build.node(f"{name}/mux", "simulated_mux", inputs,
+                            lambda: wait("transcoder job", 10, transcoder_seconds))
+
+
+async def _simulated_run(run_budget: float, scenes) -> None:
+    started = time.monotonic()
+    build = TimelineBuild()
+    try:
+        with production_deadline("commercial", run_budget) as run:
+            await gather_or_abort(*(_simulated_scene(build, i, *scene) for i, scene in enumerate(scenes)))
+        print(f"finished in {time.monotonic() - started:.1f}s")
+    except DeadlineExceeded as e:
+        print(f"stopped after {time.monotonic() - started:.1f}s: {deadline_error(e, run)}")
+    for entry in run.report.summary():
+        print(f"  {entry['stage']:<40} {entry['status']:<9} {entry['used_s']:>5}s of {entry['budget_s']}s")
+
+
+async def run_deadline_example():
+    """
+    Runs two simulated productions: one overruns a stage budget, one the run's deadline.
+    """
+    print("\n--- Stage Budget Example (offline) ---")
+    # (veo_seconds, transcoder_seconds) per scene; scene 2's Veo wait overruns its 4s budget.
+    await _simulated_run(30, [(1.5, 1.0), (6.0, 1.0), (2.0, 5.0)])
+
+    print("\n--- Run Deadline Example (offline) ---")
+    await _simulated_run(3, [(2.5, 1.0), (2.5, 1.0)])
+
+
+async def run_produce_commercial_example():
+    """
+    Produces a two-scene commercial with a deadline too short for Veo and prints the result.
+    """
+    from video_producer_agent.commercial import produce_commercial
+
+    print("\n--- produce_commercial Deadline Example ---")
+    started = time.monotonic()
+    result = await produce_commercial(
+        scenes=[
+            {"video_prompt": f"A lighthouse on a cliff at dusk, waves below, take {uuid.uuid4().hex[:6]}.",
+             "narration": "Some places guide you home.", "voice_category": "chirp_female_leda"},
+            {"video_prompt": f"A warm kitchen with bread cooling on a rack, take {uuid.uuid4().hex[:6]}.",
+             "narration": "And some moments are worth the wait.", "voice_category": "chirp_female_leda"},
+        ],
+        deadline_seconds=45,
+    )
+    print(f"returned after {time.monotonic() - started:.1f}s: {result}")
+    # Let the abandoned Veo operations be cancelled and their outputs deleted before the loop closes.
+    await asyncio.sleep(10)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_deadline_example())
+    asyncio.run(run_produce_commercial_example())
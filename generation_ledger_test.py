@@ -0,0 +1,89 @@
+"""
+This script tests the generation ledger.
+
+The first part runs offline against a temporary ledger database: three identical
+requests are issued at the same time and only one of them runs the (simulated)
+generation, the others join it; a repeat afterwards is served from the ledger, and
+a refresh (a rejected result) generates again and replaces it. A failed generation
+is not recorded. The second part calls `video_generation_tool`
+twice with the same prompt; the second call should return instantly with the
+same video. Requires GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET for the second part.
+"""
+import asyncio
+import os
+import pprint
+import tempfile
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _use_temporary_ledger():
+    # Before the first ledger access, which reads GENERATION_LEDGER_DB.
+    os.environ.setdefault("GENERATION_LEDGER_DB", os.path.join(tempfile.mkdtemp(), "generation_ledger.db"))
+
+
+async def run_single_flight_example():
+    """
+    Shows that identical concurrent requests share one simulated generation.
+    """
+    _use_temporary_ledger()
+    from video_producer_agent.generation_ledger import coalesce_async, coalesce_sync
+
+    print("\n--- Ledger Single-Flight Example (offline) ---")
+    runs = []
+
+    async def produce():
+        runs.append(time.monotonic())
+        await asyncio.sleep(1.0)
+        return [f"gs://example-bucket/simulated/{len(runs)}.mp4"]
+
+    params = {"model": "simulated", "prompt": f"A satellite floating through outer space {time.time()}"}
+    results = await asyncio.gather(*(coalesce_async("simulated", params, produce) for _ in range(3)))
+    pprint.pprint(results, indent=1)
+    assert len(runs) == 1, f"Expected one generation, got {len(runs)}"
+    assert sorted(status for _, status in results) == ["generated", "joined", "joined"]
+
+    started = time.monotonic()
+    repeat = await coalesce_async("simulated", params, produce)
+    print(f"Repeat: {repeat} in {time.monotonic() - started:.2f}s")
+    assert repeat[1] == "cached" and len(runs) == 1
+
+    refreshed = await coalesce_async("simulated", params, produce, refresh=True)
+    after_refresh = await coalesce_async("simulated", params, produce)
+    print(f"Refresh: {refreshed}, then repeat: {after_refresh}")
+    assert refreshed[1] == "generated" and len(runs) == 2
+    assert after_refresh == (refreshed[0], "cached")
+
+    def fail():
+        raise RuntimeError("simulated failure")
+
+    failing_params = {"model": "simulated", "prompt": f"failing {time.time()}"}
+    for _ in range(2):
+        try:
+            coalesce_sync("simulated", failing_params, fail)
+        except RuntimeError as e:
+            print(f"Failure is not recorded: {e}")
+
+
+async def run_repeat_generation_example():
+    """
+    Calls the video tool twice with identical inputs and times both calls.
+    """
+    _use_temporary_ledger()
+    from video_producer_agent.video_generation_tool import video_generation_tool
+
+    print("\n--- Repeated Video Generation Example ---")
+    prompt = "A satellite floating through outer space with the moon and some stars in the background."
+    for attempt in (1, 2):
+        started = time.monotonic()
+        response = await video_generation_tool(prompt=prompt, duration_seconds=5)
+        print(f"Attempt {attempt} took {time.monotonic() - started:.1f}s")
+        pprint.pprint(response, indent=1)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_single_flight_example())
+    asyncio.run(run_repeat_generation_example())
@@ -49,19 +49,11 @@ async def run_image_to_video_generation_example():
     print("\n--- Raw Result from Tool ---")
     pprint.pprint(result, indent=2)
 
-    if isinstance(result, str) and result.startswith("Error"):
-        print(f"\nTool returned an error: {result}")
-    elif hasattr(result, 'generated_videos') and result.generated_videos:
-        print("\n--- Video Generation Successful ---")
-        for i, video_info in enumerate(result.generated_videos):
-            print(f"  Video {i+1} URI: {gcs_uri_to_public_url(video_info.video.uri)}")
-            
-    elif hasattr(result, 'operation') and result.operation.error:
-            print(f"\nVideo generation operation resulted in an error: {result.operation.error.message}")
-    elif result:
-        print("\nTool returned a response, but structure might be unexpected. Please review raw output.")
+    if "error_code" in result:
+        print(f"\nTool returned an error ({result['error_code']}, retryable: {result['retryable']}): {result['message']}")
     else:
-        print("\nTool did not return a recognizable success or error message.")
+        print("\n--- Video Generation Successful ---")
+        print(f"  Video URI: {gcs_uri_to_public_url(result['uri'])}")
 
 
 
@@ -0,0 +1,143 @@
+"""
+This script benchmarks the cold-start import time of the video producer agent.
+
+It runs `python -X importtime -c "import video_producer_agent.agent"` in a fresh
+interpreter several times, parses the per-module timings that CPython writes to
+stderr and reports the median cumulative time for the agent package together
+with the heaviest modules. ADK itself is imported first and reported separately,
+so the agent figure only covers what the tool modules add on top of the
+framework. It also checks that the heavy Google Cloud SDKs are NOT imported
+eagerly by the tools; they are expected to be imported on first use.
+
+Usage:
+    python import_time_benchmark.py                 # 5 runs, human readable report
+    python import_time_benchmark.py --runs 10 --top 25
+    python import_time_benchmark.py --max-ms 1500   # exit 1 if the median exceeds the budget
+    python import_time_benchmark.py --json          # machine readable output for tracking
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+TARGET_MODULE = "video_producer_agent.agent"
+
+# Modules that must only be imported when a tool actually runs. ADK itself loads google.genai,
+# so only SDKs that this package alone pulls in are checked.
+HEAVY_MODULES = [
+    "google.cloud.video.transcoder_v1",
+    "google.cloud.texttospeech_v1beta1",
+    "google.cloud.texttospeech_v1",
+    "google.cloud.storage",
+    "mutagen",
+    "tinytag",
+    "requests",
+]
+
+
+def parse_importtime(stderr_text: str) -> dict:
+    """
+    Parses `-X importtime` output into {module: (self_us, cumulative_us)}.
+
+    Lines look like: "import time:       412 |       1201 |   google.auth".
+    """
+    timings = {}
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue # Header line ("self [us] | cumulative | imported package")
+        module = parts[2].strip()
+        # A module can appear more than once in odd cases; keep the largest figure.
+        previous = timings.get(module)
+        if previous is None or cumulative_us > previous[1]:
+            timings[module] = (self_us, cumulative_us)
+    return timings
+
+
+def run_once() -> tuple:
+    """Imports the agent in a fresh interpreter and returns (timings, eagerly_loaded_heavy_modules)."""
+    probe = (
+        "import sys, json; import google.adk.agents; framework = set(sys.modules); "
+        f"import {TARGET_MODULE}; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules and m not in framework]))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {TARGET_MODULE} failed:\n{completed.stderr[-2000:]}")
+    eager = json.loads(completed.stdout.strip().splitlines()[-1])
+    return parse_importtime(completed.stderr), eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent cold-start import time.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreter runs.")
+    parser.add_argument("--top", type=int, default=15, help="Number of heaviest modules to list.")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median exceeds this budget.")
+    parser.add_argument("--json", action="store_true", help="Print a JSON report instead of text.")
+    args = parser.parse_args()
+
+    totals_us = []
+    framework_us = []
+    last_timings = {}
+    eager_modules = set()
+    for _ in range(args.runs):
+        timings, eager = run_once()
+        last_timings = timings
+        eager_modules.update(eager)
+        # The top-level package entry covers the agent and everything it pulls in.
+        total = timings.get("video_producer_agent", timings.get(TARGET_MODULE, (0, 0)))[1]
+        totals_us.append(total)
+        framework_us.append(timings.get("google.adk.agents", (0, 0))[1])
+
+    median_ms = statistics.median(totals_us) / 1000.0
+    heaviest = sorted(last_timings.items(), key=lambda item: item[1][1], reverse=True)[: args.top]
+
+    report = {
+        "module": TARGET_MODULE,
+        "runs": args.runs,
+        "median_ms": round(median_ms, 1),
+        "min_ms": round(min(totals_us) / 1000.0, 1),
+        "max_ms": round(max(totals_us) / 1000.0, 1),
+        "adk_median_ms": round(statistics.median(framework_us) / 1000.0, 1),
+        "eager_heavy_modules": sorted(eager_modules),
+        "heaviest": [
+            {"module": name, "self_ms": round(s / 1000.0, 1), "cumulative_ms": round(c / 1000.0, 1)}
+            for name, (s, c) in heaviest
+        ],
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"--- Cold start import of '{TARGET_MODULE}' over {args.runs} runs ---")
+        print(f"Median: {report['median_ms']} ms (min {report['min_ms']} ms, max {report['max_ms']} ms)")
+        print(f"ADK framework import (not counted above): {report['adk_median_ms']} ms")
+        print(f"\nTop {args.top} modules by cumulative import time (last run):")
+        for entry in report["heaviest"]:
+            print(f"  {entry['cumulative_ms']:>9.1f} ms  (self {entry['self_ms']:>7.1f} ms)  {entry['module']}")
+        if eager_modules:
+            print(f"\nWARNING: heavy modules imported at agent import time: {', '.join(sorted(eager_modules))}")
+        else:
+            print("\nNo heavy SDK modules are imported at agent import time.")
+
+    failed = bool(eager_modules)
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"\nFAILED: median import time {median_ms:.1f} ms exceeds budget of {args.max_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
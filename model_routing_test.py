@@ -0,0 +1,140 @@
+"""
+This script shows the model routing and replays a session as a per-phase latency and cost benchmark.
+
+It first prints offline which model every agent runs on and which tools it
+holds. It then replays the two phases of a recorded session against Gemini:
+the creative planning turns (root_agent's instruction and tools) and the
+mechanical tool-execution turns (the operator's instruction, tools and
+function call/response history). Each phase is replayed on the planner model
+(as everything ran before) and on the model it is routed to, printing the turn
+latency, input and output tokens and the estimated cost of every phase.
+Requires GOOGLE_CLOUD_PROJECT and the Gemini API (Vertex AI or API key) for the
+second part.
+"""
+import statistics
+import time
+from dotenv import load_dotenv
+
+from video_producer_agent.model_config import EXECUTOR_MODEL, PLANNER_MODEL, estimate_cost
+
+load_dotenv()
+
+# Creative planning turns, replayed one prefix at a time.
+PLANNING_SESSION = [
+    ("user", "Make a 30 second commercial for a dog adoption shelter. Warm, hopeful, a female voice."),
+    ("model", "Here is the plan: 4 scenes. Scene 1: a girl meets a golden retriever puppy in the park... Shall I start?"),
+    ("user", "Make scene 3 about an older dog instead of a puppy and give me the updated plan."),
+]
+
+VIDEO_URI = "gs://byron-alpha-vpagent/veo2/0f3a/sample_0.mp4"
+NARRATION_URI = "gs://byron-alpha-vpagent/tts_audio/7c1e.wav"
+MUXED_URI = "gs://byron-alpha-vpagent/transcoder_outputs/9b2d/muxed_video.mp4"
+
+
+def _execution_session():
+    """The operator's turns of one scene: a mux request, then the tool calls and their results."""
+    from google.genai import types
+
+    def text(role, value):
+        return types.Content(role=role, parts=[types.Part.from_text(text=value)])
+
+    def call(name, args):
+        return types.Content(role="model", parts=[types.Part.from_function_call(name=name, args=args)])
+
+    def response(name, result):
+        return types.Content(role="user", parts=[types.Part.from_function_response(name=name, response=result)])
+
+    return [
+        text("user", f"Mux scene 1: video {VIDEO_URI}, narration {NARRATION_URI}, end_time_offset 5.87. "
+                     "Then give me its public URL."),
+        call("mux_audio", {"video_uri": VIDEO_URI, "audio_uri": NARRATION_URI, "end_time_offset": 5.87}),
+        response("mux_audio", {"job_id": "5e0c2a91", "kind": "mux_audio", "state": "RUNNING", "eta_s": 58.0}),
+        call("get_progress", {"job_id": "5e0c2a91", "wait_seconds": 20}),
+        response("get_progress", {"job_id": "5e0c2a91", "kind": "mux_audio", "state": "SUCCEEDED",
+                                  "progress_pct": 100, "result": {"uri": MUXED_URI}}),
+        call("gcs_uri_to_public_url", {"gcs_uri": MUXED_URI}),
+        response("gcs_uri_to_public_url", {"result": MUXED_URI.replace("gs://", "https://storage.googleapis.com/")}),
+    ]
+
+
+def run_routing_example():
+    """
+    Prints the model and tools of every agent.
+    """
+    print("\n--- Model Routing (offline) ---")
+    from video_producer_agent.workflow import build_operator_agent, build_production_agent, build_scene_agent
+
+    scene = {"video_prompt": "A puppy in a park.", "narration_text": "Find your new best friend today.",
+             "voice_category": "chirp_female_leda", "speaking_rate": 1.0}
+    agents = [build_operator_agent(), build_scene_agent(0, scene), build_production_agent().sub_agents[1]]
+    print(f"{'video_producer_agent':<22} {PLANNER_MODEL}")
+    for agent in agents:
+        tool_names = [getattr(tool, "name", None) or tool.__name__ for tool in agent.tools]
+        print(f"{agent.name:<22} {agent.model}  tools {tool_names}")
+
+
+def _declarations(agent_tools):
+    from google.adk.tools import FunctionTool
+    from google.genai import types
+
+    tools = [tool if isinstance(tool, FunctionTool) else FunctionTool(tool) for tool in agent_tools]
+    return [types.Tool(function_declarations=[tool._get_declaration() for tool in tools])]
+
+
+def _replay(client, model, instruction, tools, turns) -> dict:
+    """Sends every prefix of the session that ends on a user turn and sums latency and tokens."""
+    from google.genai import types
+
+    config = types.GenerateContentConfig(
+        system_instruction=instruction, tools=tools,
+        automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+    )
+    latencies, input_tokens, output_tokens = [], 0, 0
+    for end in range(1, len(turns) + 1, 2):
+        started = time.monotonic()
+        response = client.models.generate_content(model=model, contents=turns[:end], config=config)
+        latencies.append(time.monotonic() - started)
+        usage = response.usage_metadata
+        input_tokens += usage.prompt_token_count or 0
+        output_tokens += (usage.candidates_token_count or 0) + (getattr(usage, "thoughts_token_count", None) or 0)
+    return {
+        "turns": len(latencies),
+        "median_latency": statistics.median(latencies),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost": estimate_cost(model, input_tokens, output_tokens),
+    }
+
+
+def run_replay_benchmark():
+    """
+    Replays the planning and execution phases on the planner model and on their routed model.
+    """
+    from google.genai import types
+
+    from video_producer_agent.agent import root_agent
+    from video_producer_agent.veo_client import get_genai_client
+    from video_producer_agent.workflow import OPERATOR_INSTRUCTION, build_operator_agent
+
+    print("\n--- Replay Benchmark ---")
+    client = get_genai_client()
+    planning = [types.Content(role=role, parts=[types.Part.from_text(text=text)]) for role, text in PLANNING_SESSION]
+    phases = [
+        ("planning", root_agent.instruction, _declarations(root_agent.tools), planning, PLANNER_MODEL),
+        ("execution", OPERATOR_INSTRUCTION, _declarations(build_operator_agent().tools), _execution_session(), EXECUTOR_MODEL),
+    ]
+    totals = {"before": 0.0, "after": 0.0}
+    print(f"{'phase':<10} {'model':<32} {'turns':>5} {'median s':>9} {'in tok':>8} {'out tok':>8} {'cost $':>9}")
+    for phase, instruction, tools, turns, routed_model in phases:
+        for label, model in (("before", PLANNER_MODEL), ("after", routed_model)):
+            result = _replay(client, model, instruction, tools, turns)
+            totals[label] += result["cost"]
+            print(f"{phase:<10} {model:<32} {result['turns']:>5} {result['median_latency']:>9.2f} "
+                  f"{result['input_tokens']:>8} {result['output_tokens']:>8} {result['cost']:>9.5f}")
+    print(f"Session cost: everything on {PLANNER_MODEL} ${totals['before']:.5f}, routed ${totals['after']:.5f}")
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_routing_example()
+    run_replay_benchmark()
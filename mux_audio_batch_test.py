@@ -0,0 +1,38 @@
+"""
+This script tests muxing the narration of several scenes with one mux_audio_batch call.
+
+It muxes the same clip and narration as three scenes, first into one video per
+scene (one Transcoder job per scene, created and waited on together) and then
+joined (a single job that muxes and joins them), and prints the number of jobs
+and the wall time of each. Requires GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_BUCKET
+and the Transcoder API.
+"""
+import asyncio
+import json
+import time
+from dotenv import load_dotenv
+
+from video_producer_agent.mux_audio import mux_audio_batch
+
+load_dotenv()
+
+# --- IMPORTANT: These GCS URIs must point to existing files for the test to pass ---
+VIDEO_URIS = ["gs://byron-alpha-vpagent/scene1.mp4/9575042869931285230/sample_0.mp4"] * 3
+AUDIO_URIS = ["gs://byron-alpha-vpagent/chirp_output_2061b46f-9c93-4f5a-9711-588e57951647.mp3"] * 3
+OFFSETS = [3.23] * 3
+
+
+async def run_mux_audio_batch_test():
+    """
+    Muxes three scenes separately and then joined, and prints the jobs and wall time of each.
+    """
+    for join in (False, True):
+        print(f"\n--- mux_audio_batch (join={join}) ---")
+        started = time.monotonic()
+        result = await mux_audio_batch(VIDEO_URIS, AUDIO_URIS, OFFSETS, join=join)
+        print(json.dumps(result, indent=2))
+        print(f"{result.get('jobs')} Transcoder jobs in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_mux_audio_batch_test())
@@ -0,0 +1,70 @@
+"""
+This script tests the unified narration engine.
+
+It first checks offline which synthesis path `choose_synthesis_path` picks for
+short text, SSML and long text, and that `normalize_audio` converts other sample
+rates to the engine's 24 kHz LINEAR16 output. It then calls `synthesize_narration`
+from the `video_producer_agent` once for each path and prints the results.
+Requires GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET to be set for the second part.
+"""
+import asyncio
+import io
+import pprint
+import wave
+from dotenv import load_dotenv
+
+from video_producer_agent.narration_engine import (
+    NARRATION_SAMPLE_RATE,
+    choose_synthesis_path,
+    normalize_audio,
+    synthesize_narration,
+)
+
+load_dotenv()
+
+SHORT_TEXT = "Some friendships... start with a single look."
+SSML_TEXT = "<speak>Meet your new best friend. <break time=\"800ms\"/> Visit your local shelter today.</speak>"
+LONG_TEXT = "Through rain, through snow - always by your side. " * 120
+
+
+def run_routing_example():
+    """
+    Prints the path chosen for each kind of input and checks resampling to 24 kHz.
+    """
+    print("\n--- Narration Routing ---")
+    for label, text in (("short", SHORT_TEXT), ("ssml", SSML_TEXT), ("long", LONG_TEXT)):
+        print(f"{label:>5} ({len(text.encode('utf-8'))} bytes): {choose_synthesis_path(text, 'chirp_female_leda')}")
+    assert choose_synthesis_path(SHORT_TEXT, "chirp_female_leda") == "online"
+    assert choose_synthesis_path(SSML_TEXT, "chirp_female_leda") == "long_audio"
+    assert choose_synthesis_path(LONG_TEXT, "chirp_female_leda") == "long_audio"
+
+    # One second of silence at 16 kHz comes back as one second at 24 kHz.
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\x00\x00" * 16000)
+    normalized, duration = normalize_audio(buffer.getvalue())
+    with wave.open(io.BytesIO(normalized), "rb") as wav:
+        assert wav.getframerate() == NARRATION_SAMPLE_RATE
+    print(f"Resampled 16 kHz WAV to {NARRATION_SAMPLE_RATE} Hz, duration {duration:.3f}s")
+
+
+async def run_synthesis_example():
+    """
+    Synthesizes a short narration (online path) and an SSML narration (long-audio path).
+    """
+    print("\n--- Starting Narration Engine Example ---")
+    for text in (SHORT_TEXT, SSML_TEXT):
+        result = await synthesize_narration(text, "chirp_male_puck", 1.0)
+        if isinstance(result, str):
+            print(f"Tool returned an error: {result}")
+            continue
+        pprint.pprint(result, indent=1)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_routing_example()
+    asyncio.run(run_synthesis_example())
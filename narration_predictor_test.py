@@ -0,0 +1,55 @@
+"""
+This script tests the local narration duration predictor.
+
+It runs entirely offline: it seeds a temporary calibration database with a few
+synthetic measurements for one voice, then prints the predicted durations and
+the speaking rates the solver suggests for a 6 second scene, before and after
+calibration.
+"""
+import os
+import tempfile
+
+from video_producer_agent.narration_predictor import PRIOR_COEFFICIENTS, NarrationDurationPredictor, text_features
+
+SAMPLE_TEXTS = [
+    "The product is now available... and we've added some exciting new features.",
+    "And then... it happened.",
+    "I wanted to say - but I couldn't.",
+    "Morning Spark. Wake up to something better.",
+]
+
+
+def run_narration_predictor_example():
+    """
+    Demonstrates prediction, calibration and the speaking rate solver.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        predictor = NarrationDurationPredictor(db_path=os.path.join(temp_dir, "durations.db"))
+        voice = "chirp_female_aoede"
+
+        print("--- Prior (uncalibrated) predictions ---")
+        for text in SAMPLE_TEXTS:
+            print(f"{predictor.predict(text, voice):5.2f}s  features={text_features(text)}  '{text}'")
+
+        # Pretend this voice is 15% slower than the prior assumes.
+        print("\n--- Recording synthetic measurements ---")
+        for text in SAMPLE_TEXTS * 5:
+            prior_estimate = sum(b * x for b, x in zip(PRIOR_COEFFICIENTS, text_features(text)))
+            for rate in (0.9, 1.0, 1.2):
+                predictor.record(text, voice, rate, prior_estimate * 1.15 / rate)
+        print(f"Samples stored for {voice}: {predictor.sample_count(voice)}")
+
+        print("\n--- Calibrated predictions ---")
+        for text in SAMPLE_TEXTS:
+            print(f"{predictor.predict(text, voice):5.2f}s  '{text}'")
+
+        target = 6.0
+        print(f"\n--- Speaking rate needed for a {target}s scene ---")
+        for text in SAMPLE_TEXTS:
+            required = predictor.predict(text, voice, 1.0) / target
+            print(f"rate {required:4.2f} -> {predictor.predict(text, voice, required):5.2f}s  '{text}'")
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_narration_predictor_example()
@@ -0,0 +1,94 @@
+"""
+This script tests the pipeline journal and the resumable scene pipeline.
+
+The first part runs offline against a temporary journal: a simulated step starts
+a long-running "operation", the process "dies" before it finishes, and the next
+attempt reattaches to the recorded operation instead of starting it again, while
+completed steps are skipped. The second part runs `run_scene_pipeline` for two
+scenes and then `resume_scene_pipeline` for the same run, which should return
+immediately from the journal.
+Requires GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET to be set for the second part.
+"""
+import asyncio
+import os
+import pprint
+import tempfile
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _use_temporary_journal():
+    # Before the first journal access, which reads PIPELINE_JOURNAL_DB.
+    os.environ.setdefault("PIPELINE_JOURNAL_DB", os.path.join(tempfile.mkdtemp(), "pipeline_journal.db"))
+
+
+async def run_offline_resume_example():
+    """
+    Simulates a crash during a step and a restart that reattaches to its operation.
+    """
+    _use_temporary_journal()
+    from video_producer_agent.pipeline_journal import get_journal, run_step
+
+    print("\n--- Journal Resume Example (offline) ---")
+    journal = get_journal()
+    run_id = f"offline-{uuid.uuid4().hex[:8]}"
+    calls = {"execute": 0, "reattach": 0}
+
+    async def execute(record_operation):
+        calls["execute"] += 1
+        record_operation("operations/simulated-123")
+        await asyncio.sleep(10)  # Interrupted below, like a process restart.
+        return {"uri": "gs://example-bucket/never.mp4"}
+
+    async def reattach(operation_name):
+        calls["reattach"] += 1
+        return {"uri": f"gs://example-bucket/{operation_name.split('/')[-1]}.mp4"}
+
+    await run_step(journal, run_id, "scene-1/narration", lambda record: asyncio.sleep(0, {"uri": "gs://example-bucket/n.mp3"}))
+    try:
+        await asyncio.wait_for(run_step(journal, run_id, "scene-1/video", execute, reattach), timeout=0.2)
+    except asyncio.TimeoutError:
+        print("First attempt interrupted while the operation was running.")
+    # The interrupted step is still 'running' with its operation name recorded.
+    pprint.pprint(journal.steps(run_id), indent=1)
+
+    narration = await run_step(journal, run_id, "scene-1/narration", execute)
+    video = await run_step(journal, run_id, "scene-1/video", execute, reattach)
+    print(f"Resumed: narration={narration}, video={video}, calls={calls}")
+    assert calls == {"execute": 1, "reattach": 1}
+
+
+async def run_scene_pipeline_example():
+    """
+    Runs a two-scene pipeline, then resumes the same run from the journal.
+    """
+    _use_temporary_journal()
+    from video_producer_agent.scene_pipeline import get_pipeline_status, resume_scene_pipeline, run_scene_pipeline
+
+    print("\n--- Scene Pipeline Example ---")
+    run_id = f"puppy-{uuid.uuid4().hex[:8]}"
+    result = await run_scene_pipeline(
+        run_id=run_id,
+        video_prompts=[
+            "A close-up of a girl holding adorable golden retriever puppy in the park, sunlight.",
+            "A golden retriever puppy running across a sunny meadow, slow motion, cinematic.",
+        ],
+        narration_texts=[
+            "Some friendships... start with a single look.",
+            "Find your new best friend today.",
+        ],
+        voice_category="chirp_female_leda",
+    )
+    pprint.pprint(result, indent=1)
+
+    print("\n--- Resuming the same run ---")
+    pprint.pprint(await resume_scene_pipeline(run_id), indent=1)
+    pprint.pprint(get_pipeline_status(run_id), indent=1)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_offline_resume_example())
+    asyncio.run(run_scene_pipeline_example())
@@ -0,0 +1,112 @@
+"""
+This script tests background jobs and progress reporting for the long-running tools.
+
+It first runs a simulated three-scene render as a background job offline and
+follows it with get_progress the way the agent does, printing when the call
+returned, the progress, the ETA and each scene's public URL as it appears,
+next to the time the whole render took, and checks that a second session sees
+none of the first session's jobs. It then starts a real mux_audio job
+through its long-running tool wrapper and follows it to the muxed URI.
+Requires GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_BUCKET and the Transcoder API for
+the second part.
+"""
+import asyncio
+import os
+import tempfile
+import time
+from dotenv import load_dotenv
+
+os.environ.setdefault("PROGRESS_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "job_durations.db"))
+
+from video_producer_agent.progress import get_progress, report_artifact, report_progress, start_job
+
+load_dotenv()
+
+SCENE_SECONDS = 1.5
+SCENES = 3
+
+
+async def _simulated_render() -> dict:
+    for index in range(SCENES):
+        await asyncio.sleep(SCENE_SECONDS)
+        report_artifact(f"gs://byron-alpha-vpagent/muxed/scene-{index + 1}.mp4", f"scene {index + 1}")
+        report_progress(processed=(index + 1) / (SCENES + 1), detail=f"{index + 1} of {SCENES} scenes rendered")
+    await asyncio.sleep(SCENE_SECONDS)
+    return {"final_uri": "gs://byron-alpha-vpagent/commercials/final.mp4", "duration": 21.5}
+
+
+async def run_progress_example():
+    """
+    Follows a simulated render with get_progress and shows when each result became visible.
+    """
+    print("\n--- Progress Example (offline) ---")
+    for run in range(2):
+        started = time.monotonic()
+        job = start_job("simulated_render", _simulated_render)
+        print(f"run {run + 1}: job {job.job_id} started, eta {job.snapshot()['eta_s']}s")
+        seen = 0
+        while True:
+            progress = await get_progress(job.job_id, wait_seconds=5)
+            artifacts = progress.get("artifacts", [])
+            new = ", ".join(artifact["public_url"] for artifact in artifacts[seen:])
+            seen = len(artifacts)
+            print(f"  {time.monotonic() - started:5.1f}s {progress['state']:<9} {progress.get('progress_pct')}% "
+                  f"eta {progress['eta_s']}s {new}")
+            if progress["state"] in ("SUCCEEDED", "FAILED"):
+                break
+        # The second run's ETA comes from the first run's recorded duration.
+        print(f"  finished after {time.monotonic() - started:.1f}s with {progress.get('result')}")
+
+
+async def run_session_isolation_example():
+    """
+    Starts a job in one session and looks for it from another.
+    """
+    from video_producer_agent.cancellation import bind_session
+
+    print("\n--- Session Isolation Example (offline) ---")
+
+    async def in_session(session_id: str, coro_factory):
+        bind_session(session_id)
+        return await coro_factory()
+
+    async def start():
+        return start_job("simulated_render", _simulated_render)
+
+    job = await asyncio.create_task(in_session("session-a", start))
+    own = await asyncio.create_task(in_session("session-a", lambda: get_progress(wait_seconds=0)))
+    other = await asyncio.create_task(in_session("session-b", lambda: get_progress(wait_seconds=0)))
+    lookup = await asyncio.create_task(in_session("session-b", lambda: get_progress(job.job_id, wait_seconds=0)))
+    print(f"session-a sees {[j['job_id'] for j in own['jobs']]}, session-b sees {other['jobs']}, lookup: {lookup}")
+    assert [j["job_id"] for j in own["jobs"]] == [job.job_id] and other["jobs"] == []
+    assert lookup.get("error_code") == "NOT_FOUND"
+    job.task.cancel()
+
+
+async def run_mux_job_example():
+    """
+    Starts a real mux_audio job through the long-running tool and follows it.
+    """
+    from video_producer_agent.mux_audio import mux_audio
+    from video_producer_agent.progress import long_running_tool
+
+    print("\n--- Long-Running mux_audio Example ---")
+    tool = long_running_tool(mux_audio)
+    started = await tool.func(
+        video_uri="gs://byron-alpha-vpagent/scene1.mp4/9575042869931285230/sample_0.mp4",
+        audio_uri="gs://byron-alpha-vpagent/chirp_output_2061b46f-9c93-4f5a-9711-588e57951647.mp3",
+        end_time_offset=3.23,
+    )
+    print(f"{tool.name} returned at once: {started}")
+    while True:
+        progress = await get_progress(started["job_id"], wait_seconds=30)
+        print(progress)
+        if progress["state"] in ("SUCCEEDED", "FAILED"):
+            break
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_progress_example())
+    asyncio.run(run_session_isolation_example())
+    asyncio.run(run_mux_job_example())
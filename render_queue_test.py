@@ -0,0 +1,142 @@
+"""
+This script tests the render queue and its worker pool.
+
+It first runs offline with a simulated render function and an in-process
+worker running one call at a time: three final renders and then one
+interactive preview are queued, and the script prints the order the worker
+ran them in (the preview jumps the queue), the progress forwarded to the
+caller and how quickly a cancelled caller stops its call on the worker. It
+also shows that a worker whose call was requeued to another worker cannot
+report progress or a result for it any more. It then measures how responsive the serving event loop stays (the worst delay
+of a 50 ms timer) while eight narrations are produced inline and then on two
+worker processes started with `python -m video_producer_agent.render_queue`.
+Requires GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_BUCKET and Text-to-Speech for the
+second part.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dotenv import load_dotenv
+
+os.environ.setdefault("RENDER_QUEUE_DB", os.path.join(tempfile.mkdtemp(), "render_queue.db"))
+os.environ.setdefault("PROGRESS_HISTORY_DB", os.path.join(tempfile.mkdtemp(), "job_durations.db"))
+
+from video_producer_agent.cancellation import cancellable_sleep
+from video_producer_agent.progress import get_progress, report_progress, start_job
+from video_producer_agent.render_queue import (
+    PRIORITY_FINAL, REASSIGNED, RenderWorker, SQLiteRenderQueue, offload, render_priority,
+)
+
+load_dotenv()
+
+ran = []
+
+
+@offload("demo")
+async def simulated_render(name: str, seconds: float) -> str:
+    ran.append(name)
+    steps = int(seconds / 0.5)
+    for step in range(steps):
+        await cancellable_sleep(0.5)
+        report_progress(processed=(step + 1) / steps, detail=f"{name}: step {step + 1} of {steps}")
+    return f"gs://byron-alpha-vpagent/simulated/{name}.mp4"
+
+
+async def run_queue_example():
+    """
+    Queues final renders and a preview, follows one call's progress and cancels another.
+    """
+    print("\n--- Render Queue Example (offline) ---")
+    os.environ["RENDER_QUEUE_MODE"] = "workers"
+    worker = asyncio.ensure_future(RenderWorker("demo-worker", kinds=["demo"], concurrency=1).run(
+        idle_exit_seconds=3))
+
+    with render_priority(PRIORITY_FINAL):
+        finals = [asyncio.ensure_future(simulated_render(f"final-{i + 1}", 1.0)) for i in range(3)]
+    # The worker is busy with the first final render when the preview is asked for.
+    await asyncio.sleep(1.5)
+    preview = start_job("preview", simulated_render, "preview", 6.0)
+    while True:
+        progress = await get_progress(preview.job_id, wait_seconds=10)
+        print(f"preview {progress['state']:<9} {progress.get('progress_pct')}% {progress.get('detail', '')}")
+        if progress["state"] in ("SUCCEEDED", "FAILED"):
+            break
+    print(f"finals: {await asyncio.gather(*finals)}")
+    print(f"run order: {ran}")
+
+    doomed = asyncio.ensure_future(simulated_render("cancelled", 30.0))
+    await asyncio.sleep(3)
+    cancelled_at = time.monotonic()
+    doomed.cancel()
+    await worker
+    print(f"worker stopped the cancelled call {time.monotonic() - cancelled_at:.1f}s after the caller gave up; "
+          f"run order: {ran}")
+
+
+def run_takeover_example():
+    """
+    Requeues a call whose worker stalled and shows that only the new owner's result is kept.
+    """
+    print("\n--- Stale Worker Takeover Example (offline) ---")
+    queue = SQLiteRenderQueue(os.path.join(tempfile.mkdtemp(), "render_queue.db"))
+    job_id = queue.enqueue("demo", "simulated_render", "{}", PRIORITY_FINAL, None)
+    queue.claim("stalled-worker")
+    time.sleep(0.1)
+    queue.requeue_stale(stale_after_seconds=0.05, max_attempts=3)
+    queue.claim("new-worker")
+    state = queue.heartbeat(job_id, "stalled-worker", {"processed": 0.5})
+    late = queue.finish(job_id, "stalled-worker", "SUCCEEDED", '"gs://byron-alpha-vpagent/simulated/stale.mp4"')
+    owner = queue.finish(job_id, "new-worker", "SUCCEEDED", '"gs://byron-alpha-vpagent/simulated/new.mp4"')
+    print(f"stalled worker heartbeat: {state}, result accepted: {late}; new worker result accepted: {owner}")
+    print(f"stored result: {queue.get(job_id)['result']}")
+    assert state == REASSIGNED and not late and owner
+
+
+async def _worst_timer_delay(work) -> float:
+    """Runs `work` while a 50 ms timer ticks and returns the timer's worst delay in seconds."""
+    done = asyncio.ensure_future(work)
+    worst = 0.0
+    while not done.done():
+        started = time.monotonic()
+        await asyncio.sleep(0.05)
+        worst = max(worst, time.monotonic() - started - 0.05)
+    await done
+    return worst
+
+
+async def run_responsiveness_benchmark():
+    """
+    Produces eight narrations inline and on worker processes and compares the loop's worst delay.
+    """
+    from video_producer_agent.narration_engine import synthesize_narration
+
+    print("\n--- Responsiveness Benchmark ---")
+    texts = [f"Narration number {i + 1}: fresh coffee, every morning, right around the corner." for i in range(8)]
+
+    async def narrate_all():
+        return await asyncio.gather(*(synthesize_narration(text, "chirp_female_leda") for text in texts))
+
+    os.environ["RENDER_QUEUE_MODE"] = "inline"
+    started = time.monotonic()
+    inline_delay = await _worst_timer_delay(narrate_all())
+    print(f"inline:  {time.monotonic() - started:.1f}s, worst loop delay {inline_delay * 1000:.0f} ms")
+
+    workers = subprocess.Popen([sys.executable, "-m", "video_producer_agent.render_queue", "--processes", "2"])
+    try:
+        await asyncio.sleep(5)
+        os.environ["RENDER_QUEUE_MODE"] = "workers"
+        started = time.monotonic()
+        worker_delay = await _worst_timer_delay(narrate_all())
+        print(f"workers: {time.monotonic() - started:.1f}s, worst loop delay {worker_delay * 1000:.0f} ms")
+    finally:
+        workers.terminate()
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_queue_example())
+    run_takeover_example()
+    asyncio.run(run_responsiveness_benchmark())
@@ -0,0 +1,46 @@
+"""
+This script tests speculative scene production.
+
+It calls `produce_scene_speculative` from the `video_producer_agent`, which starts
+a Veo generation at a predicted duration while the narration is synthesized in
+parallel, and then prints the scene result and the hit/miss metrics.
+Requires GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET to be set.
+"""
+import asyncio
+import pprint
+from dotenv import load_dotenv
+
+from video_producer_agent.speculative_scene import get_speculation_metrics, produce_scene_speculative
+from video_producer_agent.tools import gcs_uri_to_public_url
+
+load_dotenv()
+
+
+async def run_speculative_scene_example():
+    """
+    Produces one scene speculatively and prints timings and metrics.
+    """
+    print("\n--- Starting Speculative Scene Example ---")
+
+    result = await produce_scene_speculative(
+        video_prompt="A close-up of a girl holding adorable golden retriever puppy in the park, sunlight.",
+        narration_text="Some friendships... start with a single look. Meet your new best friend.",
+        voice_category="chirp_female_leda",
+        speaking_rate=1.0,
+    )
+
+    if "error_code" in result:
+        print(f"Tool returned an error: {result['message']}")
+        return
+
+    pprint.pprint(result, indent=1)
+    print(f"Video public URL: {gcs_uri_to_public_url(result['video_uri'])}")
+    print(f"Narration public URL: {gcs_uri_to_public_url(result['narration_uri'])}")
+
+    print("\n--- Speculation Metrics ---")
+    pprint.pprint(get_speculation_metrics(), indent=1)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_speculative_scene_example())
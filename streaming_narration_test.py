@@ -0,0 +1,84 @@
+"""
+This script tests streaming narration synthesis.
+
+It first streams a long voice-over through the local stub backend into a WAV file
+(no credentials needed) and checks the incremental duration counter against the
+decoded file and against the length TinyTag reads from its header. It then calls
+`stream_text_to_speech` from the `video_producer_agent`, which streams Chirp 3 HD
+audio straight into GCS, and re-measures the uploaded file with
+get_mp3_audio_duration_gcs. Set NARRATION_STREAM_BACKEND=stub to run the GCS part
+without the Text-to-Speech API. Requires GOOGLE_CLOUD_BUCKET to be set for the
+GCS part.
+"""
+import asyncio
+import io
+import pprint
+import tempfile
+import wave
+from dotenv import load_dotenv
+
+from video_producer_agent.mux_audio import get_mp3_audio_duration_gcs
+from video_producer_agent.streaming_narration import (
+    _stub_audio_chunks,
+    split_text_for_streaming,
+    stream_pcm_to_wav,
+    stream_text_to_speech,
+)
+from video_producer_agent.tools import gcs_uri_to_public_url
+
+load_dotenv()
+
+VOICE_OVER = (
+    "Some friendships... start with a single look. "
+    "Every morning, a new adventure. Every evening, a warm welcome home. "
+    "Through rain, through snow - always by your side. "
+) * 10 + "Find your new best friend today. Visit your local shelter."
+
+
+def run_local_stub_example():
+    """
+    Streams the voice-over through the stub backend and verifies the WAV it produced.
+    """
+    print("\n--- Starting Local Streaming Example (stub backend) ---")
+    text_chunks = split_text_for_streaming(VOICE_OVER)
+    buffer = io.BytesIO()
+    report = stream_pcm_to_wav(_stub_audio_chunks(text_chunks, "chirp_female_leda"), buffer)
+    pprint.pprint(report, indent=1)
+
+    with wave.open(io.BytesIO(buffer.getvalue()), "rb") as wav:
+        frames = len(wav.readframes(wav.getnframes()))
+        decoded_seconds = frames / (wav.getframerate() * wav.getsampwidth())
+    print(f"{len(text_chunks)} text chunks, counted {report['duration']}s, decoded {decoded_seconds:.3f}s")
+    assert abs(decoded_seconds - report["duration"]) < 0.01, "Duration counter does not match the WAV data"
+
+    from tinytag import TinyTag
+
+    with tempfile.NamedTemporaryFile(suffix=".wav") as wav_file:
+        wav_file.write(buffer.getvalue())
+        wav_file.flush()
+        header_seconds = TinyTag.get(wav_file.name).duration
+    print(f"TinyTag reads {header_seconds:.3f}s from the header")
+    assert abs(header_seconds - report["duration"]) < 0.01, "WAV header sizes do not match the data"
+
+
+async def run_streaming_gcs_example():
+    """
+    Streams the voice-over into GCS and prints the URI and timings.
+    """
+    print("\n--- Starting Streaming Narration to GCS Example ---")
+    result = await stream_text_to_speech(VOICE_OVER, "chirp_male_charon")
+    if isinstance(result, str):
+        print(f"Tool returned an error: {result}")
+        return
+    pprint.pprint(result, indent=1)
+    print(f"Narration public URL: {gcs_uri_to_public_url(result['uri'])}")
+
+    measured = await asyncio.to_thread(get_mp3_audio_duration_gcs, result["uri"])
+    print(f"get_mp3_audio_duration_gcs measures {measured}s, the tool reported {result['duration_s']}s")
+    assert abs(float(measured) - result["duration_s"]) < 0.05, "Uploaded WAV header does not match its length"
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_local_stub_example()
+    asyncio.run(run_streaming_gcs_example())
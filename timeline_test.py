@@ -0,0 +1,74 @@
+"""
+This script tests incremental timeline rendering.
+
+It first checks offline how scenes are grouped under a music clip's length. It
+then produces a three-scene commercial with `produce_commercial`, edits the
+second scene's narration and produces it again with the first run's speaking
+rates for the unchanged scenes; the second run should rebuild only the second
+scene, its mux and the final assembly, and list everything else as reused.
+Requires GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET to be set for the second part.
+"""
+import asyncio
+import pprint
+from dotenv import load_dotenv
+
+from video_producer_agent.commercial import produce_commercial
+from video_producer_agent.timeline import _group_by_length
+
+load_dotenv()
+
+SCENES = [
+    {
+        "video_prompt": "A close-up of a girl holding adorable golden retriever puppy in the park, sunlight.",
+        "narration": "Some friendships... start with a single look.",
+        "voice_category": "chirp_female_leda",
+    },
+    {
+        "video_prompt": "A golden retriever puppy running across a sunny meadow, slow motion, cinematic.",
+        "narration": "Every day, a new adventure.",
+        "voice_category": "chirp_female_leda",
+    },
+    {
+        "video_prompt": "A puppy asleep on a cozy blanket by a window at sunset, warm tones.",
+        "narration": "Find your new best friend today.",
+        "voice_category": "chirp_female_leda",
+    },
+]
+
+
+def run_grouping_example():
+    """
+    Shows how scenes are split into groups that each fit under one 30 second music clip.
+    """
+    print("\n--- Music Grouping Example (offline) ---")
+    clips = [{"uri": f"scene-{i}", "duration": d} for i, d in enumerate([8, 7, 8, 6, 8, 5])]
+    groups = _group_by_length(clips, 30.0)
+    pprint.pprint([[clip["uri"] for clip in group] for group in groups])
+    assert all(sum(clip["duration"] for clip in group) <= 30.0 for group in groups)
+
+
+async def run_incremental_render_example():
+    """
+    Produces the commercial, edits one narration and produces it again.
+    """
+    print("\n--- Incremental Render Example ---")
+    music_prompt = "A warm, uplifting acoustic guitar piece with light percussion."
+    first = await produce_commercial(SCENES, music_prompt=music_prompt)
+    pprint.pprint(first, indent=1)
+    if not isinstance(first, dict) or "error_code" in first:
+        return
+
+    # Keep the first run's rates for the unchanged scenes so they are reused.
+    edited = [dict(scene, speaking_rate=result["speaking_rate"]) for scene, result in zip(SCENES, first["scenes"])]
+    edited[1] = dict(SCENES[1], narration="Every single day... a brand new adventure.")
+    second = await produce_commercial(edited, music_prompt=music_prompt)
+    pprint.pprint(second, indent=1)
+    if isinstance(second, dict) and "error_code" not in second:
+        print(f"Rebuilt after the edit: {second['built']}")
+        print(f"Final video: {second['final_public_url']}")
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_grouping_example()
+    asyncio.run(run_incremental_render_example())
@@ -0,0 +1,59 @@
+"""
+This script checks that ADK can declare every tool of the agent.
+
+ADK builds a function declaration from each tool's signature when the agent
+first calls the model, and rejects parameters it cannot describe (e.g. an int
+default on a float parameter or a list of dicts), which only surfaces as a
+failed turn. This script walks root_agent, its sub-agents and a scene agent
+(the production agent builds those per run), builds the declaration of every
+tool and prints its parameters. Runs offline; no credentials are needed.
+"""
+from google.adk.agents import LlmAgent
+from google.adk.tools import BaseTool, FunctionTool
+
+from video_producer_agent.agent import root_agent
+from video_producer_agent.workflow import build_scene_agent
+
+SAMPLE_SCENE = {
+    "video_prompt": "A golden retriever running on a beach at sunrise.",
+    "narration_text": "Every morning, a new adventure.",
+    "voice_category": "chirp_female_leda",
+    "speaking_rate": 1.0,
+}
+
+
+def _walk(agent, path=""):
+    """Yields (agent path, tool) for every tool of `agent` and its sub-agents."""
+    path = f"{path}/{agent.name}" if path else agent.name
+    if isinstance(agent, LlmAgent):
+        for tool in agent.tools:
+            yield path, tool
+    for sub_agent in agent.sub_agents:
+        yield from _walk(sub_agent, path)
+
+
+def run_declaration_check():
+    """
+    Builds the declaration of every tool and fails if any of them cannot be declared.
+    """
+    print("\n--- Tool Declaration Check (offline) ---")
+    tools = list(_walk(root_agent)) + list(_walk(build_scene_agent(0, SAMPLE_SCENE)))
+    failures = []
+    for path, tool in tools:
+        tool = tool if isinstance(tool, BaseTool) else FunctionTool(tool)
+        try:
+            declaration = tool._get_declaration()
+        except Exception as e:
+            failures.append(f"{path}: {tool.name}: {type(e).__name__}: {e}")
+            continue
+        parameters = sorted((declaration.parameters.properties or {}) if declaration.parameters else {})
+        print(f"  {path}: {declaration.name}({', '.join(parameters)})")
+    print(f"{len(tools) - len(failures)}/{len(tools)} tools declared.")
+    for failure in failures:
+        print(f"FAILED {failure}")
+    assert not failures, f"{len(failures)} tools cannot be declared"
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_declaration_check()
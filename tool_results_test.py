@@ -0,0 +1,89 @@
+"""
+This script measures how much each scene adds to the LLM context through tool results.
+
+It replays the tool results of one scene (narration, video, mux, public URL)
+as the tools used to return them and as compact results, prints the characters
+each adds to the context and checks that the compact results of a whole
+commercial stay within a fixed budget per scene. It also shows how legacy error
+strings and exceptions map to error codes. Runs offline.
+"""
+import pprint
+
+from google.api_core.exceptions import ResourceExhausted
+from google.genai import types
+
+from video_producer_agent.tool_results import MediaResult, ToolError, compact_result, result_size
+from video_producer_agent.veo_client import video_result
+
+# Compact tool results of one scene must stay below this many characters.
+SCENE_CONTEXT_BUDGET = 1000
+SCENES = 6
+
+
+def _scene_results(index: int):
+    video_uri = f"gs://byron-alpha-vpagent/veo2/{index:032x}/sample_0.mp4"
+    narration = {
+        "uri": f"gs://byron-alpha-vpagent/tts_audio/{index:032x}.wav",
+        "duration": 5.873000000000001,
+        "path": "online",
+        "voice_category": "chirp_female_leda",
+        "encoding": "LINEAR16",
+        "sample_rate": 24000,
+        "wall_seconds": 1.2345678,
+    }
+    muxed_uri = f"gs://byron-alpha-vpagent/transcoder_outputs/{index:032x}/muxed_video.mp4"
+    public_url = muxed_uri.replace("gs://", "https://storage.googleapis.com/")
+
+    legacy_video = types.GenerateVideosResponse(
+        generated_videos=[types.GeneratedVideo(video=types.Video(uri=video_uri, mime_type="video/mp4"))]
+    )
+    # Function tools returning a non-dict were wrapped by ADK as {"result": ...}.
+    legacy = [narration, {"result": legacy_video.model_dump(mode="json")},
+              {"result": muxed_uri}, {"result": public_url}]
+    compact = [MediaResult(narration["uri"], narration["duration"], has_audio=True).to_dict(),
+               video_result([video_uri], 6).to_dict(),
+               compact_result(muxed_uri), compact_result(public_url)]
+    return legacy, compact
+
+
+def run_context_growth_example():
+    """
+    Compares the context growth of a commercial before and after compact results.
+    """
+    print("\n--- Context Growth Per Scene (offline) ---")
+    legacy_total = compact_total = 0
+    for index in range(SCENES):
+        legacy, compact = _scene_results(index)
+        legacy_size = sum(result_size(result) for result in legacy)
+        compact_size = sum(result_size(result) for result in compact)
+        legacy_total += legacy_size
+        compact_total += compact_size
+        print(f"scene {index + 1}: legacy {legacy_size} chars, compact {compact_size} chars "
+              f"(context so far {legacy_total} -> {compact_total})")
+        assert compact_size <= SCENE_CONTEXT_BUDGET
+    print(f"Saved {legacy_total - compact_total} chars ({1 - compact_total / legacy_total:.0%}) over {SCENES} scenes.")
+    pprint.pprint(_scene_results(0)[1], indent=1)
+
+
+def run_error_mapping_example():
+    """
+    Shows the error codes produced for legacy error strings and exceptions.
+    """
+    print("\n--- Error Mapping (offline) ---")
+    samples = [
+        "Error: Invalid GCS URI format: 'bucket/object'. Expected 'gs://bucket-name/object-name'.",
+        "ERROR: Google Cloud ADC not found. Run 'gcloud auth application-default login'.",
+        "Error generating video: Video generation operation finished without any generated videos "
+        "(the prompt may have been blocked by safety filters).",
+        ResourceExhausted("Quota exceeded for aiplatform.googleapis.com/generate_content_requests."),
+        TimeoutError("Long-audio synthesis did not finish within 900 seconds."),
+    ]
+    for sample in samples:
+        result = ToolError.from_exception(sample).to_dict() if isinstance(sample, Exception) else compact_result(sample)
+        print(f"{result['error_code']:<18} retryable={result['retryable']!s:<5} {result['message'][:70]}")
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_context_growth_example()
+    run_error_mapping_example()
@@ -24,9 +24,8 @@ async def main():
     # if they are defined in a .env file.
     load_dotenv() 
 
-    # Example parameters for the video_join_tool
-    # GOOGLE_CLOUD_LOCATION is used by video_join_tool for the Transcoder job.
-    test_location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1") 
+    # video_join_tool places the Transcoder job in one of TRANSCODER_REGIONS (see transcoder_scheduler).
+    test_regions = os.getenv("TRANSCODER_REGIONS") or os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
 
     # --- IMPORTANT: These GCS URIs must point to existing, valid MP4 files for the test to pass ---
     test_input_uris = [
@@ -39,7 +38,7 @@ async def main():
 
     gcp_project = os.getenv('GOOGLE_CLOUD_PROJECT')
     print(f"Using Project ID: {gcp_project}") 
-    print(f"Using Location: {test_location}")
+    print(f"Using Transcoder regions: {test_regions}")
     print(f"Input URIs: {test_input_uris}")
 
     if not gcp_project:
@@ -51,7 +50,6 @@ async def main():
     try:
         print(f"\nAttempting to join videos...")
         result_uri = await video_join_tool(
-            location=test_location,
             input_uris=test_input_uris,
         )
         print(f"\nVideo join tool completed successfully!")
@@ -0,0 +1,102 @@
+"""
+This script tests Transcoder job completion through Pub/Sub notifications.
+
+It first runs against the local Pub/Sub emulator (start it with
+`gcloud beta emulators pubsub start` and set PUBSUB_EMULATOR_HOST): it waits
+on three simulated jobs while their Transcoder-style completion messages are
+published a few seconds apart, and prints how long after each publish its wait
+returned. It also shows a message that arrives before its wait starts and a
+wait that times out into the polling fallback. It then joins two clips with
+video_join_tool against the real Transcoder API with notifications on; the
+"Polling status" lines show the single get_job call the wait made. Requires
+GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_BUCKET, a TRANSCODER_PUBSUB_TOPIC the
+Transcoder service agent can publish to and the Transcoder API for the second
+part.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from dotenv import load_dotenv
+
+from video_producer_agent.transcoder_notifications import TranscoderNotifications
+
+load_dotenv()
+
+EMULATOR_TOPIC = "transcoder-notifications-test"
+
+
+def _job_name(project: str) -> str:
+    return f"projects/{project}/locations/us-central1/jobs/{uuid.uuid4()}"
+
+
+async def run_emulator_example():
+    """
+    Resolves simulated job waits from messages published to the emulator.
+    """
+    from google.cloud import pubsub_v1
+
+    print("\n--- Pub/Sub Emulator Example ---")
+    if not os.getenv("PUBSUB_EMULATOR_HOST"):
+        print("PUBSUB_EMULATOR_HOST is not set; start the emulator to run this part.")
+        return
+    project = os.getenv("GOOGLE_CLOUD_PROJECT", "emulator-project")
+    notifications = TranscoderNotifications(f"projects/{project}/topics/{EMULATOR_TOPIC}")
+    await asyncio.to_thread(notifications.start)
+    publisher = pubsub_v1.PublisherClient()
+
+    def publish(job_name: str, state: str = "SUCCEEDED") -> float:
+        data = json.dumps({"job": {"name": job_name, "state": state}}).encode("utf-8")
+        publisher.publish(notifications.topic, data).result()
+        return time.monotonic()
+
+    async def wait(job_name: str) -> float:
+        await notifications.wait(job_name, timeout=30)
+        return time.monotonic()
+
+    try:
+        jobs = [_job_name(project) for _ in range(3)]
+        waits = [asyncio.ensure_future(wait(job_name)) for job_name in jobs]
+        published = []
+        for job_name in jobs:
+            await asyncio.sleep(2)
+            published.append(await asyncio.to_thread(publish, job_name))
+        for job_name, sent, received in zip(jobs, published, await asyncio.gather(*waits)):
+            print(f"{job_name.rsplit('/', 1)[-1]}: wait returned {(received - sent) * 1000:.0f} ms after the publish")
+
+        early = _job_name(project)
+        await asyncio.to_thread(publish, early, "FAILED")
+        await asyncio.sleep(1)
+        print(f"message before the wait: {await notifications.wait(early, timeout=5)}")
+
+        started = time.monotonic()
+        missing = await notifications.wait(_job_name(project), timeout=2)
+        print(f"no message: {missing} after {time.monotonic() - started:.1f}s (the wait polls get_job next)")
+        print(f"messages received: {notifications.received}")
+    finally:
+        await asyncio.to_thread(notifications.close)
+
+
+async def run_join_example():
+    """
+    Joins two clips with notifications on and prints how long the join took.
+    """
+    from video_producer_agent.video_join_tool import video_join_tool
+
+    print("\n--- Notified Join Example ---")
+    if not os.getenv("TRANSCODER_PUBSUB_TOPIC"):
+        print("TRANSCODER_PUBSUB_TOPIC is not set; jobs would be polled.")
+        return
+    started = time.monotonic()
+    result = await video_join_tool([
+        "gs://byron-alpha-vpagent/muxed_audio_output/muxed_output_1747264766.mp4",
+        "gs://byron-alpha-vpagent/muxed_audio_output/muxed_output_1747264931.mp4",
+    ])
+    print(f"{result} in {time.monotonic() - started:.1f}s")
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    asyncio.run(run_emulator_example())
+    asyncio.run(run_join_example())
@@ -0,0 +1,73 @@
+"""
+This script tests the placement of Transcoder jobs across regions.
+
+It first simulates waves of five mux jobs offline against three regions
+capped at three jobs each, for a bucket in us-central1: the first jobs of a
+wave stay in the bucket's region, the rest spill over once it is full, and
+when us-central1's jobs start waiting minutes before they run, the script
+shows the scheduler moving the load to us-east1. It then joins the same two
+clips four times concurrently with video_join_tool and prints the region each
+job ran in. Requires GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_BUCKET,
+TRANSCODER_REGIONS and the Transcoder API for the second part.
+"""
+import asyncio
+import uuid
+from dotenv import load_dotenv
+
+from video_producer_agent.transcoder_scheduler import TranscoderScheduler, get_transcoder_scheduler
+
+load_dotenv()
+
+# Seconds a job waits before it starts in each region, per wave; us-central1 gets a backlog from wave 3.
+SIMULATED_QUEUE_LATENCY = {
+    "us-central1": [5, 5, 180, 180, 180, 180],
+    "us-east1": [20] * 6,
+    "europe-west4": [40] * 6,
+}
+
+
+def run_placement_example():
+    """
+    Places six waves of five jobs and prints where each wave ran and each region's state.
+    """
+    print("\n--- Transcoder Placement Example (offline) ---")
+    scheduler = TranscoderScheduler(regions=list(SIMULATED_QUEUE_LATENCY), max_jobs_per_region=3,
+                                    remote_penalty_seconds=60)
+    for wave in range(6):
+        placed = []
+        for _ in range(5):
+            key = uuid.uuid4().hex
+            region = scheduler.try_acquire(key, "US-CENTRAL1")
+            job_name = f"projects/demo/locations/{region}/jobs/{key}"
+            scheduler.assign(key, job_name)
+            placed.append((region, job_name))
+        print(f"wave {wave + 1}: {[region for region, _ in placed]}")
+        for region, job_name in placed:
+            scheduler.release(job_name)
+            scheduler.record_queue_latency(region, SIMULATED_QUEUE_LATENCY[region][wave])
+        print("         " + ", ".join(f"{state['region']} {state['queue_latency_s']}s" for state in scheduler.snapshot()))
+    print(f"jobs per region: {scheduler.placed}")
+
+
+async def run_join_example():
+    """
+    Joins two clips four times at once and prints the region of every job.
+    """
+    from video_producer_agent.video_join_tool import video_join_tool
+
+    print("\n--- Concurrent Join Example ---")
+    uris = [
+        "gs://byron-alpha-vpagent/muxed_audio_output/muxed_output_1747264766.mp4",
+        "gs://byron-alpha-vpagent/muxed_audio_output/muxed_output_1747264931.mp4",
+    ]
+    results = await asyncio.gather(*(video_join_tool(uris) for _ in range(4)))
+    for result in results:
+        print(result)
+    for state in get_transcoder_scheduler().snapshot():
+        print(state)
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_placement_example()
+    asyncio.run(run_join_example())
@@ -42,7 +42,33 @@ async def run_video_generation_example():
 
     print("\n--- Video Generation Tool Example Finished ---")
 
+
+async def run_multi_candidate_example():
+    """
+    Requests several candidates in one Veo operation and prints the ranking
+    (duration fit against a 5.5 second narration, black and frozen frames).
+    """
+    print("\n--- Starting Multi-Candidate Video Generation Example ---")
+
+    result = await video_generation_tool(
+        prompt="A POV shot from a vintage car driving in the rain, Canada at night, cinematic.",
+        duration_seconds=6,
+        number_of_videos=3,
+        narration_duration=5.5,
+    )
+
+    if "error_code" in result:
+        print(f"Tool returned an error: {result}")
+        return
+
+    print(f"Best candidate: {result['uri']} ({result.get('width')}x{result.get('height')}, {result.get('duration_s')}s)")
+    for alternate in result.get("alternates", []):
+        print(f"Alternate: {alternate}")
+
+    print("\n--- Multi-Candidate Video Generation Example Finished ---")
+
 # --- Script Execution ---
 if __name__ == "__main__":
     # Run the asynchronous test function
-    asyncio.run(run_video_generation_example())
\ No newline at end of file
+    asyncio.run(run_video_generation_example())
+    asyncio.run(run_multi_candidate_example())
\ No newline at end of file
@@ -5,22 +5,23 @@ from .upload_image import store_image_artifact_in_gcs
 from .image_video_generation_tool import image_and_text_to_video_tool
 
 
-from .video_length_tool import get_video_length_gcs_partial_download
-
 from .lyria_music import generate_lyria_music
 
-from .mux_music import mux_music
-
-
-from .mux_audio import get_mp3_audio_duration_gcs, mux_audio
-from .chirp_audio import  text_to_speech
-from .tools import gcs_uri_to_public_url
-from .video_join_tool import video_join_tool
+from .narration_engine import synthesize_narration
 from .video_generation_tool import video_generation_tool
-from .image_process import  process_image_tool
+from .speculative_scene import produce_scene_speculative
+from .narration_predictor import predict_duration, solve_speaking_rate
+from .batch_narration import synthesize_narrations
+from .streaming_narration import stream_text_to_speech
+from .scene_pipeline import run_scene_pipeline
+from .commercial import produce_commercial
+from .cancellation import bind_cancellation, cancel_production
+from .context_cache import cache_static_context
+from .model_config import PLANNER_MODEL
+from .progress import get_progress, long_running_tool
+from .tool_results import compact_tool
+from .workflow import build_operator_agent, build_production_agent, save_scene_plan
 
-# we cam add this into the prompt to padd the audio. otherwise, the video gets truncated 1 second afer the audio is done.
-padding_prompt= 'If the audio is shorter than 8 seconds, regenerate with a longer <break time="0.5s"/> to pad silence at the end of the text to speech audio stream. To pad 1 second use <break time="1s"/> To pad 2 seconds use <break time="2s"/>.  the narration prompt should ALWAYS end with <break time="1s"/> tag to ensure the audio not cut off.  Pad dramatic pauses. To pad 1 second use <break time="1s"/> To pad 2 seconds use <break time="2s"/>'
 prompt="""
   You are an expert Commercial director, cinematographer, script writer and Producer AI Agent. Your primary function is to
   translate unstructured user thoughts and ideas for a TV commercial into a
@@ -32,18 +33,22 @@ prompt="""
   each scene should be no more than 8 seconds long and include  the video generation prompt, the narration input for the text to speech tool, and the text overlays.
   
 
-  first generate the audio  for each scene using the text to speech tool. check the length with the get_linear16_audio_duration_gcs tool. then generate video with a length longer than the audio. Never truncate more than 1 second of audio. use dramatic pauses using ... 
+  while planning, call solve_speaking_rate with each scene's narration and target length (between 4 and 8 seconds) and use the returned speaking_rate (or 0 for automatic); if it comes back clamped, shorten or lengthen the narration and solve again. use predict_duration to compare alternative narration texts without synthesizing them. use dramatic pauses using ... and never use <break> tags, SSML is not supported by the Chirp 3 HD voices.
 
-  if audio is longer than 8 seconds, first regenerate with a faster speaking rate up to 1.3. then try a shorter prompt. Only try 3 times before giving up.
-  if the audio is shorter than 4 seconds, regenerate with a slower rate up to 0.8. 
-    
-  Mux each scenes audio stream and video stream together using the mux audio tool.
-  The final commercial, join the video clips using the video join tool and convert the GCS URI of the video to a public URL.
+  once the user has confirmed the plan, produce the whole commercial with ONE produce_commercial call: pass every scene (video_prompt, narration, voice_category, speaking_rate, and image_gcs_uri for scenes built from an uploaded image) plus the music prompt. it synthesizes, fits, generates, retries, muxes, joins, adds the music and returns the public URLs of each scene and the final video, so never call the individual tools for the same work.
+  when the user asks to change a scene afterwards, call produce_commercial again with the full updated plan, passing each unchanged scene's speaking_rate from the previous result; only the changed scenes and the final assembly are redone.
+  produce_commercial, video_generation_tool and image_and_text_to_video_tool run in the background: they return a job_id with its eta_s at once. tell the user what started and when it should be ready, then call get_progress with the job_id until its state is SUCCEEDED or FAILED, showing the progress_pct, eta_s and every new artifact's public_url. the finished job's result (or error) is the tool's result.
+  a production has a time budget (deadline_seconds, COMMERCIAL_SLO_SECONDS by default). if a result has error_code DEADLINE_EXCEEDED, do not retry blindly: tell the user which stage ran out of time and its slowest_stages, and offer fewer scenes or a longer deadline. finished scenes are cached, so a retry only redoes the rest.
+  if the user asks to stop or changes direction, call cancel_production right away, then continue with the new direction.
 
-  choose video generation prompts safe and low risk for content protection
+  fallbacks, only when the user asks for them or produce_commercial returns an error you cannot fix by editing the plan:
+  - multi-agent production: save the plan with save_scene_plan and transfer to the production agent.
+  - checkpointed run: run_scene_pipeline with a short unique run_id; if it is interrupted, have the operator resume it with the same run_id instead of regenerating anything.
+  - a single scene: produce_scene_speculative; if it reports "unfittable", shorten or speed up the narration and call it again. for a hard scene ask the video tools for number_of_videos=2 to 4 with the narration_duration, offer the alternates before regenerating, and pass regenerate=true to replace a rejected clip.
+  - narration only: synthesize_narrations for several scenes at once, stream_text_to_speech for a long voice-over, synthesize_narration for one. if a narration does not fit its clip, have the operator fit it with fit_narration_to_duration instead of regenerating it.
+  the mux, join, music mux, duration, fit, public URL and pipeline tools belong to the operator agent (on a faster model): transfer to operator with the exact uris, durations and steps, batching the steps of several scenes into one transfer.
 
-  When complete, create a musical score and generate_lyris_music and mux it with with the final video.  
-  If the video length exceeds of the length music, join the first n scenes up to music length. then join the next n scenes, Join and mux music idnependently. finally join them together. 
+  choose video generation prompts safe and low risk for content protection
 
 never use first or last names in the video generation prompt.
      example video generation prompts:
@@ -77,7 +82,7 @@ never use first or last names in the video generation prompt.
       IF a user uploads an image store it in gcs with store_image_artifact_in_gcs, then use it as the source of video for a scene using image_and_text_to_video_tool. use best judgment to know where the generate video goes. 
 
 
-    generate the commercial one scene at a time.
+    plan the commercial one scene at a time.
     show a plan of the video generation and audio generation process, and ask the user for confirmation before starting. 
   Show overall musical prompt, each scene's audio prompt, video prompt,  voice type and speed.
 
@@ -87,19 +92,31 @@ never use first or last names in the video generation prompt.
   """
 root_agent = Agent(
     name="video_producer_agent",
-    model="gemini-2.5-pro-preview-03-25",
+    # Creative planning stays on the pro model; tool execution runs on the executor model in the sub-agents.
+    model=PLANNER_MODEL,
     instruction=prompt,
-    tools=[
-        gcs_uri_to_public_url,
-        video_join_tool,
-        video_generation_tool,
-        text_to_speech,
-        mux_audio,
-        get_mp3_audio_duration_gcs,
-        mux_music,
+    before_model_callback=cache_static_context,
+    # Every tool runs under the session's cancellation token, so cancel_production can stop it.
+    before_tool_callback=bind_cancellation,
+    sub_agents=[build_production_agent(), build_operator_agent()],
+    # Every tool returns a compact MediaResult, ToolError or report dict to keep the context small.
+    tools=[compact_tool(tool) for tool in [
+        synthesize_narration,
         generate_lyria_music,
-        get_video_length_gcs_partial_download,
+        produce_scene_speculative,
+        predict_duration,
+        solve_speaking_rate,
+        synthesize_narrations,
+        stream_text_to_speech,
+        run_scene_pipeline,
+        save_scene_plan,
+        get_progress,
+        cancel_production,
+       # process_image_tool (from .image_process; import it here if it is enabled again)
+    ]] + [long_running_tool(tool) for tool in [
+        # These take minutes; they start a background job and return its job_id at once.
+        video_generation_tool,
         image_and_text_to_video_tool,
-       # process_image_tool        
-    ]
+        produce_commercial,
+    ]]
 )
@@ -0,0 +1,248 @@
+"""
+Local narration time-fitting: silence trim, padding and time-stretch.
+
+The agent used to spend whole Text-to-Speech round trips to make a narration
+fit its scene: regenerating with `<break>` tags (which Chirp 3 HD ignores, as
+SSML is not supported), or re-synthesizing at a faster or slower speaking rate.
+`fit_narration_to_duration` does the same job locally in a few milliseconds:
+
+1. trims leading and trailing silence (frame RMS below a threshold relative to the peak),
+2. time-stretches with WSOLA (pitch preserving) when the speech does not fit or
+   is under 4 seconds, within a bounded ratio so the voice never sounds
+   chipmunked or dragged,
+3. pads silence at the end (and a short lead-in) to reach the target length.
+
+The fitted narration is written as 16-bit PCM WAV and uploaded next to the source.
+"""
+import io
+import os
+import uuid
+import wave
+from typing import TYPE_CHECKING, Dict, Tuple
+
+from .video_length_tool import parse_gcs_uri
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Frames used for RMS silence detection.
+SILENCE_FRAME_MS = 20
+# A frame is silent when its RMS is this many dB below the loudest frame.
+SILENCE_THRESHOLD_DB = -40.0
+# Silence kept around the speech after trimming.
+KEEP_SILENCE_MS = 60
+# Silence inserted before the speech when padding.
+LEAD_IN_MS = 150
+
+# Playback-speed ratios allowed for time-stretching (>1 speeds up, <1 slows down).
+MAX_SPEEDUP = 1.3
+MAX_SLOWDOWN = 0.8
+# Only stretch when the mismatch is larger than this; otherwise trim/pad is enough.
+STRETCH_TOLERANCE = 0.02
+# Speech shorter than this is slowed down (bounded by MAX_SLOWDOWN) before padding,
+# mirroring the agent rule for narrations under 4 seconds.
+MIN_SPEECH_SECONDS = 4.0
+
+# WSOLA parameters.
+WSOLA_FRAME_MS = 40
+WSOLA_SEARCH_MS = 10
+
+
+def _decode_audio(data: bytes, file_extension: str) -> Tuple["np.ndarray", int]:
+    """Decodes audio bytes to mono float32 samples in [-1, 1] and returns (samples, sample_rate)."""
+    import numpy as np
+
+    if data[:4] == b"RIFF":
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            sample_rate = wav.getframerate()
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            raw = wav.readframes(wav.getnframes())
+        if width != 2:
+            raise ValueError(f"Only 16-bit PCM WAV is supported, got {width * 8}-bit.")
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        return samples, sample_rate
+
+    # MP3 (and anything else ffmpeg understands) goes through pydub with the bundled ffmpeg.
+    import imageio_ffmpeg
+    from pydub import AudioSegment
+
+    AudioSegment.converter = imageio_ffmpeg.get_ffmpeg_exe()
+    segment = AudioSegment.from_file(io.BytesIO(data), format=file_extension.lstrip(".") or None)
+    segment = segment.set_channels(1).set_sample_width(2)
+    samples = np.array(segment.get_array_of_samples(), dtype=np.float32) / 32768.0
+    return samples, segment.frame_rate
+
+
+def _encode_wav(samples: "np.ndarray", sample_rate: int) -> bytes:
+    """Encodes mono float samples as 16-bit PCM WAV bytes."""
+    import numpy as np
+
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def trim_silence(samples: "np.ndarray", sample_rate: int) -> "np.ndarray":
+    """Removes leading and trailing silence, keeping KEEP_SILENCE_MS around the speech."""
+    import numpy as np
+
+    frame = max(1, int(sample_rate * SILENCE_FRAME_MS / 1000))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return samples
+    frames = samples[: n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    threshold = rms.max() * (10 ** (SILENCE_THRESHOLD_DB / 20.0))
+    voiced = np.nonzero(rms > threshold)[0]
+    if len(voiced) == 0:
+        return samples[:0]
+    keep = int(sample_rate * KEEP_SILENCE_MS / 1000)
+    start = max(0, voiced[0] * frame - keep)
+    end = min(len(samples), (voiced[-1] + 1) * frame + keep)
+    return samples[start:end]
+
+
+def time_stretch(samples: "np.ndarray", sample_rate: int, speed: float) -> "np.ndarray":
+    """
+    Changes the tempo by `speed` (>1 is faster) without changing pitch, using WSOLA.
+
+    Overlapping Hann-windowed frames are read from the input at `speed` times the
+    output hop, and each frame is shifted within a small search window to the
+    position whose waveform best continues the previous output frame, which
+    avoids the phasing artefacts of plain overlap-add.
+    """
+    import numpy as np
+
+    if abs(speed - 1.0) < 1e-6 or len(samples) == 0:
+        return samples
+    frame_len = max(64, int(sample_rate * WSOLA_FRAME_MS / 1000))
+    frame_len += frame_len % 2
+    hop_out = frame_len // 2
+    hop_in = hop_out * speed
+    search = int(sample_rate * WSOLA_SEARCH_MS / 1000)
+    window = np.hanning(frame_len).astype(np.float32)
+
+    padded = np.concatenate([np.zeros(search, dtype=np.float32), samples, np.zeros(frame_len + search, dtype=np.float32)])
+    out_len = int(len(samples) / speed) + frame_len
+    output = np.zeros(out_len + frame_len, dtype=np.float32)
+    norm = np.zeros_like(output)
+
+    # Natural continuation of the previously copied frame, used as the similarity target.
+    previous_tail = None
+    out_pos = 0
+    k = 0
+    while True:
+        nominal = int(round(k * hop_in)) + search
+        if nominal + frame_len + search > len(padded) or out_pos >= out_len:
+            break
+        if previous_tail is None:
+            best = nominal
+        else:
+            region = padded[nominal - search: nominal + search + hop_out]
+            # Cross-correlate the candidate region with the expected continuation.
+            corr = np.correlate(region, previous_tail, mode="valid")
+            best = nominal - search + int(np.argmax(corr))
+        chunk = padded[best: best + frame_len]
+        output[out_pos: out_pos + frame_len] += chunk * window
+        norm[out_pos: out_pos + frame_len] += window
+        previous_tail = padded[best + hop_out: best + hop_out + hop_out]
+        out_pos += hop_out
+        k += 1
+
+    norm[norm < 1e-6] = 1.0
+    stretched = output / norm
+    return stretched[: int(len(samples) / speed)]
+
+
+def fit_samples(samples: "np.ndarray", sample_rate: int, target_seconds: float) -> Tuple["np.ndarray", Dict]:
+    """
+    Trims, stretches and pads samples towards `target_seconds`.
+
+    Returns:
+        (fitted_samples, report) where report holds original/trimmed/fitted durations and the speed applied.
+    """
+    import numpy as np
+
+    original_seconds = len(samples) / sample_rate
+    trimmed = trim_silence(samples, sample_rate)
+    trimmed_seconds = len(trimmed) / sample_rate
+    lead_in = int(sample_rate * LEAD_IN_MS / 1000)
+    target_len = int(round(target_seconds * sample_rate))
+
+    # Speech (plus lead-in) has to fit inside the target.
+    available = max(1, target_len - lead_in)
+    speed = 1.0
+    if len(trimmed) > available * (1 + STRETCH_TOLERANCE):
+        speed = min(MAX_SPEEDUP, len(trimmed) / available)
+    else:
+        # Narration is very short: slow it down (bounded) before padding the rest with silence.
+        wanted = min(available, int(MIN_SPEECH_SECONDS * sample_rate))
+        if len(trimmed) < wanted * (1 - STRETCH_TOLERANCE):
+            speed = max(MAX_SLOWDOWN, len(trimmed) / wanted)
+    fitted = time_stretch(trimmed, sample_rate, speed)
+
+    if len(fitted) + lead_in <= target_len:
+        tail = target_len - len(fitted) - lead_in
+        fitted = np.concatenate([np.zeros(lead_in, dtype=np.float32), fitted, np.zeros(tail, dtype=np.float32)])
+    elif target_len < len(fitted) <= target_len * (1 + STRETCH_TOLERANCE):
+        # Within tolerance: drop the kept trailing silence rather than stretching.
+        fitted = fitted[:target_len]
+
+    report = {
+        "original_duration": round(original_seconds, 3),
+        "trimmed_duration": round(trimmed_seconds, 3),
+        "fitted_duration": round(len(fitted) / sample_rate, 3),
+        "speed": round(speed, 3),
+        "fits": len(fitted) <= target_len + 1,
+    }
+    return fitted, report
+
+
+def fit_narration_to_duration(audio_uri: str, target_duration: float) -> dict:
+    """
+    Fits a synthesized narration to a target length locally instead of regenerating it.
+
+    Trims leading/trailing silence, time-stretches the speech without changing pitch
+    (between 0.8x and 1.3x speed) when it is too long or shorter than 4 seconds, and pads
+    silence to reach target_duration exactly. Use this instead of regenerating speech
+    with a different speaking rate or <break> tags. If fits is False the narration is
+    still too long even at 1.3x; shorten the text and synthesize again.
+
+    Args:
+        audio_uri: GCS URI of the narration (MP3 or 16-bit WAV) from the text to speech tool.
+        target_duration: Desired narration length in seconds (e.g. the scene's video duration).
+
+    Returns:
+        dict: uri of the fitted WAV narration, original_duration, trimmed_duration,
+              fitted_duration, speed and fits. Or an error message string.
+    """
+    from google.cloud import storage
+
+    parsed_uri = parse_gcs_uri(audio_uri)
+    if not parsed_uri:
+        return f"Error: Invalid GCS audio URI: {audio_uri}. Input URIs must start with 'gs://'."
+    if target_duration <= 0:
+        return "Error: target_duration must be positive."
+    bucket_name, blob_name = parsed_uri
+
+    try:
+        bucket = storage.Client().bucket(bucket_name)
+        data = bucket.blob(blob_name).download_as_bytes()
+        samples, sample_rate = _decode_audio(data, os.path.splitext(blob_name)[1])
+        fitted, report = fit_samples(samples, sample_rate, target_duration)
+
+        fitted_blob_name = f"fitted/{os.path.splitext(os.path.basename(blob_name))[0]}_{uuid.uuid4().hex[:8]}.wav"
+        bucket.blob(fitted_blob_name).upload_from_string(_encode_wav(fitted, sample_rate), content_type="audio/wav")
+        fitted_uri = f"gs://{bucket_name}/{fitted_blob_name}"
+        print(f"Fitted narration {audio_uri} -> {fitted_uri}: {report}")
+        return {"uri": fitted_uri, **report}
+    except Exception as e:
+        return f"Error fitting narration '{audio_uri}': {type(e).__name__}: {e}"
@@ -0,0 +1,257 @@
+"""
+Headless batch production of many commercials from a JSONL file.
+
+`adk web` produces one commercial per conversation. This command produces a
+whole file of them unattended:
+
+    python -m video_producer_agent.batch briefs.jsonl --concurrency 3
+
+Each line is either a structured plan (the arguments of produce_commercial:
+scenes plus the optional music_prompt, music_negative_prompt and music_volume)
+or a brief ({"brief": ...}, or title and body like requests.jsonl) that the
+planner model first turns into a plan. An optional "id" names the line.
+
+Productions run concurrently, capped both by the number of productions
+(--concurrency) and by the number of scenes rendering at once across all of
+them (--max-scenes), which bounds the Veo, Text-to-Speech and Transcoder load.
+Every finished line is appended to the results manifest (output URIs, wall
+time and the per-stage timings of its deadline report, see deadline), so an
+interrupted batch keeps what it produced. The summary reports the throughput
+in commercials per hour and the median time of each stage.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from .chirp_audio import VOICE_CATEGORY_DEFAULTS
+from .commercial import produce_commercial
+from .deadline import production_deadline, production_slo_seconds, within_deadline
+from .model_config import PLANNER_MODEL
+from .tool_results import ToolError
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "3"))
+# Scenes rendering at once across every production of the batch.
+BATCH_MAX_SCENES = int(os.getenv("BATCH_MAX_SCENES", "12"))
+PLAN_KEYS = ("scenes", "music_prompt", "music_negative_prompt", "music_volume")
+PLANNING_TIMEOUT_SECONDS = 300.0
+
+PLANNER_INSTRUCTION = f"""
+You are a TV commercial director. Turn the brief into a production plan of 3 to 6 scenes.
+Every scene has a video_prompt (a vivid, self-contained shot description without any first or
+last names), a narration of 8 to 16 words for text to speech (plain text, no stage directions)
+and a voice_category, the same for every scene, one of: {", ".join(VOICE_CATEGORY_DEFAULTS)}.
+The last scene ends with a call to action. Add a music_prompt describing the background score.
+"""
+
+
+def load_briefs(path: str) -> List[Dict]:
+    """
+    Reads a JSONL file of plans and briefs.
+
+    Returns one dict per non-empty line with its id, and either its plan or its brief text.
+
+    Raises:
+        ValueError: Naming the line that is not a JSON object or has neither scenes nor a brief.
+    """
+    entries = []
+    with open(path) as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number}: invalid JSON: {e}")
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {number}: expected an object.")
+            entry = {"id": str(record.get("id") or record.get("request_id") or f"line-{number}")}
+            if record.get("scenes"):
+                entry["plan"] = {key: record[key] for key in PLAN_KEYS if key in record}
+            else:
+                brief = record.get("brief") or "\n\n".join(
+                    str(record[key]) for key in ("title", "body") if record.get(key)
+                )
+                if not brief:
+                    raise ValueError(f"Line {number}: needs either scenes or a brief (or title and body).")
+                entry["brief"] = brief
+            entries.append(entry)
+    return entries
+
+
+async def plan_from_brief(brief: str) -> Dict:
+    """Asks the planner model for a produce_commercial plan for one brief."""
+    from google.genai import types
+
+    from .veo_client import get_genai_client
+
+    scene_schema = types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "video_prompt": types.Schema(type=types.Type.STRING),
+            "narration": types.Schema(type=types.Type.STRING),
+            "voice_category": types.Schema(type=types.Type.STRING, enum=list(VOICE_CATEGORY_DEFAULTS)),
+        },
+        required=["video_prompt", "narration", "voice_category"],
+    )
+    request = get_genai_client().aio.models.generate_content(
+        model=PLANNER_MODEL,
+        contents=brief,
+        config=types.GenerateContentConfig(
+            system_instruction=PLANNER_INSTRUCTION,
+            response_mime_type="application/json",
+            response_schema=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    "scenes": types.Schema(type=types.Type.ARRAY, items=scene_schema),
+                    "music_prompt": types.Schema(type=types.Type.STRING),
+                },
+                required=["scenes", "music_prompt"],
+            ),
+        ),
+    )
+    response = await within_deadline(request, PLANNING_TIMEOUT_SECONDS)
+    return json.loads(response.text)
+
+
+class SceneLimiter:
+    """Caps the scenes rendering at once; a production holds one slot per scene while it runs."""
+
+    def __init__(self, max_scenes: int):
+        self.max_scenes = max(1, max_scenes)
+        self.in_use = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, scenes: int) -> int:
+        # A production larger than the cap runs alone rather than never.
+        slots = min(scenes, self.max_scenes)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_use + slots <= self.max_scenes)
+            self.in_use += slots
+        return slots
+
+    async def release(self, slots: int) -> None:
+        async with self._condition:
+            self.in_use -= slots
+            self._condition.notify_all()
+
+
+def stage_key(stage: str) -> str:
+    """Groups a stage of the deadline report across scenes: ".../scene-2/video/veo operation" -> "video/veo operation"."""
+    path = stage.split("/commercial/", 1)[-1]
+    return re.sub(r"-\d+\b", "", re.sub(r"^scene-\d+/", "", path))
+
+
+async def _produce_entry(entry: Dict, limiter: SceneLimiter, deadline_seconds: float) -> Dict:
+    started = time.monotonic()
+    result: Dict = {"id": entry["id"]}
+    slots = 0
+    with production_deadline(entry["id"], deadline_seconds or production_slo_seconds()) as run:
+        try:
+            plan = entry.get("plan")
+            if plan is None:
+                planning_started = time.monotonic()
+                plan = await plan_from_brief(entry["brief"])
+                result["planning_s"] = round(time.monotonic() - planning_started, 2)
+                result["plan"] = plan
+            slots = await limiter.acquire(len(plan.get("scenes") or [1]))
+            produced = await produce_commercial(
+                plan.get("scenes") or [], plan.get("music_prompt", ""), plan.get("music_negative_prompt", ""),
+                plan.get("music_volume", 0.3), deadline_seconds=max(run.remaining(), 1.0),
+            )
+        except Exception as e:
+            produced = ToolError.from_exception(e).to_dict()
+        finally:
+            if slots:
+                await limiter.release(slots)
+
+    if isinstance(produced, dict) and "final_uri" in produced:
+        result.update(status="SUCCEEDED", final_uri=produced["final_uri"],
+                      final_public_url=produced["final_public_url"], duration=produced["duration"],
+                      scenes=[scene["muxed_uri"] for scene in produced["scenes"]],
+                      built=len(produced["built"]), reused=len(produced["reused"]))
+    elif isinstance(produced, dict):
+        result.update(status="FAILED", error_code=produced.get("error_code"), error=produced.get("message"),
+                      stage=produced.get("stage"))
+    else:
+        result.update(status="FAILED", error=str(produced))
+    result["wall_s"] = round(time.monotonic() - started, 2)
+    result["stages"] = run.report.summary()
+    return result
+
+
+def summarize(results: List[Dict], wall_seconds: float) -> Dict:
+    """Throughput of the batch and the median time of each stage over its commercials."""
+    succeeded = [result for result in results if result["status"] == "SUCCEEDED"]
+    stage_times: Dict[str, List[float]] = {}
+    for result in results:
+        for entry in result.get("stages", []):
+            if "/commercial/" in entry["stage"]:
+                stage_times.setdefault(stage_key(entry["stage"]), []).append(entry["used_s"])
+    return {
+        "commercials": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "wall_s": round(wall_seconds, 1),
+        "commercials_per_hour": round(len(succeeded) * 3600 / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "median_commercial_s": round(statistics.median(r["wall_s"] for r in succeeded), 1) if succeeded else None,
+        "median_stage_s": {key: round(statistics.median(times), 1) for key, times in sorted(stage_times.items())},
+    }
+
+
+async def run_batch(input_path: str, output_path: Optional[str] = None, concurrency: int = BATCH_CONCURRENCY,
+                    max_scenes: int = BATCH_MAX_SCENES, deadline_seconds: float = 0.0) -> Dict:
+    """
+    Produces every plan or brief of input_path and appends one result per line to output_path.
+
+    Returns the batch summary (also written next to the manifest as <output>.summary.json).
+    """
+    entries = load_briefs(input_path)
+    output_path = output_path or f"{os.path.splitext(input_path)[0]}.results.jsonl"
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = SceneLimiter(max_scenes)
+    results: List[Dict] = []
+    started = time.monotonic()
+    print(f"Producing {len(entries)} commercials, {concurrency} at a time and at most {max_scenes} scenes at once...")
+
+    with open(output_path, "a") as manifest:
+        async def produce(entry: Dict) -> None:
+            async with semaphore:
+                result = await _produce_entry(entry, limiter, deadline_seconds)
+            results.append(result)
+            manifest.write(json.dumps(result) + "\n")
+            manifest.flush()
+            print(f"[{len(results)}/{len(entries)}] {result['id']}: {result['status']} in {result['wall_s']}s "
+                  f"{result.get('final_public_url') or result.get('error', '')}")
+
+        await asyncio.gather(*(produce(entry) for entry in entries))
+
+    summary = summarize(results, time.monotonic() - started)
+    with open(f"{os.path.splitext(output_path)[0]}.summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"✅ {summary['succeeded']} of {summary['commercials']} commercials in {summary['wall_s']}s: "
+          f"{summary['commercials_per_hour']} commercials per hour. Manifest: {output_path}")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Produce every commercial plan or brief of a JSONL file.")
+    parser.add_argument("input", help="JSONL file with one plan (scenes, music_prompt, ...) or brief per line.")
+    parser.add_argument("--output", help="Results manifest (JSONL). Defaults to <input>.results.jsonl.")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help=f"Productions running at once. Defaults to BATCH_CONCURRENCY ({BATCH_CONCURRENCY}).")
+    parser.add_argument("--max-scenes", type=int, default=BATCH_MAX_SCENES,
+                        help=f"Scenes rendering at once across all productions. Defaults to BATCH_MAX_SCENES "
+                             f"({BATCH_MAX_SCENES}).")
+    parser.add_argument("--deadline-seconds", type=float, default=0,
+                        help="Time budget of each commercial, planning included. Defaults to COMMERCIAL_SLO_SECONDS.")
+    args = parser.parse_args(argv)
+    asyncio.run(run_batch(args.input, args.output, args.concurrency, args.max_scenes, args.deadline_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Batch narration: synthesize every scene's narration in one tool call.
+
+Calling text_to_speech once per scene costs one LLM turn and one full TTS round
+trip per scene, back to back. `synthesize_narrations` fans all scenes out at
+once on a single async Text-to-Speech client (one shared gRPC channel), bounded
+by a semaphore so a long script does not trip the per-minute quota. Each MP3 is
+measured in memory, so no GCS re-download is needed for the duration, and the
+uploads run in parallel worker threads. Narration for a whole commercial takes
+about as long as its slowest scene.
+"""
+import asyncio
+import io
+import os
+import time
+import uuid
+from typing import Dict, List
+
+from .chirp_audio import build_synthesis_request, create_tts_async_client, resolve_voice
+from .deadline import UPLOAD_TIMEOUT_SECONDS, call_timeout
+
+# Concurrent synthesize_speech requests in flight per batch.
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "8"))
+TTS_TIMEOUT_SECONDS = 300.0
+
+
+def _broadcast(values: List, count: int, name: str) -> List:
+    """Expands a single-element list to `count` items; other lengths must match exactly."""
+    if len(values) == 1:
+        return list(values) * count
+    if len(values) != count:
+        raise ValueError(f"{name} must have 1 or {count} items, got {len(values)}.")
+    return list(values)
+
+
+def mp3_duration_from_bytes(audio_content: bytes) -> float:
+    """Returns the duration in seconds of an in-memory MP3."""
+    from mutagen.mp3 import MP3
+
+    return float(MP3(io.BytesIO(audio_content)).info.length)
+
+
+def _upload_mp3(bucket, blob_name: str, audio_content: bytes) -> None:
+    bucket.blob(blob_name).upload_from_string(audio_content, content_type="audio/mpeg",
+                                              timeout=call_timeout(UPLOAD_TIMEOUT_SECONDS))
+
+
+async def synthesize_narrations(
+    texts: List[str],
+    voice_categories: List[str],
+    speaking_rates: List[float],
+) -> dict:
+    """
+    Synthesizes the narration for many scenes concurrently and returns every audio URI with its duration.
+
+    Use this instead of calling text_to_speech once per scene. The three lists are
+    parallel: item i is narrated with voice_categories[i] at speaking_rates[i]. A list
+    with a single element applies to every text (e.g. one voice for the whole commercial).
+
+    Args:
+        texts: Plain narration text for each scene, in scene order.
+        voice_categories: Chirp 3 HD voice categories accepted by text_to_speech (1 or len(texts) items).
+        speaking_rates: Speed of speech for each scene, 1.0 is normal (1 or len(texts) items).
+
+    Returns:
+        dict: narrations (a list in scene order of {"index", "uri", "duration", "voice_category",
+              "speaking_rate"} or {"index", "error"}), total_duration, succeeded, failed
+              and wall_seconds. Or an error message string.
+    """
+    from google.cloud import storage
+
+    if not texts:
+        return "Error: texts must contain at least one narration."
+    try:
+        voice_categories = _broadcast(voice_categories, len(texts), "voice_categories")
+        speaking_rates = _broadcast(speaking_rates, len(texts), "speaking_rates")
+        synthesis_requests = [
+            build_synthesis_request(text, voice, float(rate))
+            for text, voice, rate in zip(texts, voice_categories, speaking_rates)
+        ]
+        normalized_voices = [resolve_voice(voice)[0] for voice in voice_categories]
+    except (ValueError, TypeError) as e:
+        return f"Error: {e}"
+
+    gcs_bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET", "byron-alpha-vpagent")
+    semaphore = asyncio.Semaphore(max(1, TTS_MAX_CONCURRENCY))
+    started = time.monotonic()
+    try:
+        bucket = storage.Client().bucket(gcs_bucket_name)
+        client = create_tts_async_client()
+        setup_error = None
+    except Exception as e:
+        # Reported on every scene, so the result keeps its per-scene shape.
+        setup_error = f"{type(e).__name__}: {e}"
+
+    async def narrate(index: int) -> Dict:
+        if setup_error:
+            return {"index": index, "error": setup_error}
+        try:
+            async with semaphore:
+                response = await client.synthesize_speech(**synthesis_requests[index], timeout=call_timeout(TTS_TIMEOUT_SECONDS))
+            audio_content = response.audio_content
+            duration = mp3_duration_from_bytes(audio_content)
+            blob_name = f"chirp_output_{uuid.uuid4()}.mp3"
+            # Uploads happen outside the semaphore so they overlap with the remaining syntheses.
+            await asyncio.to_thread(_upload_mp3, bucket, blob_name, audio_content)
+        except Exception as e:
+            return {"index": index, "error": f"{type(e).__name__}: {e}"}
+
+        from .narration_predictor import get_predictor
+        try:
+            get_predictor().record(texts[index], normalized_voices[index], float(speaking_rates[index]), duration)
+        except Exception as e:
+            # The narration is ready; a missed measurement only costs the predictor one sample.
+            print(f"WARNING: Could not record narration measurement for scene {index}: {e}")
+        return {
+            "index": index,
+            "uri": f"gs://{gcs_bucket_name}/{blob_name}",
+            "duration": round(duration, 3),
+            "voice_category": normalized_voices[index],
+            "speaking_rate": float(speaking_rates[index]),
+        }
+
+    print(f"Synthesizing {len(texts)} narrations with up to {TTS_MAX_CONCURRENCY} requests in flight...")
+    narrations = await asyncio.gather(*(narrate(i) for i in range(len(texts))))
+    wall_seconds = time.monotonic() - started
+
+    succeeded = [n for n in narrations if "uri" in n]
+    print(f"✅ {len(succeeded)}/{len(narrations)} narrations ready in {wall_seconds:.1f}s.")
+    return {
+        "narrations": narrations,
+        "total_duration": round(sum(n["duration"] for n in succeeded), 3),
+        "succeeded": len(succeeded),
+        "failed": len(narrations) - len(succeeded),
+        "wall_seconds": round(wall_seconds, 2),
+    }
@@ -0,0 +1,344 @@
+"""
+Session-wide cancellation of in-flight Veo operations and Transcoder jobs.
+
+Stopping a session or changing direction used to leave every Veo operation
+and Transcoder job it had started running to completion, consuming quota and
+delaying other work. Each session now has a `CancellationToken`:
+
+    bind_cancellation   before_tool_callback of every agent; makes the
+                        session's token current for the tool call and
+                        everything it starts (background jobs inherit it)
+    in_flight           registers a Veo operation or Transcoder job with the
+                        current token while a tool waits on it
+    cancellable_sleep   the polling sleep of those waits; raises
+                        OperationCancelled within a second of a cancel
+                        (and DeadlineExceeded when the run's deadline passes)
+    cancel_production   agent tool that cancels the session's token
+
+Cancelling a token cancels the background jobs it started, deletes its
+Transcoder jobs, cancels its Veo operations and deletes their partial outputs
+from GCS. A Veo operation that refuses to be cancelled is left to finish and
+its outputs are deleted as soon as it does. The session then gets a fresh
+token, so later tool calls run normally. A generation shared by several
+sessions (see generation_ledger) runs outside their tokens; cancelling one
+session only stops its wait, and the generation is cancelled when the last
+session waiting on it is.
+"""
+import asyncio
+import contextlib
+import contextvars
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from .deadline import DeadlineExceeded, check_deadline
+
+# Longest a cancelled tool keeps sleeping before it notices.
+CANCEL_CHECK_INTERVAL_SECONDS = 0.5
+# Poll interval while waiting for an uncancellable Veo operation to finish before deleting its outputs.
+ABANDONED_OPERATION_POLL_SECONDS = 30
+# Give up deleting the outputs of an uncancellable operation after this long.
+ABANDONED_OPERATION_TIMEOUT_SECONDS = 1800
+
+# Session state key of the id that scopes a session's token and background jobs.
+SESSION_SCOPE_STATE_KEY = "cancellation_scope"
+
+TRANSCODER_JOB = "transcoder_job"
+VEO_OPERATION = "veo_operation"
+
+
+class OperationCancelled(Exception):
+    """Raised inside a tool whose session was cancelled."""
+
+    error_code = "CANCELLED"
+
+
+class CancellationToken:
+    """Cancellation state and in-flight backend work of one session."""
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self.cancelled = False
+        self.reason = ""
+        self._lock = threading.Lock()
+        self._resources: Dict[str, Dict] = {}
+        self._tasks: set = set()
+
+    def check(self) -> None:
+        """Raises OperationCancelled if the token was cancelled."""
+        if self.cancelled:
+            raise OperationCancelled(f"Cancelled: {self.reason or 'the session was cancelled'}.")
+
+    def register(self, kind: str, name: str, output_uri: Optional[str] = None) -> None:
+        resource = {"kind": kind, "name": name, "output_uri": output_uri}
+        with self._lock:
+            if not self.cancelled:
+                self._resources[name] = resource
+                return
+        # Started while the token was being cancelled: stop it right away.
+        asyncio.get_running_loop().create_task(_clean_up(resource))
+        self.check()
+
+    def unregister(self, name: str) -> bool:
+        """Returns False if the resource was already taken over by a cancel."""
+        with self._lock:
+            return self._resources.pop(name, None) is not None
+
+    def track_task(self, task: "asyncio.Task") -> None:
+        """Cancels the task with the token (used for background jobs)."""
+        with self._lock:
+            self._tasks.add(task)
+        task.add_done_callback(self._forget_task)
+
+    def _forget_task(self, task) -> None:
+        with self._lock:
+            self._tasks.discard(task)
+
+    async def cancel(self, reason: str = "") -> Dict:
+        """
+        Cancels the token, its background jobs and its in-flight backend work.
+
+        Returns a report with the cancelled jobs and operations, the number of deleted
+        outputs and any cleanup errors.
+        """
+        with self._lock:
+            self.cancelled = True
+            self.reason = reason
+            resources = list(self._resources.values())
+            self._resources.clear()
+            tasks = [task for task in self._tasks if not task.done()]
+        for task in tasks:
+            task.cancel()
+
+        results = await asyncio.gather(*(_clean_up(resource) for resource in resources), return_exceptions=True)
+        report = {"background_jobs": len(tasks), "transcoder_jobs": [], "veo_operations": [],
+                  "deleted_outputs": 0, "errors": []}
+        for resource, result in zip(resources, results):
+            if isinstance(result, Exception):
+                report["errors"].append(f"{resource['name']}: {type(result).__name__}: {result}")
+                continue
+            key = "transcoder_jobs" if resource["kind"] == TRANSCODER_JOB else "veo_operations"
+            report[key].append(resource["name"].rsplit("/", 1)[-1])
+            report["deleted_outputs"] += result
+        print(f"Cancelled {self.scope}: {report}")
+        return report
+
+
+_tokens_lock = threading.Lock()
+_tokens: Dict[str, CancellationToken] = {}
+_current_token: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    "cancellation_token", default=None
+)
+
+
+def get_session_token(session_id: str) -> CancellationToken:
+    """Returns the session's live (not cancelled) token."""
+    with _tokens_lock:
+        token = _tokens.get(session_id)
+        if token is None or token.cancelled:
+            token = _tokens[session_id] = CancellationToken(session_id)
+        return token
+
+
+def current_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+def bind_session(session_id: str) -> CancellationToken:
+    """Makes the session's token current for the calling task and the tasks it creates."""
+    token = get_session_token(session_id)
+    _current_token.set(token)
+    return token
+
+
+def unbind_session() -> None:
+    """Runs the calling task outside any session, e.g. work shared by several sessions."""
+    _current_token.set(None)
+
+
+def session_scope(state) -> str:
+    """
+    Returns the id of the session that owns `state` (a tool's or callback's state), creating it on
+    first use. ADK writes state through to the session at once, so later calls see the same id.
+    """
+    scope = state.get(SESSION_SCOPE_STATE_KEY)
+    if not scope:
+        scope = uuid.uuid4().hex
+        state[SESSION_SCOPE_STATE_KEY] = scope
+    return scope
+
+
+def bind_cancellation(tool, args, tool_context):
+    """before_tool_callback: runs the tool under its session's cancellation token."""
+    bind_session(session_scope(tool_context.state))
+    return None
+
+
+def check_cancelled() -> None:
+    """Raises OperationCancelled if the current session was cancelled; call before starting backend work."""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+async def cancellable_sleep(seconds: float) -> None:
+    """
+    asyncio.sleep that raises OperationCancelled soon after the current session is cancelled,
+    or DeadlineExceeded once the current deadline (see deadline) passes.
+    """
+    token = _current_token.get()
+    wake_at = time.monotonic() + seconds
+    while True:
+        if token is not None:
+            token.check()
+        check_deadline()
+        remaining = wake_at - time.monotonic()
+        if remaining <= 0:
+            return
+        await asyncio.sleep(min(remaining, CANCEL_CHECK_INTERVAL_SECONDS))
+
+
+@contextlib.contextmanager
+def in_flight(kind: str, name: str, output_uri: Optional[str] = None):
+    """
+    Registers a Transcoder job or Veo operation with the current token while it runs.
+
+    If the wait is abandoned (its deadline passed, or its task was cancelled because a
+    sibling failed), the job or operation is stopped and its outputs deleted as well.
+    """
+    token = _current_token.get()
+    if token is not None:
+        token.register(kind, name, output_uri)
+    try:
+        yield
+    except (DeadlineExceeded, asyncio.CancelledError):
+        if token is None or token.unregister(name):
+            asyncio.get_running_loop().create_task(_clean_up({"kind": kind, "name": name, "output_uri": output_uri}))
+        raise
+    finally:
+        if token is not None:
+            token.unregister(name)
+
+
+async def cancel_session(session_id: str, reason: str = "") -> Dict:
+    """Cancels everything the session started; its next tool call gets a fresh token."""
+    with _tokens_lock:
+        token = _tokens.pop(session_id, None)
+    if token is None:
+        return {"background_jobs": 0, "transcoder_jobs": [], "veo_operations": [], "deleted_outputs": 0, "errors": []}
+    return await token.cancel(reason)
+
+
+async def cancel_production(reason: str, tool_context) -> dict:
+    """
+    Stops all production work of this session: running Veo generations, Transcoder jobs
+    and background jobs, and deletes their partial outputs.
+
+    Call it as soon as the user asks to stop or changes direction in a way that makes
+    the running work useless. Work started after this call runs normally.
+
+    Args:
+        reason (str): Short reason, e.g. "user changed the concept".
+
+    Returns:
+        dict: background_jobs (number cancelled), transcoder_jobs and veo_operations (ids
+        cancelled), deleted_outputs and errors.
+    """
+    scope = session_scope(tool_context.state)
+    report = await cancel_session(scope, reason)
+    # This call ran under the cancelled token; the rest of the turn uses the fresh one.
+    bind_session(scope)
+    return report
+
+
+async def _clean_up(resource: Dict) -> int:
+    """Stops one resource and deletes its partial outputs; returns the number of deleted objects."""
+    if resource["kind"] == TRANSCODER_JOB:
+        return await _delete_transcoder_job(resource["name"])
+    return await _cancel_veo_operation(resource["name"], resource["output_uri"])
+
+
+async def _delete_transcoder_job(job_name: str) -> int:
+    from google.api_core.exceptions import NotFound
+    from google.cloud.video import transcoder_v1
+
+    from .transcoder_jobs import transcoder_output_uri
+
+    client = transcoder_v1.TranscoderServiceAsyncClient()
+    try:
+        job = await client.get_job(name=job_name)
+        await client.delete_job(name=job_name)
+    except NotFound:
+        return 0
+    print(f"Deleted Transcoder job {job_name}.")
+    # Transcoder writes the output when the job completes; remove anything it got to.
+    return await asyncio.to_thread(_delete_outputs, transcoder_output_uri(job))
+
+
+def _cancel_veo_request(operation_name: str) -> bool:
+    """Asks Vertex AI to cancel the operation; returns False if it cannot be cancelled."""
+    if os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "").lower() not in ("1", "true"):
+        return False
+    from .gcp_auth import get_access_token, get_http_session
+
+    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+    response = get_http_session().post(
+        f"https://{location}-aiplatform.googleapis.com/v1/{operation_name}:cancel",
+        headers={"Authorization": f"Bearer {get_access_token()}"},
+        timeout=30,
+    )
+    return response.ok
+
+
+async def _cancel_veo_operation(operation_name: str, output_uri: Optional[str]) -> int:
+    cancelled = await asyncio.to_thread(_cancel_veo_request, operation_name)
+    print(f"Veo operation {operation_name} {'cancelled' if cancelled else 'cannot be cancelled'}.")
+    if not output_uri:
+        return 0
+    deleted = await asyncio.to_thread(_delete_outputs, output_uri, True)
+    if not cancelled:
+        asyncio.get_running_loop().create_task(_delete_when_done(operation_name, output_uri))
+    return deleted
+
+
+async def _delete_when_done(operation_name: str, output_uri: str) -> None:
+    """Waits for an uncancellable Veo operation without the session's token and deletes its outputs."""
+    from google.genai import types
+
+    from .veo_client import get_genai_client
+
+    unbind_session()
+    client = get_genai_client()
+    operation = types.GenerateVideosOperation(name=operation_name)
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < ABANDONED_OPERATION_TIMEOUT_SECONDS:
+            operation = await client.aio.operations.get(operation)
+            if operation.done:
+                deleted = await asyncio.to_thread(_delete_outputs, output_uri, True)
+                print(f"Deleted {deleted} outputs of abandoned Veo operation {operation_name}.")
+                return
+            await asyncio.sleep(ABANDONED_OPERATION_POLL_SECONDS)
+    except Exception as e:
+        print(f"WARNING: Could not clean up abandoned Veo operation {operation_name}: {e}")
+
+
+def _delete_outputs(uri: str, prefix: bool = False) -> int:
+    """Deletes the object at `uri` (or every object under it); returns the number deleted."""
+    from google.cloud import storage
+
+    from .video_length_tool import parse_gcs_uri
+
+    parsed_uri = parse_gcs_uri(uri)
+    if not parsed_uri:
+        return 0
+    bucket = storage.Client().bucket(parsed_uri[0])
+    blobs: List = list(bucket.list_blobs(prefix=parsed_uri[1])) if prefix else [bucket.blob(parsed_uri[1])]
+    deleted = 0
+    for blob in blobs:
+        if prefix or blob.exists():
+            blob.delete()
+            deleted += 1
+    return deleted
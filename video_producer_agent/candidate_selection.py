@@ -0,0 +1,165 @@
+"""
+Cheap local ranking of multiple Veo candidates for the same scene.
+
+When Veo is asked for several samples in one operation, every candidate is
+downloaded and probed concurrently. A candidate is scored on:
+
+* duration fit against the scene narration (a clip shorter than the narration
+  truncates speech, which is penalised much harder than a slightly long clip),
+* the share of sampled frames that are black,
+* the share of sampled frames that are frozen (no change from the previous sample).
+
+Frames are sampled at a low rate and downscaled by ffmpeg (via imageio-ffmpeg)
+before they reach NumPy, so probing a clip takes well under a second.
+"""
+import asyncio
+import os
+import tempfile
+from typing import Dict, List
+
+from .video_length_tool import get_duration_with_mutagen, parse_gcs_uri
+
+# Frames per second sampled from each candidate, and the size they are scaled to.
+SAMPLE_FPS = 2
+SAMPLE_WIDTH = 160
+SAMPLE_HEIGHT = 90
+
+# Mean luma (0-255) below which a sampled frame counts as black.
+BLACK_LUMA_THRESHOLD = 16.0
+# Mean absolute per-pixel difference below which two consecutive samples count as frozen.
+FROZEN_DIFF_THRESHOLD = 1.0
+
+# Scoring weights (lower score is better).
+SHORT_CLIP_PENALTY_PER_SECOND = 4.0   # Narration would be truncated.
+LONG_CLIP_PENALTY_PER_SECOND = 0.5    # Silent tail after the narration ends.
+MAX_TRUNCATION_SECONDS = 1.0          # The prompt never allows truncating more than 1 second.
+TRUNCATION_LIMIT_PENALTY = 10.0
+BLACK_FRAME_WEIGHT = 5.0
+FROZEN_FRAME_WEIGHT = 5.0
+
+
+def _sample_frame_stats(file_path: str) -> Dict:
+    """Returns black/frozen frame ratios and the source frame size for a local video file."""
+    import imageio_ffmpeg
+    import numpy as np
+
+    reader = imageio_ffmpeg.read_frames(
+        file_path,
+        pix_fmt="rgb24",
+        output_params=["-vf", f"fps={SAMPLE_FPS},scale={SAMPLE_WIDTH}:{SAMPLE_HEIGHT}"],
+    )
+    meta = next(reader)
+    width, height = meta.get("source_size") or meta.get("size") or (0, 0)
+
+    sampled = 0
+    black = 0
+    frozen = 0
+    previous = None
+    for frame_bytes in reader:
+        frame = np.frombuffer(frame_bytes, dtype=np.uint8).reshape(SAMPLE_HEIGHT, SAMPLE_WIDTH, 3).astype(np.float32)
+        # ITU-R BT.601 luma
+        luma = frame[..., 0] * 0.299 + frame[..., 1] * 0.587 + frame[..., 2] * 0.114
+        sampled += 1
+        if luma.mean() < BLACK_LUMA_THRESHOLD:
+            black += 1
+        if previous is not None and np.abs(luma - previous).mean() < FROZEN_DIFF_THRESHOLD:
+            frozen += 1
+        previous = luma
+
+    return {
+        "width": int(width),
+        "height": int(height),
+        "sampled_frames": sampled,
+        "black_frame_ratio": black / sampled if sampled else 1.0,
+        "frozen_frame_ratio": frozen / (sampled - 1) if sampled > 1 else 1.0,
+    }
+
+
+def score_candidate(duration_seconds: float, target_duration: float, black_ratio: float, frozen_ratio: float) -> float:
+    """Combines the duration fit and frame checks into a single score (lower is better)."""
+    score = black_ratio * BLACK_FRAME_WEIGHT + frozen_ratio * FROZEN_FRAME_WEIGHT
+    if target_duration > 0:
+        shortfall = target_duration - duration_seconds
+        if shortfall > 0:
+            score += shortfall * SHORT_CLIP_PENALTY_PER_SECOND
+            if shortfall > MAX_TRUNCATION_SECONDS:
+                score += TRUNCATION_LIMIT_PENALTY
+        else:
+            score += -shortfall * LONG_CLIP_PENALTY_PER_SECOND
+    return round(score, 4)
+
+
+def probe_candidate(video_uri: str, target_duration: float = 0.0) -> Dict:
+    """
+    Downloads one candidate clip and measures its duration and frame quality.
+
+    Args:
+        video_uri: GCS URI of the candidate MP4.
+        target_duration: Narration length in seconds the clip should cover (0 to skip the fit check).
+
+    Returns:
+        dict: uri, duration_seconds, width, height, black_frame_ratio, frozen_frame_ratio, score,
+              or uri and error if the candidate could not be probed.
+    """
+    from google.cloud import storage
+
+    parsed_uri = parse_gcs_uri(video_uri)
+    if not parsed_uri:
+        return {"uri": video_uri, "error": f"Invalid GCS URI format: '{video_uri}'."}
+    bucket_name, blob_name = parsed_uri
+
+    temp_file_path = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_video_file:
+            temp_file_path = temp_video_file.name
+        storage.Client().bucket(bucket_name).blob(blob_name).download_to_filename(temp_file_path)
+
+        duration = get_duration_with_mutagen(temp_file_path)
+        if duration is None:
+            return {"uri": video_uri, "error": "Could not read the clip duration."}
+        stats = _sample_frame_stats(temp_file_path)
+
+        return {
+            "uri": video_uri,
+            "duration_seconds": round(duration, 3),
+            "width": stats["width"],
+            "height": stats["height"],
+            "black_frame_ratio": round(stats["black_frame_ratio"], 3),
+            "frozen_frame_ratio": round(stats["frozen_frame_ratio"], 3),
+            "score": score_candidate(duration, target_duration, stats["black_frame_ratio"], stats["frozen_frame_ratio"]),
+        }
+    except Exception as e:
+        return {"uri": video_uri, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+
+
+async def select_best_candidate(video_uris: List[str], target_duration: float = 0.0) -> Dict:
+    """
+    Probes every candidate concurrently and ranks them.
+
+    Args:
+        video_uris: GCS URIs of the candidate clips.
+        target_duration: Narration length in seconds the clip should cover (0 to skip the fit check).
+
+    Returns:
+        dict: {"best_uri": str, "best": {...}, "alternates": [{...}, ...]} with alternates
+              ordered best first. Candidates that failed to probe are listed last.
+    """
+    probes = await asyncio.gather(
+        *[asyncio.to_thread(probe_candidate, uri, target_duration) for uri in video_uris]
+    )
+    ranked = sorted(
+        probes,
+        key=lambda probe: (1, 0.0) if "error" in probe else (0, probe["score"]),
+    )
+    for probe in ranked:
+        print(f"Candidate {probe['uri']}: {probe.get('error') or 'score ' + str(probe['score'])}")
+
+    best = ranked[0]
+    return {
+        "best_uri": best["uri"],
+        "best": best,
+        "alternates": ranked[1:],
+    }
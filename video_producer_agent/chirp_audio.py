@@ -1,24 +1,113 @@
 import os
+import threading
 import uuid
-from google.cloud import texttospeech_v1beta1 as texttospeech
-from google.cloud import storage
-from google.api_core.exceptions import GoogleAPICallError, RetryError
-from google.cloud.texttospeech_v1beta1.types import SsmlVoiceGender
-from google.api_core.client_options import ClientOptions
+from typing import Dict, Tuple
+
+from .deadline import UPLOAD_TIMEOUT_SECONDS, call_timeout
 
 # --- Voice Category Definitions for Chirp 3 HD Voices ---
+# ssml_gender holds the SsmlVoiceGender member name; it is resolved to the enum at synthesis
+# time so this table (and the tool declaration) can be imported without the TTS SDK.
 VOICE_CATEGORY_DEFAULTS = {
-    "chirp_female_aoede": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Aoede", "ssml_gender": SsmlVoiceGender.FEMALE, "description": "A high-definition female voice, offering improved clarity."},
-    "chirp_male_puck": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Puck", "ssml_gender": SsmlVoiceGender.MALE, "description": "A high-definition male voice with clear articulation."},
-    "chirp_male_charon": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Charon", "ssml_gender": SsmlVoiceGender.MALE, "description": "A high-definition male voice with a slightly deeper tone."},
-    "chirp_female_kore": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Kore", "ssml_gender": SsmlVoiceGender.FEMALE, "description": "A high-definition female voice with a gentle quality."},
-    "chirp_male_fenrir": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Fenrir", "ssml_gender": SsmlVoiceGender.MALE, "description": "A high-definition male voice suitable for authoritative narration."},
-    "chirp_female_leda": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Leda", "ssml_gender": SsmlVoiceGender.FEMALE, "description": "A high-definition female voice with a smooth and flowing delivery."},
-    "chirp_male_orus": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Orus", "ssml_gender": SsmlVoiceGender.MALE, "description": "A high-definition male voice with a commanding presence."},
-    "chirp_female_zephyr": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Zephyr", "ssml_gender": SsmlVoiceGender.FEMALE, "description": "A high-definition female voice with a bright and energetic tone."},
+    "chirp_female_aoede": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Aoede", "ssml_gender": "FEMALE", "description": "A high-definition female voice, offering improved clarity."},
+    "chirp_male_puck": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Puck", "ssml_gender": "MALE", "description": "A high-definition male voice with clear articulation."},
+    "chirp_male_charon": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Charon", "ssml_gender": "MALE", "description": "A high-definition male voice with a slightly deeper tone."},
+    "chirp_female_kore": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Kore", "ssml_gender": "FEMALE", "description": "A high-definition female voice with a gentle quality."},
+    "chirp_male_fenrir": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Fenrir", "ssml_gender": "MALE", "description": "A high-definition male voice suitable for authoritative narration."},
+    "chirp_female_leda": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Leda", "ssml_gender": "FEMALE", "description": "A high-definition female voice with a smooth and flowing delivery."},
+    "chirp_male_orus": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Orus", "ssml_gender": "MALE", "description": "A high-definition male voice with a commanding presence."},
+    "chirp_female_zephyr": {"language_code": "en-US", "name": "en-US-Chirp3-HD-Zephyr", "ssml_gender": "FEMALE", "description": "A high-definition female voice with a bright and energetic tone."},
 }
 
 
+# Chirp 3 HD voices are available in 'global' for online synthesis
+TTS_LOCATION = "global"
+
+_tts_client_lock = threading.Lock()
+_tts_client = None
+
+
+def _tts_api_endpoint() -> str:
+    return (
+        f"{TTS_LOCATION}-texttospeech.googleapis.com"
+        if TTS_LOCATION != "global"
+        else "texttospeech.googleapis.com"
+    )
+
+
+def resolve_voice(voice_category: str) -> Tuple[str, Dict]:
+    """Returns (normalized_category, voice_config) or raises ValueError for an unknown category."""
+    normalized_category = voice_category.lower().replace(" ", "_")
+    if normalized_category not in VOICE_CATEGORY_DEFAULTS:
+        raise ValueError(
+            f"Invalid voice_category: '{voice_category}'. "
+            f"Valid options are: {', '.join(VOICE_CATEGORY_DEFAULTS.keys())}"
+        )
+    return normalized_category, VOICE_CATEGORY_DEFAULTS[normalized_category]
+
+
+def build_synthesis_request(
+    text: str,
+    voice_category: str,
+    speaking_rate: float = 1.0,
+    pitch: float = 0.0,
+    volume_gain_db: float = 0.0,
+    audio_encoding: str = "MP3",
+    sample_rate_hertz: int = 0,
+) -> Dict:
+    """
+    Builds the input/voice/audio_config keyword arguments for a `synthesize_speech` call.
+
+    audio_encoding is an AudioEncoding member name (MP3 by default); a sample_rate_hertz
+    of 0 keeps the voice's native rate.
+    """
+    from google.cloud import texttospeech_v1beta1 as texttospeech
+
+    _, voice_config = resolve_voice(voice_category)
+    return dict(
+        # Always plain text as SSML is not supported
+        input=texttospeech.SynthesisInput(text=text),
+        voice=texttospeech.VoiceSelectionParams(
+            language_code=voice_config["language_code"],
+            name=voice_config["name"],
+            ssml_gender=texttospeech.SsmlVoiceGender[voice_config["ssml_gender"]],
+        ),
+        audio_config=texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding[audio_encoding],
+            speaking_rate=speaking_rate,
+            pitch=pitch,
+            volume_gain_db=volume_gain_db,
+            sample_rate_hertz=sample_rate_hertz,
+        ),
+    )
+
+
+def get_tts_client():
+    """Returns a process-wide synchronous `TextToSpeechClient` (one gRPC channel, reused across calls)."""
+    global _tts_client
+    if _tts_client is None:
+        with _tts_client_lock:
+            if _tts_client is None:
+                from google.cloud import texttospeech_v1beta1 as texttospeech
+                from google.api_core.client_options import ClientOptions
+
+                _tts_client = texttospeech.TextToSpeechClient(
+                    client_options=ClientOptions(api_endpoint=_tts_api_endpoint())
+                )
+    return _tts_client
+
+
+def create_tts_async_client():
+    """Creates a `TextToSpeechAsyncClient`; concurrent requests on it share one gRPC channel.
+
+    Async clients are bound to the running event loop, so callers create one per batch.
+    """
+    from google.cloud import texttospeech_v1beta1 as texttospeech
+    from google.api_core.client_options import ClientOptions
+
+    return texttospeech.TextToSpeechAsyncClient(client_options=ClientOptions(api_endpoint=_tts_api_endpoint()))
+
+
 def text_to_speech(
     text: str,
     voice_category: str,
@@ -53,56 +142,30 @@ def text_to_speech(
         GoogleAPICallError: If the Text-to-Speech API call fails.
         Exception: For other unexpected errors during synthesis or upload.
     """
+    from google.cloud import storage
+    from google.api_core.exceptions import GoogleAPICallError
+
     pitch = 0.0
     volume_gain_db = 0.0
-    timeout_seconds = 300.0
+    # Capped by the deadline of the current production run, if any.
+    timeout_seconds = call_timeout(300.0)
 
     gcs_bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET", "byron-alpha-vpagent")
     google_cloud_project = os.getenv("GOOGLE_CLOUD_PROJECT", "byron-alpha")
-    google_cloud_location = "global" # Chirp 3 HD voices are available in 'global' for online synthesis
-
-    
 
     if not google_cloud_project:
         google_cloud_project = os.environ.get("GOOGLE_CLOUD_PROJECT")
         if not google_cloud_project:
             raise ValueError("Google Cloud Project ID not provided and not found in environment variables.")
 
-    normalized_category = voice_category.lower().replace(" ", "_")
-    if normalized_category not in VOICE_CATEGORY_DEFAULTS:
-        raise ValueError(
-            f"Invalid voice_category: '{voice_category}'. "
-            f"Valid options are: {', '.join(VOICE_CATEGORY_DEFAULTS.keys())}"
-        )
-
-    voice_config = VOICE_CATEGORY_DEFAULTS[normalized_category]
-
-    # Initialize Text-to-Speech Client
-    API_ENDPOINT = (
-        f"{google_cloud_location}-texttospeech.googleapis.com"
-        if google_cloud_location != "global"
-        else "texttospeech.googleapis.com"
-    )
-    tts_client = texttospeech.TextToSpeechClient(
-        client_options=ClientOptions(api_endpoint=API_ENDPOINT)
-    )
+    normalized_category, _ = resolve_voice(voice_category)
 
-    # Prepare input (always plain text as SSML is not supported)
-    input_text = texttospeech.SynthesisInput(text=text)
+    # Reuse the shared Text-to-Speech client instead of opening a new channel per call
+    tts_client = get_tts_client()
 
-    # Prepare voice parameters
-    voice = texttospeech.VoiceSelectionParams(
-        language_code=voice_config["language_code"],
-        name=voice_config["name"],
-        ssml_gender=voice_config["ssml_gender"],
-    )
-
-    # Prepare audio config
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3,
-        speaking_rate=speaking_rate,
-        pitch=pitch,
-        volume_gain_db=volume_gain_db,
+    # Prepare input, voice parameters and audio config
+    synthesis_request = build_synthesis_request(
+        text, normalized_category, speaking_rate, pitch=pitch, volume_gain_db=volume_gain_db
     )
 
     local_filename = f"chirp_output_{uuid.uuid4()}.mp3" 
@@ -111,9 +174,7 @@ def text_to_speech(
     try:
         # Perform the synthesis
         response = tts_client.synthesize_speech(
-            input=input_text,
-            voice=voice,
-            audio_config=audio_config,
+            **synthesis_request,
             timeout=timeout_seconds, # Apply timeout to the API call
         )
 
@@ -128,7 +189,7 @@ def text_to_speech(
         blob = bucket.blob(local_filename)
 
         print(f"Uploading '{local_filename}' to GCS bucket '{gcs_bucket_name}'...")
-        blob.upload_from_filename(local_filename)
+        blob.upload_from_filename(local_filename, timeout=call_timeout(UPLOAD_TIMEOUT_SECONDS))
         gcs_uri = f"gs://{gcs_bucket_name}/{local_filename}"
         print(f"✅ Audio successfully uploaded to GCS: {gcs_uri}")
 
@@ -136,6 +197,10 @@ def text_to_speech(
         os.remove(local_filename)
         print(f"Local file '{local_filename}' removed.")
 
+        # Let a later duration probe of this URI calibrate the narration predictor.
+        from .narration_predictor import remember_synthesis
+        remember_synthesis(gcs_uri, text, normalized_category, speaking_rate)
+
         return gcs_uri
 
     except GoogleAPICallError as e:
@@ -0,0 +1,183 @@
+"""
+One-call production of a whole commercial from a confirmed plan.
+
+Producing a commercial tool by tool costs the agent one model turn per step
+(synthesize, measure, regenerate, Veo, mux, join, public URL, music, music mux),
+and every turn resends the instruction and all earlier tool results; a six scene
+commercial took more than 40 model calls. `produce_commercial` takes the
+confirmed plan and runs the whole production in code with the agent's rules
+built in:
+
+* a missing speaking rate is solved from the narration predictor so the
+  narration lasts between 4 and 7.5 seconds;
+* narration that cannot fit an 8 second clip even at 1.3x is rejected before
+  anything is generated;
+* every scene is rendered concurrently through the timeline graph (see
+  timeline), so the clip length follows the measured narration, overruns are
+  fitted locally, failed Veo generations are retried and unchanged scenes of an
+  earlier render are reused;
+* the scenes are joined, scored with Lyria in groups of at most one music clip
+  and converted to public URLs;
+* the whole run shares one deadline (COMMERCIAL_SLO_SECONDS, see deadline), so
+  it either finishes within it or stops early naming the stage that overran.
+
+The agent only plans, confirms the plan with the user and makes this one call.
+"""
+import mimetypes
+import time
+from typing import Dict, List
+
+from .chirp_audio import resolve_voice
+from .deadline import DeadlineExceeded, production_deadline
+from .narration_predictor import MAX_SPEAKING_RATE, get_predictor, solve_speaking_rate
+from .render_queue import PRIORITY_FINAL, render_priority
+from .speculative_scene import MAX_TRUNCATION_SECONDS, MAX_VEO_SECONDS, SPECULATION_MARGIN_SECONDS
+from .timeline import TimelineBuild, deadline_error, render_scenes
+from .tools import gcs_uri_to_public_url
+
+# Narration shorter than this leaves a scene feeling empty.
+MIN_NARRATION_SECONDS = 4.0
+# Speaking rates accepted by Cloud Text-to-Speech.
+TTS_MIN_SPEAKING_RATE = 0.25
+TTS_MAX_SPEAKING_RATE = 2.0
+SUPPORTED_IMAGE_MIME_TYPES = ("image/jpeg", "image/png")
+
+
+def auto_speaking_rate(text: str, voice_category: str) -> float:
+    """Returns 1.0 if the narration naturally lasts 4-7.5 seconds, otherwise the rate that brings it into range."""
+    natural = get_predictor().predict(text, voice_category, 1.0)
+    target = min(max(natural, MIN_NARRATION_SECONDS), MAX_VEO_SECONDS - SPECULATION_MARGIN_SECONDS)
+    if abs(target - natural) < 0.05:
+        return 1.0
+    solved = solve_speaking_rate(text, voice_category, target)
+    if isinstance(solved, str):
+        raise ValueError(solved)
+    return solved["speaking_rate"]
+
+
+def normalize_scene(index: int, scene: Dict) -> Dict:
+    """
+    Validates one scene of the plan and fills in its defaults.
+
+    Raises:
+        ValueError: With a message naming the scene and the problem.
+    """
+    label = f"Scene {index + 1}"
+    if not isinstance(scene, dict):
+        raise ValueError(f"{label}: expected an object, got {type(scene).__name__}.")
+    video_prompt = str(scene.get("video_prompt") or "").strip()
+    narration_text = str(scene.get("narration") or "").strip()
+    if not video_prompt:
+        raise ValueError(f"{label}: video_prompt is required.")
+    if not narration_text:
+        raise ValueError(f"{label}: narration is required.")
+    try:
+        voice_category, _ = resolve_voice(str(scene.get("voice_category") or ""))
+    except ValueError as e:
+        raise ValueError(f"{label}: {e}")
+
+    speaking_rate = float(scene.get("speaking_rate") or 0)
+    if speaking_rate <= 0:
+        speaking_rate = auto_speaking_rate(narration_text, voice_category)
+    elif not TTS_MIN_SPEAKING_RATE <= speaking_rate <= TTS_MAX_SPEAKING_RATE:
+        raise ValueError(f"{label}: speaking_rate must be between {TTS_MIN_SPEAKING_RATE} and {TTS_MAX_SPEAKING_RATE}.")
+
+    # The narration may still be sped up to 1.3x when it is fitted to the clip.
+    shortest = get_predictor().predict(narration_text, voice_category, max(speaking_rate, MAX_SPEAKING_RATE))
+    if shortest > MAX_VEO_SECONDS + MAX_TRUNCATION_SECONDS:
+        raise ValueError(f"{label}: narration is predicted to last {shortest:.1f}s even at "
+                         f"{MAX_SPEAKING_RATE}x, longer than a {MAX_VEO_SECONDS}s clip; shorten the text.")
+
+    normalized = {
+        "video_prompt": video_prompt,
+        "narration_text": narration_text,
+        "voice_category": voice_category,
+        "speaking_rate": round(speaking_rate, 3),
+    }
+    image_gcs_uri = str(scene.get("image_gcs_uri") or "").strip()
+    if image_gcs_uri:
+        if not image_gcs_uri.startswith("gs://"):
+            raise ValueError(f"{label}: image_gcs_uri must start with 'gs://'.")
+        image_mime_type = scene.get("image_mime_type") or mimetypes.guess_type(image_gcs_uri)[0]
+        if image_mime_type not in SUPPORTED_IMAGE_MIME_TYPES:
+            raise ValueError(f"{label}: image must be one of {', '.join(SUPPORTED_IMAGE_MIME_TYPES)}.")
+        normalized["image_gcs_uri"] = image_gcs_uri
+        normalized["image_mime_type"] = image_mime_type
+    return normalized
+
+
+async def produce_commercial(
+    scenes: List[dict],
+    music_prompt: str = "",
+    music_negative_prompt: str = "",
+    music_volume: float = 0.3,
+    deadline_seconds: float = 0.0,
+) -> dict:
+    """
+    Produces the whole commercial from the confirmed plan in a single call.
+
+    Synthesizes every narration, generates every clip (from the image when a scene has one),
+    fits narration that overruns its clip, muxes each scene, joins them, adds the music score
+    and returns public URLs. Calling it again with an edited plan only redoes the scenes that
+    changed and the final assembly; pass each unchanged scene's speaking_rate from the
+    previous result, since an automatic rate can drift as the predictor recalibrates and
+    would re-narrate the scene.
+
+    Args:
+        scenes: One object per scene, in order, with the keys:
+            video_prompt (str): The video generation prompt.
+            narration (str): Plain narration text for text to speech.
+            voice_category (str): One of the Chirp 3 HD voice categories, e.g. "chirp_female_leda".
+            speaking_rate (float, optional): Speed of speech. Omit or use 0 to pick it automatically
+                so the narration lasts 4 to 7.5 seconds.
+            image_gcs_uri (str, optional): gs:// URI of an uploaded image to animate for this scene.
+            image_mime_type (str, optional): "image/jpeg" or "image/png"; guessed from the URI if omitted.
+        music_prompt: Optional Lyria prompt for the background score. Empty for no music.
+        music_negative_prompt: Optional description of what to exclude from the music.
+        music_volume: Volume of the music track (0.0 to 1.0). Defaults to 0.3.
+        deadline_seconds: Time budget of the whole production. 0 uses COMMERCIAL_SLO_SECONDS.
+
+    Returns:
+        dict: final_uri, final_public_url, duration, scenes (per scene: speaking_rate,
+              narration_duration, muxed_uri and public_url), built and reused (the timeline
+              nodes rendered or taken from the cache) and wall_seconds.
+              If the deadline passes, error_code DEADLINE_EXCEEDED, the stage that used up
+              the budget and the slowest stages. Or an error message string.
+    """
+    if not scenes:
+        return "Error: scenes must be a non-empty list."
+    try:
+        plan = [normalize_scene(i, scene) for i, scene in enumerate(scenes)]
+    except (ValueError, TypeError) as e:
+        return f"Error: {e}"
+
+    started = time.monotonic()
+    build = TimelineBuild()
+    try:
+        with production_deadline("commercial", deadline_seconds or None) as run, render_priority(PRIORITY_FINAL):
+            rendered, final = await render_scenes(build, plan, music_prompt, music_negative_prompt, music_volume)
+    except DeadlineExceeded as e:
+        return deadline_error(e, run)
+    except Exception as e:
+        return f"Error producing commercial: {type(e).__name__}: {e}"
+
+    wall_seconds = round(time.monotonic() - started, 2)
+    print(f"✅ Commercial produced in {wall_seconds}s: rebuilt {len(build.built)}, reused {len(build.reused)} nodes.")
+    return {
+        "final_uri": final["uri"],
+        "final_public_url": gcs_uri_to_public_url(final["uri"]),
+        "duration": final["duration"],
+        "scenes": [
+            {
+                "scene": i + 1,
+                "speaking_rate": scene["speaking_rate"],
+                "narration_duration": result["narration_duration"],
+                "muxed_uri": result["uri"],
+                "public_url": gcs_uri_to_public_url(result["uri"]),
+            }
+            for i, (scene, result) in enumerate(zip(plan, rendered))
+        ],
+        "built": build.built,
+        "reused": build.reused,
+        "wall_seconds": wall_seconds,
+    }
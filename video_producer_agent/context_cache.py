@@ -0,0 +1,219 @@
+"""
+Gemini context caching for the agent's static instruction and tool declarations.
+
+The instruction in agent.py (few-shot prompts, speech guidelines) and the tool
+docstrings are several thousand tokens and were sent with every model turn of a
+production session. `cache_static_context` is a `before_model_callback` that
+moves them into a Gemini cached-content resource:
+
+* the cache is keyed by a fingerprint of the model, system instruction and tool
+  declarations, so editing the prompt or a tool creates a new cache (and deletes
+  the stale one) on the next turn;
+* caches are created with CONTEXT_CACHE_TTL_SECONDS and their TTL is extended
+  when they are about to expire, so a long session keeps using one cache;
+* each turn then sends only `cached_content` plus the conversation contents.
+
+The callback never waits for the Gemini API: caches are created, extended and
+deleted on a background thread, and until a cache is ready the turn is sent
+with the full context.
+
+If the cache cannot be created (e.g. the instruction is below the model's
+minimum cacheable size, or caching is unavailable for the model) the request is
+sent unchanged and caching is retried after RETRY_AFTER_SECONDS. Set
+CONTEXT_CACHE=off to disable caching.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 3600
+# Extend a cache's TTL when fewer than this many seconds remain.
+REFRESH_MARGIN_SECONDS = 120
+# After a failed cache creation the full context is sent for this long before trying again.
+RETRY_AFTER_SECONDS = 600
+
+
+def context_fingerprint(model: str, system_instruction, tools) -> str:
+    """Returns a hash of everything that goes into the cache."""
+    def plain(value):
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return [plain(item) for item in value]
+        if hasattr(value, "model_dump"):
+            return value.model_dump(mode="json", exclude_none=True)
+        return value
+
+    canonical = json.dumps(
+        {"model": model, "system_instruction": plain(system_instruction), "tools": plain(tools)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ContextCache:
+    """
+    Creates, refreshes and replaces the cached-content resource of each model.
+
+    `cache_name` runs on the event loop (ADK calls before_model_callback synchronously), so it never
+    calls the API: it returns the cache it already has, and hands creating, extending or replacing a
+    cache to a background thread. The lock only guards the in-memory entries.
+    """
+
+    def __init__(self, client=None, ttl_seconds: Optional[int] = None):
+        self._client = client
+        self.ttl_seconds = ttl_seconds or int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        self._lock = threading.Lock()
+        # model -> {"fingerprint", "name", "expires_at"}
+        self._entries: Dict[str, Dict] = {}
+        # Fingerprints whose cache could not be created -> time of the failure.
+        self._failed: Dict[str, float] = {}
+        # model -> the background refresh of its cache, at most one at a time.
+        self._refreshing: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-cache")
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .veo_client import get_genai_client
+
+            self._client = get_genai_client()
+        return self._client
+
+    def cache_name(self, model: str, system_instruction, tools, wait: bool = False) -> Optional[str]:
+        """
+        Returns the cached-content name for this context, or None to send the full context this turn.
+
+        A missing, expiring or outdated cache is refreshed in the background; an expiring one is still
+        returned meanwhile. With wait=True the call blocks until the refresh is done (for scripts).
+        """
+        fingerprint = context_fingerprint(model, system_instruction, tools)
+        with self._lock:
+            if time.time() - self._failed.get(fingerprint, 0.0) < RETRY_AFTER_SECONDS:
+                return None
+            name, fresh = self._current(model, fingerprint)
+            if fresh:
+                return name
+            refresh = self._refreshing.get(model)
+            if refresh is None or refresh.done():
+                refresh = self._executor.submit(self._refresh, model, fingerprint, system_instruction, tools)
+                self._refreshing[model] = refresh
+        if not wait:
+            return name
+        refresh.result()
+        with self._lock:
+            return self._current(model, fingerprint)[0]
+
+    def _current(self, model: str, fingerprint: str) -> Tuple[Optional[str], bool]:
+        """Returns (name of the unexpired cache for this context, whether it needs no refresh). Needs the lock."""
+        entry = self._entries.get(model)
+        if not entry or entry["fingerprint"] != fingerprint:
+            return None, False
+        remaining = entry["expires_at"] - time.time()
+        return (entry["name"] if remaining > 0 else None), remaining > REFRESH_MARGIN_SECONDS
+
+    def _refresh(self, model: str, fingerprint: str, system_instruction, tools) -> None:
+        """Extends this context's cache, or creates it and deletes the one it replaces. Runs on the executor."""
+        with self._lock:
+            entry = dict(self._entries.get(model) or {})
+        if entry.get("fingerprint") == fingerprint and self._extend(entry):
+            with self._lock:
+                self._entries[model] = entry
+            return
+        try:
+            created = self._create(model, fingerprint, system_instruction, tools)
+        except Exception as e:
+            print(f"WARNING: Context caching unavailable for {model}; sending the full context. {e}")
+            with self._lock:
+                self._failed[fingerprint] = time.time()
+            return
+        with self._lock:
+            self._entries[model] = created
+        if entry.get("name") and entry["name"] != created["name"]:
+            self._delete(entry["name"])
+
+    def _create(self, model: str, fingerprint: str, system_instruction, tools) -> Dict:
+        from google.genai import types
+
+        cache = self.client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name=f"video_producer_agent-{fingerprint[:12]}",
+                system_instruction=system_instruction,
+                tools=tools or None,
+                ttl=f"{self.ttl_seconds}s",
+            ),
+        )
+        tokens = getattr(cache.usage_metadata, "total_token_count", None) if cache.usage_metadata else None
+        print(f"Created context cache {cache.name} for {model} ({tokens} tokens, ttl {self.ttl_seconds}s).")
+        return {"fingerprint": fingerprint, "name": cache.name, "expires_at": time.time() + self.ttl_seconds}
+
+    def _extend(self, entry: Dict) -> bool:
+        from google.genai import types
+
+        try:
+            self.client.caches.update(
+                name=entry["name"], config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+            )
+        except Exception as e:
+            # The cache may already have expired; a new one is created instead.
+            print(f"Could not extend context cache {entry['name']}: {e}")
+            return False
+        entry["expires_at"] = time.time() + self.ttl_seconds
+        return True
+
+    def _delete(self, name: str) -> None:
+        try:
+            self.client.caches.delete(name=name)
+            print(f"Deleted stale context cache {name}.")
+        except Exception as e:
+            print(f"WARNING: Could not delete stale context cache {name}: {e}")
+
+    def status(self) -> Dict[str, Tuple[str, float]]:
+        """Returns {model: (cache_name, seconds_until_expiry)}."""
+        with self._lock:
+            return {model: (entry["name"], round(entry["expires_at"] - time.time(), 1))
+                    for model, entry in self._entries.items()}
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[ContextCache] = None
+
+
+def get_context_cache() -> ContextCache:
+    """Returns the process-wide context cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ContextCache()
+    return _cache
+
+
+def caching_enabled() -> bool:
+    return os.getenv("CONTEXT_CACHE", "on").lower() not in ("0", "off", "false", "no")
+
+
+def cache_static_context(callback_context, llm_request):
+    """
+    before_model_callback that replaces the system instruction and tools with a cached-content reference.
+
+    Returns None so the (modified) request is always sent to the model. It does not block the event
+    loop: a turn whose cache is not ready yet is sent with the full context.
+    """
+    config = llm_request.config
+    if not caching_enabled() or config is None or config.cached_content or not config.system_instruction:
+        return None
+    name = get_context_cache().cache_name(llm_request.model, config.system_instruction, config.tools)
+    if name:
+        # A request that uses cached content must not repeat what the cache holds.
+        config.cached_content = name
+        config.system_instruction = None
+        config.tools = None
+        config.tool_config = None
+    return None
@@ -0,0 +1,215 @@
+"""
+One deadline per production run, inherited and subdivided by every tool.
+
+Timeouts used to be scattered: 300 seconds on some Text-to-Speech calls, none
+on the Transcoder polling loops and none on the Veo polling loop. A run now
+opens a `production_deadline` (COMMERCIAL_SLO_SECONDS by default) and each of
+its stages opens a `stage` with its own budget. A stage's deadline is its own
+budget or what is left of the enclosing one, whichever ends first, and it is
+enforced on:
+
+    API calls   `call_timeout(default)` caps each request's timeout
+    uploads     the same, for GCS uploads
+    polling     `check_deadline()` on every poll (see cancellation.cancellable_sleep)
+
+A stage that runs out of time raises `DeadlineExceeded` naming the stage whose
+budget was used up, and the run's report lists every stage with its budget and
+the time it took. Code outside any run still gets a standalone deadline from
+the budget of the stage it opens, so no wait is unbounded. A run that spans
+several tool calls (the multi-agent production) rebuilds its deadline in each
+call from the wall-clock time it started (`Deadline.resume`, `bind_deadline`).
+"""
+import asyncio
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_SLO_SECONDS = 1800.0
+DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED"
+# Default timeout of one GCS upload, before the deadline caps it.
+UPLOAD_TIMEOUT_SECONDS = 120.0
+
+
+def production_slo_seconds() -> float:
+    """The default time budget of a whole commercial (COMMERCIAL_SLO_SECONDS)."""
+    return float(os.getenv("COMMERCIAL_SLO_SECONDS", DEFAULT_SLO_SECONDS))
+
+
+class DeadlineExceeded(TimeoutError):
+    """A stage ran out of its time budget (or of the run's)."""
+
+    error_code = DEADLINE_EXCEEDED
+
+    def __init__(self, stage: str, budget_seconds: float, used_seconds: float, report: Optional[List[Dict]] = None):
+        self.stage = stage
+        self.budget_seconds = budget_seconds
+        self.used_seconds = used_seconds
+        self.report = report or []
+        super().__init__(f"Deadline exceeded in stage '{stage}': {used_seconds:.0f}s used of a "
+                         f"{budget_seconds:.0f}s budget.")
+
+
+class DeadlineReport:
+    """Budget and time used of every finished stage of one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: List[Dict] = []
+
+    def add(self, stage: str, budget_seconds: float, used_seconds: float, status: str) -> None:
+        with self._lock:
+            self.stages.append({"stage": stage, "budget_s": round(budget_seconds, 1),
+                                "used_s": round(used_seconds, 1), "status": status})
+
+    def summary(self) -> List[Dict]:
+        with self._lock:
+            return list(self.stages)
+
+    def slowest(self, count: int = 5) -> List[Dict]:
+        """The stages (not the run itself) that took longest."""
+        stages = [entry for entry in self.summary() if "/" in entry["stage"]]
+        return sorted(stages, key=lambda entry: entry["used_s"], reverse=True)[:count]
+
+
+class Deadline:
+    """A named time budget, capped by the deadline it was subdivided from."""
+
+    def __init__(self, name: str, budget_seconds: float, parent: Optional["Deadline"] = None):
+        self.name = f"{parent.name}/{name}" if parent else name
+        self.budget_seconds = float(budget_seconds)
+        self.started_at = time.monotonic()
+        self.report = parent.report if parent else DeadlineReport()
+        own_expiry = self.started_at + self.budget_seconds
+        if parent is not None and parent.expires_at <= own_expiry:
+            self.expires_at, self.limited_by = parent.expires_at, parent.limited_by
+            # Report the budget the stage actually had.
+            self.budget_seconds = max(self.expires_at - self.started_at, 0.0)
+        else:
+            self.expires_at, self.limited_by = own_expiry, self
+
+    @classmethod
+    def resume(cls, name: str, budget_seconds: float, started_at_epoch: float) -> "Deadline":
+        """Rebuilds the deadline of a run that started at `started_at_epoch` (time.time())."""
+        deadline = cls(name, budget_seconds)
+        deadline.started_at -= max(time.time() - started_at_epoch, 0.0)
+        deadline.expires_at = deadline.started_at + deadline.budget_seconds
+        return deadline
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def used(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def check(self) -> None:
+        """Raises DeadlineExceeded (naming the stage whose budget ran out) once the deadline passed."""
+        if self.remaining() <= 0:
+            limit = self.limited_by
+            raise DeadlineExceeded(limit.name, limit.budget_seconds, limit.used(), self.report.summary())
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@contextlib.contextmanager
+def _enter(deadline: Deadline):
+    token = _current_deadline.set(deadline)
+    status = "ok"
+    try:
+        yield deadline
+    except DeadlineExceeded:
+        status = "exceeded"
+        raise
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        _current_deadline.reset(token)
+        deadline.report.add(deadline.name, deadline.budget_seconds, deadline.used(), status)
+
+
+def bind_deadline(deadline: Optional[Deadline]) -> Optional[Deadline]:
+    """
+    Makes `deadline` current for the calling task and the tasks it creates (e.g. in a before_tool_callback).
+
+    None runs the calling task outside any deadline.
+    """
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def production_deadline(name: str = "commercial", budget_seconds: Optional[float] = None):
+    """
+    Context manager that starts the deadline of a production run.
+
+    Inside an enclosing deadline (e.g. one entry of a batch) the run is a stage of it and
+    shares its report.
+    """
+    return _enter(Deadline(name, budget_seconds or production_slo_seconds(), _current_deadline.get()))
+
+
+def stage(name: str, budget_seconds: Optional[float] = None):
+    """
+    Context manager for one stage of the current run.
+
+    The stage gets budget_seconds or what is left of the run, whichever ends first. Without
+    a budget it only appears in the report; without a run it is a standalone deadline.
+    """
+    parent = _current_deadline.get()
+    if budget_seconds is None:
+        if parent is None:
+            return contextlib.nullcontext()
+        budget_seconds = max(parent.remaining(), 0.0)
+    return _enter(Deadline(name, budget_seconds, parent))
+
+
+def check_deadline() -> None:
+    """Raises DeadlineExceeded if the current deadline passed; no-op outside a deadline."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def call_timeout(default_seconds: float) -> float:
+    """
+    Timeout for one API call or upload: default_seconds capped by the current deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline already passed.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default_seconds
+    deadline.check()
+    return max(min(default_seconds, deadline.remaining()), 1.0)
+
+
+async def within_deadline(awaitable, default_seconds: Optional[float] = None):
+    """Awaits `awaitable`, raising DeadlineExceeded if the current deadline passes first."""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        if default_seconds is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, default_seconds)
+    timeout = call_timeout(default_seconds if default_seconds is not None else deadline.remaining())
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        deadline.check()
+        raise
+
+
+def deadline_report() -> List[Dict]:
+    """The finished stages of the current run."""
+    deadline = _current_deadline.get()
+    return deadline.report.summary() if deadline else []
@@ -0,0 +1,155 @@
+"""
+Shared Google Cloud credentials, project ID and HTTP session helpers.
+
+Every REST caller in the agent (Lyria predictions, GCS, Transcoder) used to
+resolve Application Default Credentials and refresh a token on each tool
+invocation, and then open a brand new TLS connection for the request. The
+helpers in this module keep one credentials object per process, refresh its
+token shortly before it expires, cache the project ID and hand out a single
+keep-alive `requests.Session` with a pooled connection adapter.
+"""
+import datetime
+import os
+import threading
+from typing import Optional, Sequence
+
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+# Refresh access tokens this many seconds before they actually expire so a
+# request never goes out with a token that dies mid-flight.
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+# Connection pool sizing for the shared HTTP session.
+HTTP_POOL_CONNECTIONS = 10
+HTTP_POOL_MAXSIZE = 32
+
+
+class CredentialsProvider:
+    """
+    Thread-safe cache around `google.auth.default()`.
+
+    The credentials object and project ID are resolved once. Access tokens are
+    refreshed only when missing or within `refresh_margin_seconds` of expiry.
+    """
+
+    def __init__(
+        self,
+        scopes: Sequence[str] = (CLOUD_PLATFORM_SCOPE,),
+        refresh_margin_seconds: int = TOKEN_REFRESH_MARGIN_SECONDS,
+    ):
+        self._scopes = list(scopes)
+        self._refresh_margin = datetime.timedelta(seconds=refresh_margin_seconds)
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._project_id: Optional[str] = None
+
+    def _load_locked(self) -> None:
+        if self._credentials is None:
+            import google.auth
+            credentials, project_id = google.auth.default(scopes=self._scopes)
+            self._credentials = credentials
+            # GOOGLE_CLOUD_PROJECT wins over whatever ADC reports.
+            self._project_id = os.getenv("GOOGLE_CLOUD_PROJECT") or project_id
+
+    def _needs_refresh_locked(self) -> bool:
+        credentials = self._credentials
+        if not credentials.token or credentials.expiry is None:
+            return True
+        # google-auth stores expiry as a naive UTC datetime.
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - now <= self._refresh_margin
+
+    def get_access_token(self) -> str:
+        """
+        Returns a valid OAuth2 access token, refreshing it ahead of expiry.
+
+        Raises:
+            google.auth.exceptions.DefaultCredentialsError: If ADC is not configured.
+            google.auth.exceptions.RefreshError: If the token cannot be refreshed.
+        """
+        with self._lock:
+            self._load_locked()
+            if self._needs_refresh_locked():
+                import google.auth.transport.requests
+                self._credentials.refresh(google.auth.transport.requests.Request(session=get_http_session()))
+            return self._credentials.token
+
+    def get_credentials(self):
+        """Returns the cached credentials object (refreshing its token if needed)."""
+        self.get_access_token()
+        return self._credentials
+
+    def get_project_id(self) -> str:
+        """
+        Returns the cached Google Cloud project ID.
+
+        Raises:
+            ValueError: If no project ID can be inferred from the environment.
+        """
+        with self._lock:
+            if self._project_id is None and os.getenv("GOOGLE_CLOUD_PROJECT"):
+                # Avoid touching ADC at all when the project is configured explicitly.
+                self._project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+            if self._project_id is None:
+                self._load_locked()
+            if not self._project_id:
+                raise ValueError("Could not infer Google Cloud Project ID from the environment. "
+                                 "Please set GOOGLE_CLOUD_PROJECT environment variable, "
+                                 "or configure gcloud CLI with 'gcloud config set project <project-id>', "
+                                 "or ensure your credentials are properly set.")
+            return self._project_id
+
+    def reset(self) -> None:
+        """Drops the cached credentials and project ID (e.g. after rotating keys)."""
+        with self._lock:
+            self._credentials = None
+            self._project_id = None
+
+
+_provider_lock = threading.Lock()
+_provider: Optional[CredentialsProvider] = None
+
+_session_lock = threading.Lock()
+_session = None  # requests.Session, created on first use
+
+
+def get_credentials_provider() -> CredentialsProvider:
+    """Returns the process-wide `CredentialsProvider` singleton."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = CredentialsProvider()
+    return _provider
+
+
+def get_access_token() -> str:
+    """Returns a cached cloud-platform access token, refreshed ahead of expiry."""
+    return get_credentials_provider().get_access_token()
+
+
+def get_project_id() -> str:
+    """Returns the cached Google Cloud project ID. Raises ValueError if unknown."""
+    return get_credentials_provider().get_project_id()
+
+
+def get_http_session():
+    """
+    Returns the shared keep-alive `requests.Session` used by all REST callers.
+
+    The session keeps a pool of TLS connections per host, so consecutive
+    predictions against the same endpoint reuse an open connection.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
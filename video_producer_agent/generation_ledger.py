@@ -0,0 +1,245 @@
+"""
+Content-addressed ledger of completed Veo and Lyria generations.
+
+A repeated tool call (the LLM retrying, or a user re-running a session) used to
+start a new multi-minute generation under a fresh UUID prefix even when every
+input was identical. Each generation is now keyed by a SHA-256 hash of its
+inputs (model, prompt, negative prompt, duration, image, aspect ratio, seed and
+the remaining request config) and the output URIs of completed generations are
+stored in a local SQLite database:
+
+* a repeat of a completed generation returns the stored URIs immediately
+  (after checking the objects still exist in GCS);
+* identical requests made while one is still running join it instead of
+  starting a second one (single-flight), for both async (Veo) and threaded
+  (Lyria) callers. A shared async generation belongs to no single session:
+  each caller waits under its own cancellation token and deadline, and the
+  generation is only cancelled once every caller waiting on it has gone;
+* failures are never recorded, so a retry after an error generates again;
+* a refresh (the user rejected the result) skips the stored outputs, generates
+  again and replaces them, so later repeats return the new result.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cancellation import CANCEL_CHECK_INTERVAL_SECONDS, check_cancelled, unbind_session
+from .deadline import bind_deadline, check_deadline
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".video_producer_agent", "generation_ledger.db")
+
+# How a coalesced request was satisfied.
+STATUS_CACHED = "cached"
+STATUS_JOINED = "joined"
+STATUS_GENERATED = "generated"
+
+
+def generation_key(kind: str, params: Dict) -> str:
+    """Returns the content hash of a generation request; None values are ignored."""
+    canonical = json.dumps(
+        {"kind": kind, **{k: v for k, v in params.items() if v is not None}},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GenerationLedger:
+    """SQLite table mapping generation keys to the output URIs of completed generations."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("GENERATION_LEDGER_DB", DEFAULT_DB_PATH)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                " key TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " params TEXT NOT NULL,"
+                " outputs TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def lookup(self, key: str) -> Optional[List[str]]:
+        """Returns the stored output URIs for a key, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT outputs FROM generations WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, key: str, kind: str, params: Dict, outputs: List[str]) -> None:
+        """Stores the outputs of a completed generation."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO generations (key, kind, params, outputs, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(params, sort_keys=True), json.dumps(outputs), time.time()),
+            )
+
+    def forget(self, key: str) -> None:
+        """Removes a key, e.g. when its outputs were deleted from GCS."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM generations WHERE key = ?", (key,))
+
+
+_ledger_lock = threading.Lock()
+_ledger: Optional[GenerationLedger] = None
+
+# In-flight generations: asyncio tasks with their number of waiters (per event loop) and threading events.
+_inflight_lock = threading.Lock()
+_inflight_async: Dict[Tuple[int, str, bool], Dict] = {}
+_inflight_sync: Dict[str, Dict] = {}
+
+
+def get_ledger() -> GenerationLedger:
+    """Returns the process-wide ledger backed by GENERATION_LEDGER_DB."""
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = GenerationLedger()
+    return _ledger
+
+
+def outputs_exist(uris: List[str]) -> bool:
+    """Checks that every stored output is still present in GCS."""
+    from google.cloud import storage
+
+    from .video_length_tool import parse_gcs_uri
+
+    client = storage.Client()
+    for uri in uris:
+        parsed_uri = parse_gcs_uri(uri)
+        if not parsed_uri or not client.bucket(parsed_uri[0]).blob(parsed_uri[1]).exists():
+            return False
+    return True
+
+
+def _cached_outputs(key: str) -> Optional[List[str]]:
+    outputs = get_ledger().lookup(key)
+    if outputs is None:
+        return None
+    try:
+        if outputs_exist(outputs):
+            return outputs
+    except Exception as e:
+        print(f"WARNING: Could not verify ledger outputs for {key[:12]}: {e}")
+        return outputs
+    print(f"Ledger outputs for {key[:12]} are gone from GCS; generating again.")
+    get_ledger().forget(key)
+    return None
+
+
+async def coalesce_async(
+    kind: str, params: Dict, produce: Callable[[], Awaitable[List[str]]], refresh: bool = False
+) -> Tuple[List[str], str]:
+    """
+    Returns (output_uris, status) for a generation, running `produce` only when needed.
+
+    `produce` must return the output URIs or raise. Concurrent callers with the same
+    inputs share one run, which runs outside any session. A caller that is cancelled
+    (its task, or its session through cancel_production) or passes its deadline stops
+    waiting; the run itself is cancelled when its last waiter stops.
+    With refresh, stored outputs are ignored and replaced by a new generation (concurrent
+    refreshes of the same inputs still share one).
+    """
+    key = generation_key(kind, params)
+    if not refresh:
+        outputs = await asyncio.to_thread(_cached_outputs, key)
+        if outputs is not None:
+            print(f"Ledger hit for {kind} {key[:12]}: {outputs}")
+            return outputs, STATUS_CACHED
+
+    loop_key = (id(asyncio.get_running_loop()), key, refresh)
+    with _inflight_lock:
+        entry = _inflight_async.get(loop_key)
+        status = STATUS_JOINED if entry is not None else STATUS_GENERATED
+        if entry is None:
+            async def run() -> List[str]:
+                # Shared work: one session's cancel or deadline must not stop it for the others.
+                unbind_session()
+                bind_deadline(None)
+                try:
+                    # A generation with the same key may have completed since the lookup above.
+                    uris = None if refresh else await asyncio.to_thread(get_ledger().lookup, key)
+                    if uris is not None:
+                        return uris
+                    uris = await produce()
+                    await asyncio.to_thread(get_ledger().record, key, kind, params, uris)
+                    return uris
+                finally:
+                    with _inflight_lock:
+                        if _inflight_async.get(loop_key) is entry:
+                            del _inflight_async[loop_key]
+
+            entry = {"task": None, "waiters": 0}
+            entry["task"] = asyncio.ensure_future(run())
+            _inflight_async[loop_key] = entry
+        entry["waiters"] += 1
+    if status == STATUS_JOINED:
+        print(f"Joining in-flight {kind} generation {key[:12]}.")
+
+    task = entry["task"]
+    try:
+        while not task.done():
+            check_cancelled()
+            check_deadline()
+            await asyncio.wait({task}, timeout=CANCEL_CHECK_INTERVAL_SECONDS)
+        return task.result(), status
+    finally:
+        with _inflight_lock:
+            entry["waiters"] -= 1
+            abandoned = entry["waiters"] == 0 and not task.done()
+            if abandoned and _inflight_async.get(loop_key) is entry:
+                # Later identical requests start afresh instead of joining a cancelled run.
+                del _inflight_async[loop_key]
+        if abandoned:
+            print(f"Every caller of {kind} generation {key[:12]} stopped waiting; cancelling it.")
+            task.cancel()
+
+
+def coalesce_sync(kind: str, params: Dict, produce: Callable[[], List[str]]) -> Tuple[List[str], str]:
+    """Thread-based counterpart of `coalesce_async` for blocking generators such as Lyria."""
+    key = generation_key(kind, params)
+    outputs = _cached_outputs(key)
+    if outputs is not None:
+        print(f"Ledger hit for {kind} {key[:12]}: {outputs}")
+        return outputs, STATUS_CACHED
+
+    with _inflight_lock:
+        entry = _inflight_sync.get(key)
+        owner = entry is None
+        if owner:
+            entry = {"done": threading.Event(), "outputs": None, "error": None}
+            _inflight_sync[key] = entry
+
+    if not owner:
+        print(f"Joining in-flight {kind} generation {key[:12]}.")
+        entry["done"].wait()
+        if entry["error"] is not None:
+            raise entry["error"]
+        return entry["outputs"], STATUS_JOINED
+
+    try:
+        # A generation with the same key may have completed since the lookup above.
+        entry["outputs"] = get_ledger().lookup(key)
+        if entry["outputs"] is not None:
+            return entry["outputs"], STATUS_CACHED
+        entry["outputs"] = produce()
+        get_ledger().record(key, kind, params, entry["outputs"])
+        return entry["outputs"], STATUS_GENERATED
+    except BaseException as e:
+        entry["error"] = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_sync.pop(key, None)
+        entry["done"].set()
@@ -1,36 +1,43 @@
 import base64
-import google.auth
-import google.auth.transport.requests
-import requests
 import os
 import uuid # For generating unique filenames
 from typing import Dict, Optional, Union # Union will be resolved to str effectively
 
-from dotenv import load_dotenv # For implicitly loading .env file
-from google.cloud import storage # For GCS upload
+from .deadline import UPLOAD_TIMEOUT_SECONDS, call_timeout
+from .gcp_auth import get_access_token, get_http_session
+from .render_queue import offload
 
-# Load environment variables from .env file if it exists
-load_dotenv()
+# NOTE: requests, google.auth, google.cloud.storage and dotenv are imported inside the
+# functions below so that importing the agent does not pay for them up front.
 
-# --- Helper function (no changes needed here) ---
+# (connect, read) timeouts for Lyria predictions; a 30 second clip usually renders well under the read limit.
+# The read timeout is capped by the deadline of the current production run, if any.
+LYRIA_REQUEST_TIMEOUT = (10, 300)
+
+# --- Helper function ---
 def _send_request_to_google_api(api_endpoint: str, access_token: str, data: Optional[Dict] = None) -> Dict:
-    """Sends an HTTP request to a Google API endpoint. Can raise requests.exceptions.RequestException."""
+    """Sends an HTTP request to a Google API endpoint. Can raise requests.exceptions.RequestException.
+
+    Uses the shared keep-alive session so repeated predictions reuse an open TLS connection.
+    """
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
     }
     # This can raise various requests.exceptions.RequestException (e.g., ConnectionError, Timeout)
-    response = requests.post(api_endpoint, headers=headers, json=data)
+    response = get_http_session().post(api_endpoint, headers=headers, json=data,
+                                       timeout=(LYRIA_REQUEST_TIMEOUT[0], call_timeout(LYRIA_REQUEST_TIMEOUT[1])))
     # This will raise HTTPError for bad responses (4xx or 5xx)
     response.raise_for_status()
     try:
         return response.json()
-    except requests.exceptions.JSONDecodeError as e:
+    except ValueError as e: # requests.exceptions.JSONDecodeError subclasses ValueError
         # This case handles 200 OK but with malformed JSON, re-raise to be caught in main func
         raise ValueError(f"API returned 200 OK but with invalid JSON: {e}. Response text: {response.text[:500]}")
 
 
 # --- Main function to generate a single WAV music file and upload to GCS ---
+@offload("lyria")
 def generate_lyria_music(
     prompt: str,
     negative_prompt: str # Optional str
@@ -45,11 +52,50 @@ def generate_lyria_music(
     - For Mood and Instrumentation use A peaceful and serene acoustic guitar piece, featuring a fingerpicked style, perfect for meditation.
     - For Tempo and Rhythm use	A tense, suspenseful underscore with a very slow, creeping tempo and a sparse, irregular rhythm. Primarily uses low strings and subtle percussion.
 
+    Identical prompts are served from the generation ledger (or join a generation that is
+    still running) instead of rendering the same music twice.
+
     Args:
         prompt: A detailed description of the music to generate.
         negative_prompt: (Optional) Description of what to exclude.
         
     """
+    from dotenv import load_dotenv
+    from .generation_ledger import coalesce_sync
+
+    load_dotenv()
+    if not prompt:
+        return "ERROR: A 'prompt' is required."
+    params = {
+        "model": os.getenv("LYRIA_MODEL_ID", "lyria-002"),
+        "prompt": prompt,
+        "negative_prompt": negative_prompt or None,
+    }
+
+    def produce():
+        result = _generate_lyria_music_uncached(prompt, negative_prompt)
+        if not result.startswith("gs://"):
+            # Errors are raised so they are shared with joined callers but never recorded.
+            raise RuntimeError(result)
+        return [result]
+
+    try:
+        outputs, ledger_status = coalesce_sync("lyria", params, produce)
+    except RuntimeError as e:
+        return str(e)
+    print(f"Lyria music {ledger_status}: {outputs[0]}")
+    return outputs[0]
+
+
+def _generate_lyria_music_uncached(prompt: str, negative_prompt: str) -> str:
+    """Renders one Lyria clip and uploads it; see `generate_lyria_music`."""
+    import google.auth.exceptions
+    import requests
+    from dotenv import load_dotenv # For implicitly loading .env file
+    from google.cloud import storage # For GCS upload
+
+    # Load environment variables from .env file if it exists
+    load_dotenv()
 
     # --- Resolve configuration from environment variables ---
     resolved_project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
@@ -66,13 +112,11 @@ def generate_lyria_music(
         return "ERROR: A 'prompt' is required."
     
     # --- 1. Authentication (for Lyria API) ---
+    # Tokens are cached process-wide and only refreshed shortly before they expire.
     access_token: Optional[str] = None
     try:
-        creds, _ = google.auth.default(scopes=['https://www.googleapis.com/auth/cloud-platform'])
-        auth_req = google.auth.transport.requests.Request()
-        creds.refresh(auth_req)
-        access_token = creds.token
-        if not access_token: # Should not happen if creds.refresh succeeded without error
+        access_token = get_access_token()
+        if not access_token: # Should not happen if the refresh succeeded without error
             return "ERROR: Failed to obtain access token after credential refresh."
     except google.auth.exceptions.DefaultCredentialsError:
         return "ERROR: Google Cloud ADC not found. Run 'gcloud auth application-default login'."
@@ -157,7 +201,8 @@ def generate_lyria_music(
         # b. Upload local WAV to GCS
         blob = bucket.blob(blob_name)
         print(f"Uploading '{local_wav_filename}' to GCS bucket '{gcs_bucket_name}'...")
-        blob.upload_from_filename(local_wav_filename, content_type='audio/wav')
+        blob.upload_from_filename(local_wav_filename, content_type='audio/wav',
+                                  timeout=call_timeout(UPLOAD_TIMEOUT_SECONDS))
         gcs_uri_result = f"gs://{gcs_bucket_name}/{blob_name}"
         print(f"✅ Audio successfully uploaded to GCS: {gcs_uri_result}")
 
@@ -0,0 +1,34 @@
+"""
+Which Gemini model each part of the agent runs on.
+
+Creative planning and scriptwriting (root_agent) stay on a pro model; the
+mechanical tool-execution loops (the operator, the scene producers and the
+assembler) run on a flash-class model, which answers tool-driven turns much
+faster and at a fraction of the token price. Both are configurable:
+
+    PLANNER_MODEL    default gemini-2.5-pro-preview-03-25
+    EXECUTOR_MODEL   default gemini-2.5-flash-preview-04-17
+"""
+import os
+from typing import Dict, Tuple
+
+DEFAULT_PLANNER_MODEL = "gemini-2.5-pro-preview-03-25"
+DEFAULT_EXECUTOR_MODEL = "gemini-2.5-flash-preview-04-17"
+
+PLANNER_MODEL = os.getenv("PLANNER_MODEL", DEFAULT_PLANNER_MODEL)
+EXECUTOR_MODEL = os.getenv("EXECUTOR_MODEL", DEFAULT_EXECUTOR_MODEL)
+
+# USD per million (input, output) tokens, for cost estimates in the replay benchmark.
+# List prices for prompts up to 200k tokens; output includes thinking tokens.
+MODEL_PRICES_PER_MILLION: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro-preview-03-25": (1.25, 10.00),
+    "gemini-2.5-flash-preview-04-17": (0.15, 3.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+}
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Returns the estimated USD cost of one model call, or 0.0 for a model without a known price."""
+    input_price, output_price = MODEL_PRICES_PER_MILLION.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
@@ -4,20 +4,23 @@ import time
 import tempfile
 import os
 import logging
-import google.auth
 import base64
 import asyncio
 from urllib.parse import urlparse
-from typing import List, Dict
-from google.protobuf.duration_pb2 import Duration
-from google.cloud.video.transcoder_v1.types import Job
-from google.cloud.video import transcoder_v1
-from google.cloud.exceptions import NotFound, GoogleCloudError
-from google.cloud import storage
-from google.api_core.exceptions import GoogleAPIError
+from typing import List, Dict, Tuple
 import math # Import math for log10
 
-from tinytag import TinyTag
+from .narration_predictor import record_measured_uri
+from .progress import report_artifact
+from .tool_results import INVALID_ARGUMENT, MediaResult, ToolError
+from .transcoder_jobs import submit_transcoder_job, wait_for_transcoder_job
+
+# Transcoder encode settings for muxed scenes. Renders are cached by a hash that
+# includes these, so changing them invalidates previously muxed outputs.
+MUX_AUDIO_ENCODE_SETTINGS = {
+    "video": {"height_pixels": 720, "width_pixels": 1280, "bitrate_bps": 5000000, "frame_rate": 30},
+    "audio": {"codec": "aac", "bitrate_bps": 128000, "sample_rate_hertz": 48000, "channel_count": 2},
+}
 
 def get_mp3_audio_duration_gcs(
     audio_uri: str,
@@ -32,6 +35,11 @@ def get_mp3_audio_duration_gcs(
     Returns:
         str: The duration of the audio in seconds, or error message if an error occurs.
     """
+    # Storage and tinytag are only needed when the tool actually runs.
+    from google.cloud import storage
+    from google.cloud.exceptions import NotFound, GoogleCloudError
+    from tinytag import TinyTag
+
     if not audio_uri.startswith("gs://"):
         return(f"Error: Invalid GCS audio URI: {audio_uri}. Input URIs must start with 'gs://'.")
          
@@ -79,6 +87,8 @@ def get_mp3_audio_duration_gcs(
         try:
             tag = TinyTag.get(temp_file_path)
             duration = tag.duration
+            if duration is not None:
+                record_measured_uri(audio_uri, duration)
             return duration
         except Exception as e:
             return(f"Error extracting duration using tinytag from audio file '{temp_file_path}': {e} This might happen if the file is corrupted or not a valid audio file readable by tinytag.")
@@ -101,30 +111,27 @@ def get_mp3_audio_duration_gcs(
                 return(f"Error deleting temporary audio file '{temp_file_path}': {e}")
 
 
-async def mux_audio(
-    video_uri: str,
-    audio_uri: str,
-    end_time_offset: float,
-
-) -> str:
+async def start_mux_audio_job(video_uri: str, audio_uri: str, end_time_offset: float) -> Tuple[str, str]:
     """
-    Muxes the audio and video streams using the Transcoder API and
-    stores the result in GCS. Project ID is inferred from the environment.
-    Operates entirely on GCS paths, avoiding local filesystem storage.
+    Creates the Transcoder job that muxes an audio and a video stream without waiting for it.
 
-    Args:
-        video_uri (str): The GCS URI of the video file (e.g., "gs://your-bucket/video.mp4").
-        audio_uri (str): The GCS URI of the audio file (e.g., "gs://your-bucket/audio.pcm").
-        end_time_offset (float): The end time offset for the muxed output in seconds (must be the minimum of video and audio durations).
-
-                        
     Returns:
-        str: The GCS URI of the successfully muxed MP4 file., or error message if failed.
+        (job_name, output_uri). Wait for the job with `wait_for_transcoder_job`.
 
     Raises:
         ValueError: If required URIs are not provided or are invalid, or if project ID cannot be inferred.
-        Exception: If the Transcoder job fails or encounters an error.
     """
+    return await _start_mux_job([(video_uri, audio_uri, end_time_offset)])
+
+
+async def _start_mux_job(clips: List[Tuple[str, str, float]]) -> Tuple[str, str]:
+    """
+    Creates one Transcoder job that muxes each (video_uri, audio_uri, end_time_offset) clip
+    and plays the muxed clips back to back in a single output file.
+    """
+    from google.protobuf.duration_pb2 import Duration
+    from google.cloud.video import transcoder_v1
+
     
     # hard code bucket
     # TODO: parmaterize this outside the LLM 
@@ -132,27 +139,14 @@ async def mux_audio(
 
     output_uri_base=f"gs://{bucket_name}/muxed/"
 
-    if not video_uri or not audio_uri:
-        raise ValueError("Both 'video_uri' and 'audio_uri' must be provided.")
-    if not video_uri.startswith("gs://"):
-        raise ValueError(f"Invalid GCS video URI: {video_uri}. Input URIs must start with 'gs://'.")
-    if not audio_uri.startswith("gs://"):
-        raise ValueError(f"Invalid GCS audio URI: {audio_uri}. Input URIs must start with 'gs://'.")
-    
-    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1") # Default to us-central1 if not set
-
+    for video_uri, audio_uri, _ in clips:
+        if not video_uri or not audio_uri:
+            raise ValueError("Both 'video_uri' and 'audio_uri' must be provided.")
+        if not video_uri.startswith("gs://"):
+            raise ValueError(f"Invalid GCS video URI: {video_uri}. Input URIs must start with 'gs://'.")
+        if not audio_uri.startswith("gs://"):
+            raise ValueError(f"Invalid GCS audio URI: {audio_uri}. Input URIs must start with 'gs://'.")
     
-    # Infer the project ID from the environment
-    try:
-        credentials, project_id = google.auth.default()
-        if not project_id:
-            raise ValueError("Could not infer Google Cloud Project ID from the environment. "
-                             "Please set GOOGLE_CLOUD_PROJECT environment variable, "
-                             "or configure gcloud CLI with 'gcloud config set project <project-id>', "
-                             "or ensure your credentials are properly set.")
-    except Exception as e:
-        raise ValueError(f"Failed to infer Google Cloud Project ID: {e}")
-
     # Ensure output_uri_base ends with a slash for proper GCS path construction
     if not output_uri_base.endswith('/'):
         output_uri_base += '/'
@@ -161,42 +155,36 @@ async def mux_audio(
     output_filename = uuid.uuid4().hex + ".mp4"
     final_output_uri = f"{output_uri_base}{output_filename}"
 
-    # Use the async client
-    client = transcoder_v1.TranscoderServiceAsyncClient()
-
-    # Construct the parent resource path using the inferred project ID and provided location
-    parent = f"projects/{project_id}/locations/{location}"
-
     # Define the job configuration
     job_config = transcoder_v1.types.Job()
     job_config.output_uri = output_uri_base # This is the base path
     job_config.config = transcoder_v1.types.JobConfig()
 
-    # Define inputs with unique keys for the video and audio URIs
-    job_config.config.inputs.append(
-        transcoder_v1.types.Input(key="video_input_key", uri=video_uri)
-    )
-    job_config.config.inputs.append(
-        transcoder_v1.types.Input(key="audio_input_key", uri=audio_uri)
-    )
+    for i, (video_uri, audio_uri, end_time_offset) in enumerate(clips):
+        # Define inputs with unique keys for the video and audio URIs
+        job_config.config.inputs.append(
+            transcoder_v1.types.Input(key=f"video_input_{i}", uri=video_uri)
+        )
+        job_config.config.inputs.append(
+            transcoder_v1.types.Input(key=f"audio_input_{i}", uri=audio_uri)
+        )
 
-    # calucualte the google proto duration from a float
-    end_time_offset_duration = Duration()
-    end_time_offset_duration.seconds = int(end_time_offset)
-    nanoseconds = int((end_time_offset - end_time_offset_duration.seconds) * 1e9)
-    end_time_offset_duration.nanos = nanoseconds
-
-    # Define edit list for muxing, referencing both video and audio inputs
-    # Explicitly set start_time_offset and end_time_offset
-    job_config.config.edit_list.append(
-        transcoder_v1.types.EditAtom(
-            key="atom_part_0", # Single atom for muxing
-            inputs=["video_input_key", "audio_input_key"],
-            start_time_offset=Duration(seconds=0),
-            end_time_offset=end_time_offset_duration,
-          #  end_time_offset=Duration(seconds=int(atom_duration), nanos=int((atom_duration - int(atom_duration)) * 1e9)),
+        # calucualte the google proto duration from a float
+        end_time_offset_duration = Duration()
+        end_time_offset_duration.seconds = int(end_time_offset)
+        nanoseconds = int((end_time_offset - end_time_offset_duration.seconds) * 1e9)
+        end_time_offset_duration.nanos = nanoseconds
+
+        # One atom per clip, referencing both its video and audio inputs.
+        # Explicitly set start_time_offset and end_time_offset
+        job_config.config.edit_list.append(
+            transcoder_v1.types.EditAtom(
+                key=f"atom_part_{i}",
+                inputs=[f"video_input_{i}", f"audio_input_{i}"],
+                start_time_offset=Duration(seconds=0),
+                end_time_offset=end_time_offset_duration,
+            )
         )
-    )
 
     # Define elementary streams (encoding settings for video and audio tracks).
     # Video stream (using H264 for MP4 output)
@@ -204,13 +192,8 @@ async def mux_audio(
         transcoder_v1.types.ElementaryStream(
             key="output_video_stream",
             video_stream=transcoder_v1.types.VideoStream(
-                h264=transcoder_v1.types.VideoStream.H264CodecSettings(
-                    height_pixels=720,    # Example: 720p (HD) - adjust as needed
-                    width_pixels=1280,    # Example: 720p (HD) - adjust as needed
-                    bitrate_bps=5000000,  # Example: 5 Mbps for HD video
-                    frame_rate=30,        # Example: 30 fps
-                    # Other H264 settings can be added here if needed, e.g., preset, crf_level
-                ),
+                # 720p (HD), 5 Mbps, 30 fps
+                h264=transcoder_v1.types.VideoStream.H264CodecSettings(**MUX_AUDIO_ENCODE_SETTINGS["video"]),
             ),
         )
     )
@@ -219,12 +202,8 @@ async def mux_audio(
     job_config.config.elementary_streams.append(
         transcoder_v1.types.ElementaryStream(
             key="output_audio_stream",
-            audio_stream=transcoder_v1.types.AudioStream(
-                codec="aac", # Recommended for MP4 output
-                bitrate_bps=128000, # Example: 128 kbps for AAC audio
-                sample_rate_hertz=48000, # Example: 48 kHz
-                channel_count=2, # Example: Stereo
-            ),
+            # AAC (recommended for MP4 output), 128 kbps, 48 kHz stereo
+            audio_stream=transcoder_v1.types.AudioStream(**MUX_AUDIO_ENCODE_SETTINGS["audio"]),
         )
     )
 
@@ -243,51 +222,45 @@ async def mux_audio(
     # Set job retention policy to a default of 1 day after completion
     job_config.ttl_after_completion_days = 1
 
+    # Create the job in the region the scheduler picks (see transcoder_scheduler)
+    create_job_response = await submit_transcoder_job(job_config)
+    print(f"Transcoder job created: {create_job_response.name}")
+    return create_job_response.name, final_output_uri
+
+
+async def mux_audio(
+    video_uri: str,
+    audio_uri: str,
+    end_time_offset: float,
+
+) -> str:
+    """
+    Muxes the audio and video streams using the Transcoder API and
+    stores the result in GCS. Project ID is inferred from the environment.
+    Operates entirely on GCS paths, avoiding local filesystem storage.
+
+    Args:
+        video_uri (str): The GCS URI of the video file (e.g., "gs://your-bucket/video.mp4").
+        audio_uri (str): The GCS URI of the audio file (e.g., "gs://your-bucket/audio.pcm").
+        end_time_offset (float): The end time offset for the muxed output in seconds (must be the minimum of video and audio durations).
+
+                        
+    Returns:
+        str: The GCS URI of the successfully muxed MP4 file., or error message if failed.
+
+    Raises:
+        ValueError: If required URIs are not provided or are invalid, or if project ID cannot be inferred.
+        Exception: If the Transcoder job fails or encounters an error.
+    """
     job_name = None
     try:
-        # Asynchronously send the job creation request
-        create_job_response = await client.create_job(parent=parent, job=job_config)
-        job_name = create_job_response.name
-        print(f"Transcoder job created: {job_name}")
+        job_name, final_output_uri = await start_mux_audio_job(video_uri, audio_uri, end_time_offset)
 
         # Asynchronously poll for job completion
-        while True:
-            await asyncio.sleep(15) # Polling interval (e.g., 15 seconds)
-            print(f"Polling status for job {job_name}...")
-            response = await client.get_job(name=job_name)
-            current_state_name = Job.ProcessingState(response.state).name
-            print(f"Job status: {current_state_name}")
-
-            if response.state == Job.ProcessingState.SUCCEEDED:
-                print(f"Transcoder job '{job_name}' succeeded.")
-                # Return the full GCS URI of the muxed file
-                return final_output_uri
-
-            elif response.state == Job.ProcessingState.FAILED:
-                error_message = "Unknown error"
-                error_details_str = ""
-                if response.error:
-                    error_message = getattr(response.error, 'message', str(response.error))
-                    details_list = getattr(response.error, 'details', [])
-                    if details_list:
-                         error_details_str = f" | Details: {details_list}"
-                raise Exception(f"Transcoder job '{job_name}' failed: {error_message}{error_details_str}")
-
-            elif response.state == Job.ProcessingState.PENDING:
-                 print(f"Transcoder job '{job_name}' is PENDING. Waiting...")
-
-            elif response.state == Job.ProcessingState.RUNNING:
-                 progress = getattr(response, 'progress', None)
-                 progress_percent_str = "N/A"
-                 if progress and hasattr(progress, 'processed') and progress.processed is not None:
-                     progress_percent_str = f"{progress.processed:.1%}"
-                 print(f"Transcoder job '{job_name}' is RUNNING. Progress: {progress_percent_str}. Waiting...")
-
-            elif response.state == Job.ProcessingState.UNSPECIFIED:
-                print(f"Transcoder job '{job_name}' is in an UNSPECIFIED state. Waiting...")
-
-            else:
-                print(f"Transcoder job '{job_name}' is in an unexpected state: {current_state_name}. Waiting...")
+        await wait_for_transcoder_job(job_name)
+        report_artifact(final_output_uri, "muxed")
+        # Return the full GCS URI of the muxed file
+        return final_output_uri
 
     except Exception as e:
         print(f"\n--- An unexpected error occurred in mux_audio ---")
@@ -300,3 +273,65 @@ async def mux_audio(
        # raise e
         return f"Error: {type(e).__name__} - {e}"
 
+
+
+async def mux_audio_batch(
+    video_uris: List[str],
+    audio_uris: List[str],
+    offsets: List[float],
+    join: bool = False,
+) -> dict:
+    """
+    Muxes the narration of several scenes into their clips with one call.
+
+    The Transcoder API encodes one timeline per job, so scenes that each need their own
+    file get one job apiece, all created and waited on together. With join true every
+    scene goes into a single job whose edit list muxes the scenes and plays them back to
+    back, replacing the per-scene muxes and the video_join_tool call. The three lists are
+    parallel: scene i muxes audio_uris[i] into video_uris[i] up to offsets[i].
+
+    Args:
+        video_uris: The GCS URI of each scene's video, in scene order.
+        audio_uris: The GCS URI of each scene's narration.
+        offsets: Each scene's end time offset in seconds, the shorter of its video and audio durations.
+        join: If true, return one joined video of all scenes instead of one video per scene.
+
+    Returns:
+        dict: "scenes" with each scene's muxed video (uri, duration_s) or error, and "jobs",
+              the number of Transcoder jobs used; with join, "uri" and "duration_s" of the
+              joined video instead of the per-scene videos.
+    """
+    if not len(video_uris) == len(audio_uris) == len(offsets):
+        return ToolError(INVALID_ARGUMENT, (
+            f"video_uris, audio_uris and offsets must have the same length, got "
+            f"{len(video_uris)}, {len(audio_uris)} and {len(offsets)}.")).to_dict()
+    try:
+        clips = [(video_uri, audio_uri, float(offset))
+                 for video_uri, audio_uri, offset in zip(video_uris, audio_uris, offsets)]
+    except (TypeError, ValueError) as e:
+        return ToolError(INVALID_ARGUMENT, f"offsets must be numbers: {e}").to_dict()
+    if not clips:
+        return ToolError(INVALID_ARGUMENT, "Pass at least one scene.").to_dict()
+
+    if join:
+        try:
+            job_name, output_uri = await _start_mux_job(clips)
+            await wait_for_transcoder_job(job_name)
+        except Exception as e:
+            return ToolError.from_exception(e).to_dict()
+        report_artifact(output_uri, "muxed and joined")
+        return {**MediaResult(output_uri, sum(clip[2] for clip in clips), has_audio=True).to_dict(), "jobs": 1}
+
+    async def mux_one(number: int, clip: Tuple[str, str, float]) -> Dict:
+        job_name, output_uri = await start_mux_audio_job(*clip)
+        await wait_for_transcoder_job(job_name)
+        report_artifact(output_uri, f"scene {number} muxed")
+        return MediaResult(output_uri, clip[2], has_audio=True).to_dict()
+
+    # Jobs are created together (the scheduler spreads them over regions) and waited on together.
+    results = await asyncio.gather(*(mux_one(i + 1, clip) for i, clip in enumerate(clips)), return_exceptions=True)
+    return {
+        "scenes": [ToolError.from_exception(result).to_dict() if isinstance(result, BaseException) else result
+                   for result in results],
+        "jobs": len(clips),
+    }
@@ -4,20 +4,20 @@ import time
 import tempfile
 import os
 import logging
-import google.auth
 import base64
 import asyncio
 from urllib.parse import urlparse
 from typing import List, Dict
-from google.protobuf.duration_pb2 import Duration
-from google.cloud.video.transcoder_v1.types import Job
-from google.cloud.video import transcoder_v1
-from google.cloud.exceptions import NotFound, GoogleCloudError
-from google.cloud import storage
-from google.api_core.exceptions import GoogleAPIError
 import math # Import math for log10
 
-from tinytag import TinyTag
+from .progress import report_artifact
+from .transcoder_jobs import submit_transcoder_job, wait_for_transcoder_job
+
+# Transcoder encode settings for music muxes (part of the render cache key).
+MUX_MUSIC_ENCODE_SETTINGS = {
+    "video": {"bitrate_bps": 15000000, "frame_rate": 30},
+    "audio": {"codec": "aac", "bitrate_bps": 128000, "sample_rate_hertz": 48000, "channel_count": 2},
+}
 
 
 
@@ -54,6 +54,9 @@ async def mux_music(
                     or if project ID cannot be inferred.
         Exception: If the Transcoder job fails or encounters an error.
     """
+    from google.protobuf.duration_pb2 import Duration
+    from google.cloud.video import transcoder_v1
+
 
     output_uri_base = "gs://byron-alpha-vpagent/muxed_music/" # Dedicated output folder
 
@@ -66,24 +69,12 @@ async def mux_music(
     if not 0.0 <= volume_music <= 1.0:
         raise ValueError("Volume must be between 0.0 and 1.0.")
     
-    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1") # Default to us-central1 if not set
-
-    try:
-        credentials, project_id = google.auth.default()
-        if not project_id:
-            raise ValueError("Could not infer Google Cloud Project ID from the environment.")
-    except Exception as e:
-        raise ValueError(f"Failed to infer Google Cloud Project ID: {e}")
-
     if not output_uri_base.endswith('/'):
         output_uri_base += '/'
 
     output_filename = uuid.uuid4().hex + "_with_music.mp4"
     final_output_uri = f"{output_uri_base}{output_filename}"
 
-    client = transcoder_v1.TranscoderServiceAsyncClient()
-    parent = f"projects/{project_id}/locations/{location}"
-
     job_config = transcoder_v1.types.Job()
     job_config.output_uri = output_uri_base
     job_config.config = transcoder_v1.types.JobConfig()
@@ -133,12 +124,7 @@ async def mux_music(
         transcoder_v1.types.ElementaryStream(
             key="output_video_stream",
             video_stream=transcoder_v1.types.VideoStream(
-                h264=transcoder_v1.types.VideoStream.H264CodecSettings(
-                    # height_pixels=720,
-                    # width_pixels=1280,
-                    bitrate_bps=15000000,
-                    frame_rate=30,
-                ),
+                h264=transcoder_v1.types.VideoStream.H264CodecSettings(**MUX_MUSIC_ENCODE_SETTINGS["video"]),
             ),
         )
     )
@@ -148,10 +134,7 @@ async def mux_music(
         transcoder_v1.types.ElementaryStream(
             key="output_audio_stream",
             audio_stream=transcoder_v1.types.AudioStream(
-                codec="aac", # Recommended for MP4 output
-                bitrate_bps=128000, # Example: 128 kbps for AAC audio
-                sample_rate_hertz=48000, # Example: 48 kHz
-                channel_count=2, # Example: Stereont=2,
+                **MUX_MUSIC_ENCODE_SETTINGS["audio"], # AAC, 128 kbps, 48 kHz stereo
                 mapping_=[ 
                     transcoder_v1.types.AudioStream.AudioMapping (
                         atom_key="main_content_atom", # Reference the music edit atom
@@ -206,40 +189,13 @@ async def mux_music(
 
     job_name = None
     try:
-        create_job_response = await client.create_job(parent=parent, job=job_config)
+        create_job_response = await submit_transcoder_job(job_config)
         job_name = create_job_response.name
         print(f"Transcoder job created: {job_name}")
 
-        while True:
-            await asyncio.sleep(15)
-            print(f"Polling status for job {job_name}...")
-            response = await client.get_job(name=job_name)
-            current_state_name = Job.ProcessingState(response.state).name
-            print(f"Job status: {current_state_name}")
-
-            if response.state == Job.ProcessingState.SUCCEEDED:
-                print(f"Transcoder job '{job_name}' succeeded.")
-                return final_output_uri
-
-            elif response.state == Job.ProcessingState.FAILED:
-                error_message = "Unknown error"
-                error_details_str = ""
-                if response.error:
-                    error_message = getattr(response.error, 'message', str(response.error))
-                    details_list = getattr(response.error, 'details', [])
-                    if details_list:
-                         error_details_str = f" | Details: {details_list}"
-                raise Exception(f"Transcoder job '{job_name}' failed: {error_message}{error_details_str}")
-            elif response.state == Job.ProcessingState.PENDING:
-                print(f"Transcoder job '{job_name}' is PENDING. Waiting...")
-            elif response.state == Job.ProcessingState.RUNNING:
-                progress = getattr(response, 'progress', None)
-                progress_percent_str = "N/A"
-                if progress and hasattr(progress, 'processed') and progress.processed is not None:
-                    progress_percent_str = f"{progress.processed:.1%}"
-                print(f"Transcoder job '{job_name}' is RUNNING. Progress: {progress_percent_str}. Waiting...")
-            else:
-                print(f"Transcoder job '{job_name}' is in an unexpected state: {current_state_name}. Waiting...")
+        await wait_for_transcoder_job(job_name)
+        report_artifact(final_output_uri, "with music")
+        return final_output_uri
 
     except Exception as e:
         print(f"\n--- An unexpected error occurred in mux_music ---")
@@ -0,0 +1,217 @@
+"""
+Unified narration engine: one entry point over the online and long-audio TTS paths.
+
+The package grew two unrelated Text-to-Speech implementations: online Chirp 3
+HD synthesis in `chirp_audio` (MP3, plain text, limited to 5000 bytes per
+request) and the long-audio LRO in `text_to_speech` (LINEAR16, SSML, blocking
+on `operation.result()` with a hard-coded project and bucket). `synthesize_narration`
+routes each request to the right one:
+
+* plain text that fits an online request goes to Chirp 3 HD online synthesis,
+  which has the lowest latency for a scene narration;
+* SSML (`<speak>...`) or text over the online size limit goes to the long-audio
+  API, started with the async client and polled without blocking the event loop.
+  Chirp 3 HD voices do not read SSML, so those requests use the WaveNet voice of
+  the same gender.
+
+Both paths are normalized to the same output: 16-bit mono LINEAR16 WAV at
+NARRATION_SAMPLE_RATE, with the measured duration returned alongside the URI.
+"""
+import asyncio
+import os
+import time
+import uuid
+from typing import TYPE_CHECKING, Tuple
+
+from .audio_fit import _decode_audio, _encode_wav
+from .chirp_audio import VOICE_CATEGORY_DEFAULTS as CHIRP_VOICES
+from .chirp_audio import build_synthesis_request, create_tts_async_client
+from .deadline import UPLOAD_TIMEOUT_SECONDS, call_timeout, check_deadline
+from .render_queue import offload
+from .text_to_speech import VOICE_CATEGORY_DEFAULTS as LONG_AUDIO_VOICES
+from .tool_results import MediaResult
+
+if TYPE_CHECKING:
+    import numpy as np
+
+NARRATION_SAMPLE_RATE = 24000
+# Online synthesize_speech rejects inputs over 5000 bytes; keep a margin.
+ONLINE_MAX_INPUT_BYTES = 4800
+LONG_AUDIO_POLL_INTERVAL_SECONDS = 5
+LONG_AUDIO_TIMEOUT_SECONDS = 900
+ONLINE_TIMEOUT_SECONDS = 300.0
+
+# Long-audio voice used for a Chirp 3 HD category, keyed by its SSML gender.
+LONG_AUDIO_FALLBACK_VOICES = {"FEMALE": "female_high", "MALE": "male_high"}
+
+
+def is_ssml(text: str) -> bool:
+    return text.lstrip().startswith("<speak")
+
+
+def choose_synthesis_path(text: str, voice_category: str) -> str:
+    """Returns "online" or "long_audio" for a narration request."""
+    normalized_category = voice_category.lower().replace(" ", "_")
+    if normalized_category in LONG_AUDIO_VOICES or is_ssml(text):
+        return "long_audio"
+    if len(text.encode("utf-8")) > ONLINE_MAX_INPUT_BYTES:
+        return "long_audio"
+    return "online"
+
+
+def _long_audio_voice(voice_category: str) -> str:
+    """Maps any voice category to a category of the long-audio voice table."""
+    normalized_category = voice_category.lower().replace(" ", "_")
+    if normalized_category in LONG_AUDIO_VOICES:
+        return normalized_category
+    if normalized_category in CHIRP_VOICES:
+        return LONG_AUDIO_FALLBACK_VOICES[CHIRP_VOICES[normalized_category]["ssml_gender"]]
+    raise ValueError(
+        f"Invalid voice_category: '{voice_category}'. "
+        f"Valid options are: {', '.join(list(CHIRP_VOICES) + list(LONG_AUDIO_VOICES))}"
+    )
+
+
+def _resample(samples: "np.ndarray", source_rate: int, target_rate: int) -> "np.ndarray":
+    """Linear-interpolation resampling; only used when an API ignores the requested rate."""
+    import numpy as np
+
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    target_len = int(round(len(samples) * target_rate / source_rate))
+    positions = np.arange(target_len, dtype=np.float64) * source_rate / target_rate
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def normalize_audio(data: bytes, file_extension: str = ".wav") -> Tuple[bytes, float]:
+    """
+    Converts audio bytes to mono 16-bit WAV at NARRATION_SAMPLE_RATE and returns (wav_bytes, duration_seconds).
+
+    Headerless data from a ".pcm" source is read as raw 16-bit mono PCM at NARRATION_SAMPLE_RATE.
+    """
+    import numpy as np
+
+    if file_extension == ".pcm" and data[:4] != b"RIFF":
+        samples = np.frombuffer(data[: len(data) - len(data) % 2], dtype="<i2").astype(np.float32) / 32768.0
+        return _encode_wav(samples, NARRATION_SAMPLE_RATE), len(samples) / NARRATION_SAMPLE_RATE
+    samples, sample_rate = _decode_audio(data, file_extension)
+    samples = _resample(samples, sample_rate, NARRATION_SAMPLE_RATE)
+    return _encode_wav(samples, NARRATION_SAMPLE_RATE), len(samples) / NARRATION_SAMPLE_RATE
+
+
+async def _synthesize_online(text: str, voice_category: str, speaking_rate: float) -> bytes:
+    client = create_tts_async_client()
+    request = build_synthesis_request(
+        text, voice_category, speaking_rate, audio_encoding="LINEAR16", sample_rate_hertz=NARRATION_SAMPLE_RATE
+    )
+    response = await client.synthesize_speech(**request, timeout=call_timeout(ONLINE_TIMEOUT_SECONDS))
+    return response.audio_content
+
+
+async def _synthesize_long_audio(text: str, voice_category: str, speaking_rate: float, bucket) -> bytes:
+    """Runs the long-audio LRO, polling it asynchronously, and returns the LINEAR16 audio it wrote to GCS."""
+    from google.cloud import texttospeech_v1 as texttospeech
+
+    from .gcp_auth import get_project_id
+
+    voice_config = LONG_AUDIO_VOICES[_long_audio_voice(voice_category)]
+    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+    raw_blob_name = f"tts_long_audio/{uuid.uuid4()}.pcm"
+    request = texttospeech.SynthesizeLongAudioRequest(
+        input=texttospeech.SynthesisInput(ssml=text) if is_ssml(text) else texttospeech.SynthesisInput(text=text),
+        voice=texttospeech.VoiceSelectionParams(
+            language_code=voice_config["language_code"],
+            name=voice_config["name"],
+            ssml_gender=texttospeech.SsmlVoiceGender[voice_config["ssml_gender"]],
+        ),
+        audio_config=texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+            speaking_rate=speaking_rate,
+            sample_rate_hertz=NARRATION_SAMPLE_RATE,
+        ),
+        output_gcs_uri=f"gs://{bucket.name}/{raw_blob_name}",
+        parent=f"projects/{get_project_id()}/locations/{location}",
+    )
+
+    client = texttospeech.TextToSpeechLongAudioSynthesizeAsyncClient()
+    operation = await client.synthesize_long_audio(request=request)
+    print(f"Waiting for long-audio operation {operation.operation.name}...")
+    deadline = time.monotonic() + LONG_AUDIO_TIMEOUT_SECONDS
+    while not await operation.done():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Long-audio synthesis did not finish within {LONG_AUDIO_TIMEOUT_SECONDS} seconds.")
+        check_deadline()
+        await asyncio.sleep(LONG_AUDIO_POLL_INTERVAL_SECONDS)
+    if operation.operation.HasField("error"):
+        raise RuntimeError(f"Long-audio synthesis failed: {operation.operation.error.message}")
+
+    raw_blob = bucket.blob(raw_blob_name)
+    data = await asyncio.to_thread(raw_blob.download_as_bytes)
+    # The normalized copy replaces the raw LRO output.
+    await asyncio.to_thread(raw_blob.delete)
+    return data
+
+
+@offload("tts")
+async def synthesize_narration(text: str, voice_category: str, speaking_rate: float = 1.0) -> dict:
+    """
+    Synthesizes narration, automatically choosing online or long-audio synthesis.
+
+    Short plain-text narration uses low-latency Chirp 3 HD online synthesis. SSML
+    (text starting with <speak>) or text longer than about 4800 bytes uses the long-audio
+    API; Chirp 3 HD voices fall back to a WaveNet voice of the same gender there. Every
+    result is a 24 kHz mono LINEAR16 WAV, returned with its measured duration.
+
+    Args:
+        text: Plain narration text, or SSML wrapped in <speak> for the long-audio path.
+        voice_category: A Chirp 3 HD voice category accepted by text_to_speech, or one of
+                        male_high, female_high, male_low, female_low.
+        speaking_rate: Speed of speech (e.g., 1.0 for normal). Defaults to 1.0.
+
+    Returns:
+        dict: uri and duration_s of the WAV (has_audio true). Or an error message string.
+    """
+    from google.cloud import storage
+
+    if not text.strip():
+        return "Error: text is empty."
+    try:
+        path = choose_synthesis_path(text, voice_category)
+        normalized_category = voice_category.lower().replace(" ", "_")
+        if path == "long_audio":
+            normalized_category = _long_audio_voice(voice_category)
+        elif normalized_category not in CHIRP_VOICES:
+            raise ValueError(f"Invalid voice_category: '{voice_category}'.")
+    except ValueError as e:
+        return f"Error: {e}"
+
+    gcs_bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET", "byron-alpha-vpagent")
+    started = time.monotonic()
+    print(f"Synthesizing {len(text)} characters via the {path} path with voice '{normalized_category}'...")
+    try:
+        bucket = storage.Client().bucket(gcs_bucket_name)
+        if path == "online":
+            audio = await _synthesize_online(text, normalized_category, speaking_rate)
+        else:
+            audio = await _synthesize_long_audio(text, normalized_category, speaking_rate, bucket)
+        wav_bytes, duration = await asyncio.to_thread(normalize_audio, audio, ".wav" if path == "online" else ".pcm")
+        blob_name = f"narration_{uuid.uuid4()}.wav"
+        await asyncio.to_thread(
+            bucket.blob(blob_name).upload_from_string, wav_bytes, content_type="audio/wav",
+            timeout=call_timeout(UPLOAD_TIMEOUT_SECONDS),
+        )
+    except Exception as e:
+        return f"Error synthesizing narration via the {path} path: {type(e).__name__}: {e}"
+
+    gcs_uri = f"gs://{gcs_bucket_name}/{blob_name}"
+    print(f"✅ Narration uploaded to GCS: {gcs_uri} ({duration:.2f}s)")
+    if path == "online":
+        from .narration_predictor import get_predictor
+        try:
+            get_predictor().record(text, normalized_category, speaking_rate, duration)
+        except Exception as e:
+            print(f"WARNING: Could not record narration measurement for '{gcs_uri}': {e}")
+
+    print(f"Narration via the {path} path took {time.monotonic() - started:.2f}s "
+          f"(voice '{normalized_category}', LINEAR16 {NARRATION_SAMPLE_RATE} Hz).")
+    return MediaResult(gcs_uri, duration, has_audio=True).to_dict()
@@ -0,0 +1,302 @@
+"""
+Local narration duration predictor, calibrated from past synthesis runs.
+
+The agent used to learn whether a narration fits its 4-8 second window only by
+synthesizing it, probing the MP3 and retrying with another `speaking_rate` up
+to three times. This module predicts the duration from text features instead:
+
+    duration * speaking_rate ~= b0 + b1 * syllables + b2 * ellipses
+                                + b3 * dashes + b4 * sentence_stops + b5 * commas
+
+Coefficients are kept per voice category (see `VOICE_CATEGORY_DEFAULTS`). Every
+measured synthesis is stored in a local SQLite database and the coefficients are
+refitted with ridge regression pulled towards the priors below, so a voice with
+few measurements behaves like the prior and converges as data comes in.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from .chirp_audio import VOICE_CATEGORY_DEFAULTS
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".video_producer_agent", "narration_durations.db")
+
+# Prior coefficients in seconds at speaking_rate 1.0:
+# intercept, per syllable, per "...", per "-", per sentence stop, per comma.
+PRIOR_COEFFICIENTS = (0.35, 0.19, 0.55, 0.25, 0.35, 0.18)
+# Strength of the pull towards the prior (in "virtual samples").
+PRIOR_WEIGHT = 5.0
+# Only the most recent measurements per voice are used for calibration.
+MAX_CALIBRATION_SAMPLES = 500
+
+# Speaking rates the agent is allowed to use (see the rules in agent.py).
+MIN_SPEAKING_RATE = 0.8
+MAX_SPEAKING_RATE = 1.3
+
+_WORD_RE = re.compile(r"[A-Za-z']+|\d+")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+
+
+def count_syllables(word: str) -> int:
+    """Heuristic English syllable count for a single word or number."""
+    if word.isdigit():
+        # Numbers are read out; roughly one and a half syllables per digit.
+        return max(1, round(len(word) * 1.5))
+    word = word.lower().strip("'")
+    if not word:
+        return 0
+    groups = len(_VOWEL_GROUP_RE.findall(word))
+    if word.endswith("e") and not word.endswith(("le", "ee", "ye")) and groups > 1:
+        groups -= 1 # Silent trailing e ("make", "voice")
+    return max(1, groups)
+
+
+def text_features(text: str) -> List[float]:
+    """Returns the feature vector [1, syllables, ellipses, dashes, stops, commas] for a narration."""
+    normalized = text.replace("…", "...")
+    ellipses = len(re.findall(r"\.{3,}", normalized))
+    without_ellipses = re.sub(r"\.{3,}", " ", normalized)
+    dashes = len(re.findall(r"\s[-–—]+\s|—", without_ellipses))
+    stops = len(re.findall(r"[.!?]+", without_ellipses))
+    commas = len(re.findall(r"[,;:]", without_ellipses))
+    syllables = sum(count_syllables(word) for word in _WORD_RE.findall(without_ellipses))
+    return [1.0, float(syllables), float(ellipses), float(dashes), float(stops), float(commas)]
+
+
+def _solve_linear_system(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """Solves matrix * x = vector with Gaussian elimination and partial pivoting."""
+    n = len(vector)
+    augmented = [list(row) + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(augmented[r][col]))
+        if abs(augmented[pivot][col]) < 1e-12:
+            raise ValueError("Singular calibration matrix.")
+        augmented[col], augmented[pivot] = augmented[pivot], augmented[col]
+        for row in range(col + 1, n):
+            factor = augmented[row][col] / augmented[col][col]
+            for k in range(col, n + 1):
+                augmented[row][k] -= factor * augmented[col][k]
+    solution = [0.0] * n
+    for row in range(n - 1, -1, -1):
+        total = augmented[row][n] - sum(augmented[row][k] * solution[k] for k in range(row + 1, n))
+        solution[row] = total / augmented[row][row]
+    return solution
+
+
+def fit_coefficients(
+    samples: Sequence[tuple],
+    prior: Sequence[float] = PRIOR_COEFFICIENTS,
+    prior_weight: float = PRIOR_WEIGHT,
+) -> List[float]:
+    """
+    Ridge regression of rate-normalized duration on text features, shrunk towards `prior`.
+
+    Args:
+        samples: (text, speaking_rate, duration_seconds) tuples.
+        prior: Prior coefficients.
+        prior_weight: Regularization strength towards the prior.
+
+    Returns:
+        list[float]: Fitted coefficients, same order as `text_features`.
+    """
+    n = len(prior)
+    # (X^T X + lambda I) beta = X^T y + lambda beta0
+    xtx = [[prior_weight if i == j else 0.0 for j in range(n)] for i in range(n)]
+    xty = [prior_weight * p for p in prior]
+    for text, speaking_rate, duration_seconds in samples:
+        x = text_features(text)
+        y = duration_seconds * (speaking_rate or 1.0)
+        for i in range(n):
+            xty[i] += x[i] * y
+            for j in range(n):
+                xtx[i][j] += x[i] * x[j]
+    try:
+        return _solve_linear_system(xtx, xty)
+    except ValueError:
+        return list(prior)
+
+
+class NarrationDurationPredictor:
+    """Per-voice duration model backed by a SQLite table of measured syntheses."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("NARRATION_PREDICTOR_DB", DEFAULT_DB_PATH)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._coefficients: Dict[str, List[float]] = {}
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS measurements ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " voice_category TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " speaking_rate REAL NOT NULL,"
+                " duration_seconds REAL NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_measurements_voice ON measurements (voice_category, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _normalize_voice(voice_category: str) -> str:
+        normalized = voice_category.lower().replace(" ", "_")
+        if normalized not in VOICE_CATEGORY_DEFAULTS:
+            raise ValueError(
+                f"Invalid voice_category: '{voice_category}'. "
+                f"Valid options are: {', '.join(VOICE_CATEGORY_DEFAULTS.keys())}"
+            )
+        return normalized
+
+    def record(self, text: str, voice_category: str, speaking_rate: float, duration_seconds: float) -> None:
+        """Stores a measured synthesis and invalidates the voice's calibration."""
+        voice = self._normalize_voice(voice_category)
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO measurements (voice_category, text, speaking_rate, duration_seconds, created_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (voice, text, float(speaking_rate), float(duration_seconds), time.time()),
+                )
+            self._coefficients.pop(voice, None)
+
+    def coefficients(self, voice_category: str) -> List[float]:
+        """Returns the calibrated coefficients for a voice (refitting lazily after new measurements)."""
+        voice = self._normalize_voice(voice_category)
+        with self._lock:
+            cached = self._coefficients.get(voice)
+            if cached is not None:
+                return cached
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT text, speaking_rate, duration_seconds FROM measurements"
+                    " WHERE voice_category = ? ORDER BY id DESC LIMIT ?",
+                    (voice, MAX_CALIBRATION_SAMPLES),
+                ).fetchall()
+            fitted = fit_coefficients(rows)
+            self._coefficients[voice] = fitted
+            return fitted
+
+    def sample_count(self, voice_category: str) -> int:
+        """Returns how many measurements are stored for a voice."""
+        voice = self._normalize_voice(voice_category)
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM measurements WHERE voice_category = ?", (voice,)).fetchone()[0]
+
+    def predict(self, text: str, voice_category: str, speaking_rate: float = 1.0) -> float:
+        """Predicts the narration duration in seconds."""
+        beta = self.coefficients(voice_category)
+        normalized = sum(b * x for b, x in zip(beta, text_features(text)))
+        rate = speaking_rate if speaking_rate > 0 else 1.0
+        return max(0.0, normalized / rate)
+
+
+_predictor_lock = threading.Lock()
+_predictor: Optional[NarrationDurationPredictor] = None
+
+# Synthesized narrations waiting for their duration to be measured, keyed by GCS URI.
+_pending_lock = threading.Lock()
+_pending_measurements: Dict[str, tuple] = {}
+MAX_PENDING_MEASUREMENTS = 256
+
+
+def get_predictor() -> NarrationDurationPredictor:
+    """Returns the process-wide predictor backed by NARRATION_PREDICTOR_DB."""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = NarrationDurationPredictor()
+    return _predictor
+
+
+def remember_synthesis(audio_uri: str, text: str, voice_category: str, speaking_rate: float) -> None:
+    """Remembers what produced `audio_uri` so a later duration probe can calibrate the predictor."""
+    with _pending_lock:
+        if len(_pending_measurements) >= MAX_PENDING_MEASUREMENTS:
+            _pending_measurements.pop(next(iter(_pending_measurements)))
+        _pending_measurements[audio_uri] = (text, voice_category, speaking_rate)
+
+
+def record_measured_uri(audio_uri: str, duration_seconds: float) -> None:
+    """Records a measured duration for a narration previously passed to `remember_synthesis`."""
+    with _pending_lock:
+        pending = _pending_measurements.pop(audio_uri, None)
+    if pending is None:
+        return
+    text, voice_category, speaking_rate = pending
+    try:
+        get_predictor().record(text, voice_category, speaking_rate, duration_seconds)
+    except Exception as e:
+        print(f"WARNING: Could not record narration measurement for '{audio_uri}': {e}")
+
+
+def predict_duration(text: str, voice_category: str, speaking_rate: float = 1.0) -> dict:
+    """
+    Predicts how long a narration will be without synthesizing it.
+
+    The estimate uses syllables, punctuation pauses and "..." / "-" markers, and is
+    calibrated per voice from previous measured narrations.
+
+    Args:
+        text: The plain narration text.
+        voice_category: One of the Chirp 3 HD voice categories accepted by text_to_speech.
+        speaking_rate: Speed of speech (e.g., 1.0 for normal). Defaults to 1.0.
+
+    Returns:
+        dict: predicted_duration (seconds) and calibration_samples for the voice, or an error message string.
+    """
+    try:
+        predictor = get_predictor()
+        return {
+            "predicted_duration": round(predictor.predict(text, voice_category, speaking_rate), 2),
+            "calibration_samples": predictor.sample_count(voice_category),
+        }
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def solve_speaking_rate(
+    text: str,
+    voice_category: str,
+    target_seconds: float,
+    min_rate: float = MIN_SPEAKING_RATE,
+    max_rate: float = MAX_SPEAKING_RATE,
+) -> dict:
+    """
+    Returns the speaking_rate needed for a narration to last target_seconds.
+
+    Use this before text_to_speech so the first synthesis already fits the scene.
+    If the required rate is outside min_rate..max_rate it is clamped and clamped is
+    True: shorten or lengthen the text instead.
+
+    Args:
+        text: The plain narration text.
+        voice_category: One of the Chirp 3 HD voice categories accepted by text_to_speech.
+        target_seconds: Desired narration length in seconds.
+        min_rate: Slowest allowed speaking rate. Defaults to 0.8.
+        max_rate: Fastest allowed speaking rate. Defaults to 1.3.
+
+    Returns:
+        dict: speaking_rate, predicted_duration at that rate and clamped, or an error message string.
+    """
+    try:
+        if target_seconds <= 0:
+            raise ValueError("target_seconds must be positive.")
+        predictor = get_predictor()
+        at_normal_rate = predictor.predict(text, voice_category, 1.0)
+        required = at_normal_rate / target_seconds
+        rate = min(max_rate, max(min_rate, required))
+        return {
+            "speaking_rate": round(rate, 3),
+            "predicted_duration": round(predictor.predict(text, voice_category, rate), 2),
+            "clamped": abs(rate - required) > 1e-9,
+        }
+    except Exception as e:
+        return f"Error: {e}"
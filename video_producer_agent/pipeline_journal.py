@@ -0,0 +1,168 @@
+"""
+Durable journal of pipeline steps, for checkpoint/resume across process restarts.
+
+Each run has a plan and a set of named steps (e.g. "scene-3/video"). For every
+step the journal stores its status, the artifacts it produced and the name of
+the outstanding long-running operation (Veo operation or Transcoder job) while
+it runs. `run_step` uses this to skip completed steps and to reattach to the
+operation of a step that was interrupted, instead of starting it again.
+The default backend is a local SQLite database (PIPELINE_JOURNAL_DB).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".video_producer_agent", "pipeline_journal.db")
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class PipelineJournal:
+    """SQLite-backed store of runs and their steps."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("PIPELINE_JOURNAL_DB", DEFAULT_DB_PATH)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " run_id TEXT PRIMARY KEY,"
+                " plan TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS steps ("
+                " run_id TEXT NOT NULL,"
+                " step TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " artifacts TEXT,"
+                " operation TEXT,"
+                " error TEXT,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (run_id, step))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def create_run(self, run_id: str, plan: Dict) -> Dict:
+        """Stores the plan of a new run and returns the stored plan (the existing one if the run exists)."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, plan, created_at) VALUES (?, ?, ?)",
+                (run_id, json.dumps(plan, sort_keys=True), time.time()),
+            )
+        return self.get_plan(run_id)
+
+    def get_plan(self, run_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT plan FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_step(self, run_id: str, step: str) -> Optional[Dict]:
+        """Returns {"step", "status", "artifacts", "operation", "error"} or None if the step never started."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT step, status, artifacts, operation, error FROM steps WHERE run_id = ? AND step = ?",
+                (run_id, step),
+            ).fetchone()
+        return self._step_dict(row) if row else None
+
+    def steps(self, run_id: str) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT step, status, artifacts, operation, error FROM steps WHERE run_id = ? ORDER BY step",
+                (run_id,),
+            ).fetchall()
+        return [self._step_dict(row) for row in rows]
+
+    @staticmethod
+    def _step_dict(row) -> Dict:
+        step, status, artifacts, operation, error = row
+        return {
+            "step": step,
+            "status": status,
+            "artifacts": json.loads(artifacts) if artifacts else {},
+            "operation": operation,
+            "error": error,
+        }
+
+    def _write(self, run_id: str, step: str, status: str, artifacts: Optional[Dict] = None,
+               operation: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO steps (run_id, step, status, artifacts, operation, error, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, step, status, json.dumps(artifacts) if artifacts is not None else None,
+                 operation, error, time.time()),
+            )
+
+    def mark_running(self, run_id: str, step: str, operation: Optional[str] = None) -> None:
+        self._write(run_id, step, STATUS_RUNNING, operation=operation)
+
+    def mark_done(self, run_id: str, step: str, artifacts: Dict) -> None:
+        self._write(run_id, step, STATUS_DONE, artifacts=artifacts)
+
+    def mark_failed(self, run_id: str, step: str, error: str, operation: Optional[str] = None) -> None:
+        self._write(run_id, step, STATUS_FAILED, operation=operation, error=error)
+
+
+_journal_lock = threading.Lock()
+_journal: Optional[PipelineJournal] = None
+
+
+def get_journal() -> PipelineJournal:
+    """Returns the process-wide journal backed by PIPELINE_JOURNAL_DB."""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = PipelineJournal()
+    return _journal
+
+
+async def run_step(
+    journal: PipelineJournal,
+    run_id: str,
+    step: str,
+    execute: Callable[[Callable[[str], None]], Awaitable[Dict]],
+    reattach: Optional[Callable[[str], Awaitable[Dict]]] = None,
+) -> Dict:
+    """
+    Runs one journaled step and returns its artifacts.
+
+    A step that is already done returns its stored artifacts. A step that was left
+    running with an operation name is reattached with `reattach(operation_name)`; if
+    that fails the step is executed again. `execute(record_operation)` must call
+    `record_operation(name)` as soon as it has started a long-running operation.
+    """
+    state = journal.get_step(run_id, step)
+    if state and state["status"] == STATUS_DONE:
+        print(f"[{run_id}] {step}: already done, skipping.")
+        return state["artifacts"]
+
+    if state and state["status"] == STATUS_RUNNING and state["operation"] and reattach:
+        print(f"[{run_id}] {step}: reattaching to {state['operation']}.")
+        try:
+            artifacts = await reattach(state["operation"])
+            journal.mark_done(run_id, step, artifacts)
+            return artifacts
+        except Exception as e:
+            print(f"[{run_id}] {step}: could not reattach ({type(e).__name__}: {e}); running it again.")
+
+    journal.mark_running(run_id, step)
+    try:
+        artifacts = await execute(lambda operation: journal.mark_running(run_id, step, operation))
+    except Exception as e:
+        current = journal.get_step(run_id, step) or {}
+        journal.mark_failed(run_id, step, f"{type(e).__name__}: {e}", current.get("operation"))
+        raise
+    journal.mark_done(run_id, step, artifacts)
+    return artifacts
@@ -0,0 +1,330 @@
+"""
+Background jobs with structured progress for the long-running tools.
+
+Muxing, joining, Veo generation and whole-commercial renders take minutes.
+They used to block the agent turn and only print to the server's stdout, so
+the session looked hung. `long_running_tool` turns such a tool into an ADK
+`LongRunningFunctionTool`: the call starts a background job and immediately
+returns its job_id, state and ETA, and the agent calls `get_progress` to
+follow it. Every get_progress result is an event in the ADK UI with:
+
+    state        PENDING, RUNNING, SUCCEEDED or FAILED (also when cancelled)
+    progress_pct reported by the job (Transcoder progress.processed, rendered
+                 scenes) or estimated from the elapsed time
+    eta_s        from the reported progress or from the durations of earlier
+                 jobs of the same kind (local SQLite, PROGRESS_HISTORY_DB)
+    artifacts    intermediate results with their public URLs (a candidate
+                 clip, a muxed scene) as soon as they exist
+    result       the compact tool result once the job finished
+
+Code running inside a job reports through `report_progress` and
+`report_artifact`, which do nothing outside a job. Jobs belong to the session
+that started them: get_progress only shows and follows the caller's own jobs.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .cancellation import current_token
+from .tool_results import CANCELLED, NOT_FOUND, ToolError, compact_result
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".video_producer_agent", "job_durations.db")
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+
+# Expected durations in seconds until a kind of job has history.
+DEFAULT_DURATION_SECONDS = {
+    "mux_audio": 60.0,
+    "mux_audio_batch": 90.0,
+    "mux_music": 60.0,
+    "video_join_tool": 90.0,
+    "video_generation_tool": 120.0,
+    "image_and_text_to_video_tool": 120.0,
+    "produce_commercial": 600.0,
+}
+FALLBACK_DURATION_SECONDS = 120.0
+# Only the most recent durations per kind are used for the ETA.
+MAX_HISTORY_SAMPLES = 50
+# Estimated progress never reaches 100% before the job reports it finished.
+MAX_ESTIMATED_FRACTION = 0.95
+# get_progress waits at most this long for a change before answering.
+MAX_WAIT_SECONDS = 60.0
+# Finished jobs stay visible in get_progress for this long.
+FINISHED_JOB_RETENTION_SECONDS = 3600
+
+
+class JobHistory:
+    """SQLite-backed durations of finished jobs, per kind."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("PROGRESS_HISTORY_DB", DEFAULT_DB_PATH)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS durations ("
+                " kind TEXT NOT NULL,"
+                " seconds REAL NOT NULL,"
+                " finished_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def record(self, kind: str, seconds: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO durations (kind, seconds, finished_at) VALUES (?, ?, ?)",
+                (kind, float(seconds), time.time()),
+            )
+
+    def expected_seconds(self, kind: str) -> float:
+        """Median duration of the recent jobs of this kind, or its default without history."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seconds FROM durations WHERE kind = ? ORDER BY finished_at DESC LIMIT ?",
+                (kind, MAX_HISTORY_SAMPLES),
+            ).fetchall()
+        if not rows:
+            return DEFAULT_DURATION_SECONDS.get(kind, FALLBACK_DURATION_SECONDS)
+        return statistics.median(row[0] for row in rows)
+
+
+_history_lock = threading.Lock()
+_history: Optional[JobHistory] = None
+
+
+def get_job_history() -> JobHistory:
+    """Returns the process-wide job history backed by PROGRESS_HISTORY_DB."""
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = JobHistory()
+    return _history
+
+
+class ProgressJob:
+    """One background job and its latest progress."""
+
+    def __init__(self, kind: str, expected_seconds: float, session_id: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex[:8]
+        self.kind = kind
+        self.session_id = session_id
+        self.expected_seconds = expected_seconds
+        self.state = PENDING
+        self.processed: Optional[float] = None
+        self.detail = ""
+        self.artifacts: List[Dict] = []
+        self.result: Optional[Any] = None
+        self.error: Optional[Dict] = None
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (SUCCEEDED, FAILED)
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def update(self, state: Optional[str] = None, processed: Optional[float] = None,
+               detail: Optional[str] = None) -> None:
+        if state is not None:
+            self.state = state
+        if processed is not None:
+            self.processed = min(max(float(processed), 0.0), 1.0)
+        if detail is not None:
+            self.detail = detail
+        self._notify()
+
+    def add_artifact(self, uri: str, label: str = "") -> None:
+        from .tools import gcs_uri_to_public_url
+
+        artifact = {"label": label, "uri": uri} if label else {"uri": uri}
+        if uri.startswith("gs://"):
+            artifact["public_url"] = gcs_uri_to_public_url(uri)
+        self.artifacts.append(artifact)
+        self._notify()
+
+    def finish(self, result: Any = None, error: Optional[Dict] = None) -> None:
+        self.finished_at = time.monotonic()
+        self.result = result
+        self.error = error
+        self.update(state=FAILED if error else SUCCEEDED, processed=None if error else 1.0)
+
+    async def wait_for_change(self, timeout: float) -> None:
+        if self.finished or timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def snapshot(self) -> Dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        if self.finished:
+            fraction, eta = (1.0 if self.state == SUCCEEDED else self.processed), 0.0
+        elif self.processed:
+            fraction, eta = self.processed, elapsed * (1 - self.processed) / self.processed
+        else:
+            fraction = min(elapsed / self.expected_seconds, MAX_ESTIMATED_FRACTION)
+            eta = max(self.expected_seconds - elapsed, 0.0)
+        snapshot = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "state": self.state,
+            "progress_pct": round(100 * fraction) if fraction is not None else None,
+            "elapsed_s": round(elapsed, 1),
+            "eta_s": round(eta, 1),
+            "detail": self.detail or None,
+            "artifacts": self.artifacts or None,
+            "result": self.result,
+            "error": self.error,
+        }
+        return {key: value for key, value in snapshot.items() if value is not None}
+
+
+_jobs: Dict[str, ProgressJob] = {}
+_current_job: contextvars.ContextVar[Optional[ProgressJob]] = contextvars.ContextVar("progress_job", default=None)
+
+
+def current_job() -> Optional[ProgressJob]:
+    """The job the calling code runs in, if any."""
+    return _current_job.get()
+
+
+def bind_job(job: ProgressJob) -> ProgressJob:
+    """Makes `job` receive the progress reports of the calling task (e.g. a render worker's job)."""
+    _current_job.set(job)
+    return job
+
+
+def report_progress(processed: Optional[float] = None, detail: Optional[str] = None) -> None:
+    """Updates the current job's progress (a fraction from 0 to 1) and detail text; no-op outside a job."""
+    job = _current_job.get()
+    if job is not None and not job.finished:
+        job.update(processed=processed, detail=detail)
+
+
+def report_artifact(uri: str, label: str = "") -> None:
+    """Publishes an intermediate result of the current job (with its public URL); no-op outside a job."""
+    job = _current_job.get()
+    if job is not None and not job.finished:
+        job.add_artifact(uri, label)
+
+
+def _prune_finished_jobs() -> None:
+    now = time.monotonic()
+    for job_id, job in list(_jobs.items()):
+        if job.finished and now - job.finished_at > FINISHED_JOB_RETENTION_SECONDS:
+            del _jobs[job_id]
+
+
+def _current_session_id() -> Optional[str]:
+    # bind_cancellation makes the session's token current for every tool call.
+    token = current_token()
+    return token.scope if token is not None else None
+
+
+def start_job(kind: str, func, *args, **kwargs) -> ProgressJob:
+    """Runs `func(*args, **kwargs)` (sync or async) as a background job of the current session and returns the job."""
+    _prune_finished_jobs()
+    job = ProgressJob(kind, get_job_history().expected_seconds(kind), _current_session_id())
+    _jobs[job.job_id] = job
+
+    async def run() -> None:
+        _current_job.set(job)
+        job.update(state=RUNNING)
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = compact_result(await func(*args, **kwargs))
+            else:
+                result = compact_result(await asyncio.to_thread(func, *args, **kwargs))
+        except asyncio.CancelledError:
+            job.finish(error=ToolError(CANCELLED, "The job was cancelled.").to_dict())
+            return
+        except Exception as e:
+            job.finish(error=ToolError.from_exception(e).to_dict())
+            return
+        if isinstance(result, dict) and "error_code" in result:
+            job.finish(error=result)
+            return
+        job.finish(result=result)
+        get_job_history().record(kind, job.finished_at - job.started_at)
+
+    job.task = asyncio.get_running_loop().create_task(run(), name=f"{kind}-{job.job_id}")
+    token = current_token()
+    if token is not None:
+        # Cancelling the session cancels the job (see cancellation).
+        token.track_task(job.task)
+    return job
+
+
+def long_running_tool(func, kind: Optional[str] = None):
+    """
+    Wraps a tool so each call starts a background job and returns at once with its job_id.
+
+    Returns an ADK `LongRunningFunctionTool` that keeps the tool's name and declaration.
+    """
+    from google.adk.tools import LongRunningFunctionTool
+
+    kind = kind or func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        job = start_job(kind, func, *args, **kwargs)
+        return {**job.snapshot(), "next": f"call get_progress with job_id {job.job_id} to follow it"}
+
+    return LongRunningFunctionTool(wrapper)
+
+
+async def get_progress(job_id: str = "", wait_seconds: float = 20.0) -> dict:
+    """
+    Returns the progress of this session's background jobs started by the long-running tools.
+
+    Waits up to wait_seconds for the job to change (new progress, a new artifact or the
+    end of the job) before answering, so each call shows fresh progress. Show the user
+    the progress and every artifact's public_url as soon as it appears, and keep calling
+    until the state is SUCCEEDED or FAILED; the finished job holds the tool's result.
+
+    Args:
+        job_id (str): The job_id returned by the long-running tool. Empty for all jobs.
+        wait_seconds (float): How long to wait for a change, at most 60 seconds. Defaults to 20.
+
+    Returns:
+        dict: job_id, kind, state, progress_pct, elapsed_s, eta_s, detail, artifacts and,
+        when finished, result or error. Without a job_id, jobs with one entry per job.
+    """
+    wait_seconds = min(max(float(wait_seconds), 0.0), MAX_WAIT_SECONDS)
+    session_id = _current_session_id()
+    if job_id:
+        job = _jobs.get(job_id)
+        if job is None or job.session_id != session_id:
+            return ToolError(NOT_FOUND, f"No job with id '{job_id}' in this session.").to_dict()
+        await job.wait_for_change(wait_seconds)
+        return job.snapshot()
+
+    _prune_finished_jobs()
+    jobs = [job for job in _jobs.values() if job.session_id == session_id]
+    running = [job for job in jobs if not job.finished]
+    if running and wait_seconds:
+        waits = [asyncio.ensure_future(job.wait_for_change(wait_seconds)) for job in running]
+        _, pending = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        for wait in pending:
+            wait.cancel()
+    return {"jobs": [job.snapshot() for job in jobs]}
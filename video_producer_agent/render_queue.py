@@ -0,0 +1,549 @@
+"""
+Render queue: Veo, Text-to-Speech, Lyria and Transcoder work in worker processes.
+
+Every generation, mux and polling loop used to run inside the process that
+serves `adk web`, so one busy session slowed every other user's chat turns.
+With RENDER_QUEUE_MODE=workers the heavy entry points (marked with `offload`)
+no longer run in the caller: the call is enqueued with its JSON arguments and
+the caller awaits the result, while a pool of worker processes started with
+
+    python -m video_producer_agent.render_queue --processes 4 --concurrency 8
+
+claims and runs the calls. Interactive work (a single clip or narration asked
+for in chat) runs before final renders (`produce_commercial`, a multi-agent
+production, a batch), which set
+PRIORITY_FINAL with `render_priority`. The worker forwards the call's
+progress and artifacts to the caller, the caller's deadline travels with the
+call, and cancelling the caller (see cancellation) cancels the call on the
+worker, which stops its Veo operation or Transcoder job.
+
+The queue is a local SQLite database (RENDER_QUEUE_DB) shared by every worker
+on the node; workers on other nodes need a shared store, plugged in by
+subclassing `RenderQueueBackend` and setting RENDER_QUEUE_BACKEND to
+"module:Class". A call whose arguments are not JSON (e.g. a callback) runs in
+the caller as before. The default, RENDER_QUEUE_MODE=inline, runs everything
+in the caller.
+"""
+import abc
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from .cancellation import cancellable_sleep, check_cancelled
+from .deadline import Deadline, bind_deadline, check_deadline, current_deadline
+from .progress import ProgressJob, bind_job, report_artifact, report_progress
+from .tool_results import ToolError
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".video_producer_agent", "render_queue.db")
+
+# Lower runs first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_FINAL = 10
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+# What heartbeat reports to a worker whose call was given to another worker; never stored.
+REASSIGNED = "REASSIGNED"
+
+# How often a waiting caller reads its call's state.
+RESULT_POLL_SECONDS = 0.5
+# How often an idle worker looks for work.
+IDLE_POLL_SECONDS = 1.0
+# How often a worker reports its running calls (progress, liveness) and picks up cancels.
+HEARTBEAT_SECONDS = 2.0
+# A running call whose worker has not reported for this long is given to another worker.
+STALE_AFTER_SECONDS = 60.0
+# A call is attempted at most this many times (only a lost worker causes a retry).
+MAX_ATTEMPTS = 2
+
+# Modules whose offloaded functions a worker can run.
+WORKER_MODULES = (
+    "video_producer_agent.veo_client",
+    "video_producer_agent.narration_engine",
+    "video_producer_agent.speculative_scene",
+    "video_producer_agent.lyria_music",
+    "video_producer_agent.transcoder_jobs",
+)
+
+
+class RenderJobError(Exception):
+    """An offloaded call failed on the worker; carries the worker's error code."""
+
+    def __init__(self, error_code: str, message: str):
+        self.error_code = error_code
+        super().__init__(message)
+
+
+class RenderQueueBackend(abc.ABC):
+    """
+    Storage of queued calls. Subclass it for another store (e.g. one shared by worker
+    nodes) and set RENDER_QUEUE_BACKEND to "module:Class".
+    """
+
+    @abc.abstractmethod
+    def enqueue(self, kind: str, target: str, payload: str, priority: int, deadline_at: Optional[float]) -> str:
+        """Adds a call and returns its job_id."""
+
+    @abc.abstractmethod
+    def claim(self, worker: str, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        """Marks the most urgent queued call (of one of `kinds`) RUNNING for `worker` and returns it."""
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id: str, worker: str, progress: Dict) -> str:
+        """
+        Records the progress of a call `worker` is running and returns RUNNING, CANCELLED if the
+        caller gave up, or REASSIGNED if the call was requeued and is no longer `worker`'s.
+        """
+
+    @abc.abstractmethod
+    def finish(self, job_id: str, worker: str, state: str, result: Optional[str] = None,
+               error: Optional[Dict] = None) -> bool:
+        """Records the outcome of a call `worker` is running; False if the call is no longer `worker`'s."""
+
+    @abc.abstractmethod
+    def cancel(self, job_id: str) -> None:
+        """Cancels a call that is still queued or running."""
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Returns every column of a call, or None if it does not exist."""
+
+    @abc.abstractmethod
+    def requeue_stale(self, stale_after_seconds: float, max_attempts: int) -> int:
+        """Requeues (or fails, after max_attempts) running calls whose worker stopped reporting."""
+
+    @abc.abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of calls per state."""
+
+
+class SQLiteRenderQueue(RenderQueueBackend):
+    """Render queue in a local SQLite database (RENDER_QUEUE_DB), shared by the workers of one node."""
+
+    _COLUMNS = ("job_id", "kind", "target", "payload", "priority", "state", "worker", "attempts",
+                "deadline_at", "progress", "result", "error", "created_at", "started_at", "heartbeat_at",
+                "finished_at")
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("RENDER_QUEUE_DB", DEFAULT_DB_PATH)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # Workers write while the web process reads.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " priority INTEGER NOT NULL,"
+                " state TEXT NOT NULL,"
+                " worker TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " deadline_at REAL,"
+                " progress TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " heartbeat_at REAL,"
+                " finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_urgency ON jobs (state, priority, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def enqueue(self, kind: str, target: str, payload: str, priority: int, deadline_at: Optional[float]) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, target, payload, priority, state, deadline_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, target, payload, priority, QUEUED, deadline_at, time.time()),
+            )
+        return job_id
+
+    def claim(self, worker: str, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        kind_filter = f" AND kind IN ({', '.join('?' for _ in kinds)})" if kinds else ""
+        now = time.time()
+        with self._connect() as conn:
+            # One statement, so two workers can never claim the same call.
+            row = conn.execute(
+                "UPDATE jobs SET state = ?, worker = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ?"
+                " WHERE job_id = (SELECT job_id FROM jobs WHERE state = ?" + kind_filter +
+                " ORDER BY priority, created_at LIMIT 1) AND state = ?"
+                " RETURNING job_id, kind, target, payload, deadline_at",
+                (RUNNING, worker, now, now, QUEUED, *(kinds or []), QUEUED),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("job_id", "kind", "target", "payload", "deadline_at"), row))
+
+    def heartbeat(self, job_id: str, worker: str, progress: Dict) -> str:
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE job_id = ? AND state = ? AND worker = ?",
+                (json.dumps(progress), time.time(), job_id, RUNNING, worker),
+            ).rowcount
+            row = None if updated else conn.execute("SELECT state FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if updated:
+            return RUNNING
+        return REASSIGNED if row and row[0] != CANCELLED else CANCELLED
+
+    def finish(self, job_id: str, worker: str, state: str, result: Optional[str] = None,
+               error: Optional[Dict] = None) -> bool:
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = ?, finished_at = ?"
+                " WHERE job_id = ? AND state = ? AND worker = ?",
+                (state, result, json.dumps(error) if error else None, time.time(), job_id, RUNNING, worker),
+            ).rowcount == 1
+
+    def cancel(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ? WHERE job_id = ? AND state IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(zip(self._COLUMNS, row)) if row else None
+
+    def requeue_stale(self, stale_after_seconds: float, max_attempts: int) -> int:
+        cutoff = time.time() - stale_after_seconds
+        error = json.dumps({"error_code": "UNAVAILABLE", "message": "The render worker running it stopped."})
+        with self._connect() as conn:
+            failed = conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, finished_at = ?"
+                " WHERE state = ? AND heartbeat_at < ? AND attempts >= ?",
+                (FAILED, error, time.time(), RUNNING, cutoff, max_attempts),
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET state = ?, worker = NULL WHERE state = ? AND heartbeat_at < ?",
+                (QUEUED, RUNNING, cutoff),
+            ).rowcount
+        return failed + requeued
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+
+_queue_lock = threading.Lock()
+_queue: Optional[RenderQueueBackend] = None
+
+
+def get_render_queue() -> RenderQueueBackend:
+    """Returns the process-wide render queue (RENDER_QUEUE_BACKEND, SQLite by default)."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                backend = os.getenv("RENDER_QUEUE_BACKEND")
+                if backend:
+                    module_name, class_name = backend.split(":", 1)
+                    _queue = getattr(importlib.import_module(module_name), class_name)()
+                else:
+                    _queue = SQLiteRenderQueue()
+    return _queue
+
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("render_priority", default=PRIORITY_INTERACTIVE)
+_in_worker: contextvars.ContextVar[bool] = contextvars.ContextVar("in_render_worker", default=False)
+
+
+@contextlib.contextmanager
+def render_priority(priority: int):
+    """Context manager: calls offloaded inside it are queued with `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def bind_render_priority(priority: int) -> None:
+    """Queues the calling task's offloaded calls with `priority` (e.g. in a before_tool_callback)."""
+    _priority.set(priority)
+
+
+def workers_enabled() -> bool:
+    return os.getenv("RENDER_QUEUE_MODE", "inline").lower() == "workers" and not _in_worker.get()
+
+
+# Offloadable functions by target ("module:qualname"), and how to turn their result into JSON and back.
+_targets: Dict[str, Callable] = {}
+_encoders: Dict[str, Optional[Callable]] = {}
+
+
+def offload(kind: str, encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None):
+    """
+    Decorator for a heavy function (sync or async) that render workers may run.
+
+    With RENDER_QUEUE_MODE=workers a call with JSON arguments is queued and its result
+    awaited; `encode` and `decode` convert a result that is not JSON. Otherwise the
+    function runs in the caller.
+    """
+    def decorate(func):
+        target = f"{func.__module__}:{func.__qualname__}"
+        _targets[target] = func
+        _encoders[target] = encode
+
+        def to_result(value):
+            return decode(value) if decode else value
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                payload = _payload(args, kwargs)
+                if payload is None:
+                    return await func(*args, **kwargs)
+                return to_result(await _run_on_worker(kind, target, payload))
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                payload = _payload(args, kwargs)
+                if payload is None:
+                    return func(*args, **kwargs)
+                return to_result(_run_on_worker_blocking(kind, target, payload))
+        return wrapper
+
+    return decorate
+
+
+def _payload(args, kwargs) -> Optional[str]:
+    """The call's arguments as JSON, or None if it runs in the caller."""
+    if not workers_enabled():
+        return None
+    try:
+        return json.dumps({"args": list(args), "kwargs": kwargs})
+    except (TypeError, ValueError):
+        return None
+
+
+def _deadline_at() -> Optional[float]:
+    deadline = current_deadline()
+    return time.time() + deadline.remaining() if deadline else None
+
+
+class _Follower:
+    """Forwards a queued call's progress and artifacts to the caller's job (see progress)."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.artifacts_seen = 0
+        self.last_progress = None
+
+    def follow(self, job: Dict) -> Any:
+        """Returns the decoded result once the call succeeded; raises if it failed."""
+        state = job["state"]
+        if state == SUCCEEDED:
+            return json.loads(job["result"])
+        if state in (FAILED, CANCELLED):
+            error = json.loads(job["error"]) if job["error"] else {"error_code": CANCELLED, "message": "Cancelled."}
+            raise RenderJobError(error["error_code"], error["message"])
+        progress = json.loads(job["progress"]) if job["progress"] else {}
+        if state == QUEUED:
+            progress["detail"] = f"waiting for a render worker ({self.kind})"
+        elif not progress.get("detail"):
+            progress["detail"] = f"running on render worker {job['worker']}"
+        for artifact in progress.pop("artifacts", [])[self.artifacts_seen:]:
+            report_artifact(artifact["uri"], artifact.get("label", ""))
+            self.artifacts_seen += 1
+        if progress != self.last_progress:
+            report_progress(processed=progress.get("processed"), detail=progress.get("detail"))
+            self.last_progress = progress
+        return None
+
+
+async def _run_on_worker(kind: str, target: str, payload: str) -> Any:
+    queue = get_render_queue()
+    check_cancelled()
+    job_id = await asyncio.to_thread(queue.enqueue, kind, target, payload, _priority.get(), _deadline_at())
+    follower = _Follower(kind)
+    finished = False
+    try:
+        while True:
+            job = await asyncio.to_thread(queue.get, job_id)
+            finished = job["state"] in (SUCCEEDED, FAILED, CANCELLED)
+            result = follower.follow(job)
+            if finished:
+                return result
+            await cancellable_sleep(RESULT_POLL_SECONDS)
+    finally:
+        if not finished:
+            # The caller gave up (cancelled, deadline passed): stop the call on its worker.
+            queue.cancel(job_id)
+
+
+def _run_on_worker_blocking(kind: str, target: str, payload: str) -> Any:
+    """_run_on_worker for sync callers (which run in a worker thread)."""
+    queue = get_render_queue()
+    check_cancelled()
+    job_id = queue.enqueue(kind, target, payload, _priority.get(), _deadline_at())
+    follower = _Follower(kind)
+    finished = False
+    try:
+        while True:
+            job = queue.get(job_id)
+            finished = job["state"] in (SUCCEEDED, FAILED, CANCELLED)
+            result = follower.follow(job)
+            if finished:
+                return result
+            check_cancelled()
+            check_deadline()
+            time.sleep(RESULT_POLL_SECONDS)
+    finally:
+        if not finished:
+            queue.cancel(job_id)
+
+
+class RenderWorker:
+    """Claims queued calls and runs up to `concurrency` of them at once."""
+
+    def __init__(self, worker_id: Optional[str] = None, kinds: Optional[List[str]] = None, concurrency: int = 4,
+                 queue: Optional[RenderQueueBackend] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.kinds = kinds or None
+        self.concurrency = max(1, concurrency)
+        self.queue = queue or get_render_queue()
+        self.running: Dict[str, tuple] = {}
+        # Calls requeued to another worker while this one still runs them; their results are dropped.
+        self.reassigned: set = set()
+        self.completed = 0
+
+    async def run(self, max_jobs: Optional[int] = None, idle_exit_seconds: Optional[float] = None) -> None:
+        """Works until stopped, after max_jobs calls, or after idle_exit_seconds without work."""
+        for module in WORKER_MODULES:
+            importlib.import_module(module)
+        print(f"Render worker {self.worker_id} started (kinds {self.kinds or 'all'}, concurrency {self.concurrency}).")
+        heartbeat = asyncio.ensure_future(self._heartbeat())
+        idle_since = time.monotonic()
+        claimed = 0
+        try:
+            while max_jobs is None or claimed < max_jobs:
+                job = None
+                if len(self.running) < self.concurrency:
+                    job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.kinds)
+                if job is None:
+                    if not self.running and idle_exit_seconds is not None \
+                            and time.monotonic() - idle_since > idle_exit_seconds:
+                        break
+                    await asyncio.sleep(IDLE_POLL_SECONDS)
+                    continue
+                claimed += 1
+                progress = ProgressJob(job["kind"], 0.0)
+                task = asyncio.ensure_future(self._execute(job, progress))
+                self.running[job["job_id"]] = (task, progress)
+                task.add_done_callback(lambda _, job_id=job["job_id"]: self.running.pop(job_id, None))
+                idle_since = time.monotonic()
+            await asyncio.gather(*(task for task, _ in list(self.running.values())), return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            for job_id, (task, progress) in list(self.running.items()):
+                report = {"processed": progress.processed, "detail": progress.detail, "artifacts": progress.artifacts}
+                state = await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id, report)
+                if state == CANCELLED:
+                    print(f"Render call {job_id} was cancelled by its caller.")
+                    task.cancel()
+                elif state == REASSIGNED and job_id not in self.reassigned:
+                    # Not cancelled: its cleanup would delete outputs the new owner may be writing.
+                    print(f"Render call {job_id} was given to another worker; its result here will be dropped.")
+                    self.reassigned.add(job_id)
+            await asyncio.to_thread(self.queue.requeue_stale, STALE_AFTER_SECONDS, MAX_ATTEMPTS)
+
+    async def _execute(self, job: Dict, progress: ProgressJob) -> None:
+        _in_worker.set(True)
+        bind_job(progress)
+        if job["deadline_at"]:
+            bind_deadline(Deadline(job["kind"], job["deadline_at"] - time.time()))
+        func = _targets.get(job["target"])
+        started = time.monotonic()
+        try:
+            if func is None:
+                raise ValueError(f"{job['target']} is not an offloadable function.")
+            call = json.loads(job["payload"])
+            if asyncio.iscoroutinefunction(func):
+                value = await func(*call["args"], **call["kwargs"])
+            else:
+                value = await asyncio.to_thread(func, *call["args"], **call["kwargs"])
+            encode = _encoders.get(job["target"])
+            result = json.dumps(encode(value) if encode else value)
+        except asyncio.CancelledError:
+            # The caller cancelled it; the call's own cleanup (see cancellation.in_flight) has run.
+            return
+        except Exception as e:
+            error = ToolError.from_exception(e)
+            if await asyncio.to_thread(self.queue.finish, job["job_id"], self.worker_id, FAILED,
+                                       error={"error_code": error.error_code, "message": error.message}):
+                print(f"Render call {job['job_id']} ({job['kind']}) failed: {error.message}")
+            else:
+                print(f"Render call {job['job_id']} belongs to another worker; dropped its failure.")
+            return
+        finally:
+            self.reassigned.discard(job["job_id"])
+        if not await asyncio.to_thread(self.queue.finish, job["job_id"], self.worker_id, SUCCEEDED, result):
+            print(f"Render call {job['job_id']} belongs to another worker; dropped its result.")
+            return
+        self.completed += 1
+        print(f"Render call {job['job_id']} ({job['kind']}) done in {time.monotonic() - started:.1f}s.")
+
+
+def _worker_process(index: int, kinds: Optional[List[str]], concurrency: int) -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    asyncio.run(RenderWorker(worker_id, kinds, concurrency).run())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description="Run render workers for the queued Veo, TTS, Lyria and "
+                                                 "Transcoder calls of video_producer_agent.")
+    parser.add_argument("--processes", type=int, default=2, help="Worker processes on this node. Defaults to 2.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Calls each process runs at once. Defaults to 4.")
+    parser.add_argument("--kinds", default="", help="Comma-separated kinds to run (veo, tts, lyria, transcoder). "
+                                                    "Defaults to all.")
+    args = parser.parse_args(argv)
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()] or None
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(index, kinds, args.concurrency), daemon=True)
+        for index in range(max(1, args.processes))
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("Stopping render workers; their running calls are requeued after "
+              f"{STALE_AFTER_SECONDS:.0f}s of silence.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Journaled, resumable scene pipeline: narration, video, fit and mux for every scene.
+
+`run_scene_pipeline` produces all scenes of a commercial concurrently, each as a
+chain of journaled steps (see pipeline_journal):
+
+    scene-<i>/narration  Chirp 3 HD synthesis and its measured duration
+    scene-<i>/video      Veo clip at a duration predicted from the narration text,
+                         generated while the narration is synthesized
+    scene-<i>/fit        local narration fit, only when the narration overruns the clip
+    scene-<i>/mux        Transcoder job muxing narration and clip
+
+If the process restarts or a scene fails, `resume_scene_pipeline` picks the run up
+again: completed steps are skipped, interrupted Veo operations and Transcoder jobs
+are reattached, and only the unfinished steps run again.
+"""
+import asyncio
+from typing import Dict, List
+
+from .audio_fit import fit_narration_to_duration
+from .mux_audio import start_mux_audio_job
+from .narration_predictor import get_predictor
+from .pipeline_journal import STATUS_DONE, get_journal, run_step
+from .speculative_scene import clip_fits, synthesize_and_measure, veo_duration_for
+from .transcoder_jobs import transcoder_output_uri, wait_for_transcoder_job
+from .veo_client import generate_videos, reattach_video_operation
+
+
+async def _produce_scene(run_id: str, index: int, video_prompt: str, narration_text: str, video_duration: int,
+                         voice_category: str, speaking_rate: float) -> Dict:
+    journal = get_journal()
+    prefix = f"scene-{index + 1}"
+
+    async def narrate(record_operation) -> Dict:
+        audio_uri, duration = await synthesize_and_measure(narration_text, voice_category, speaking_rate)
+        return {"uri": audio_uri, "duration": duration}
+
+    async def generate(record_operation) -> Dict:
+        video_uris, _ = await generate_videos(
+            prompt=video_prompt,
+            duration_seconds=video_duration,
+            output_folder="veo2",
+            on_operation_started=record_operation,
+        )
+        return {"uri": video_uris[0], "duration_seconds": video_duration}
+
+    async def reattach_video(operation_name: str) -> Dict:
+        video_uris = await reattach_video_operation(operation_name)
+        return {"uri": video_uris[0], "duration_seconds": video_duration}
+
+    narration, video = await asyncio.gather(
+        run_step(journal, run_id, f"{prefix}/narration", narrate),
+        run_step(journal, run_id, f"{prefix}/video", generate, reattach_video),
+    )
+
+    if not clip_fits(narration["duration"], video["duration_seconds"]):
+        async def fit(record_operation) -> Dict:
+            fitted = await asyncio.to_thread(
+                fit_narration_to_duration, narration["uri"], float(video["duration_seconds"])
+            )
+            if isinstance(fitted, str):
+                raise RuntimeError(fitted)
+            if not fitted["fits"]:
+                raise RuntimeError(f"Narration of {narration['duration']:.2f}s does not fit a "
+                                   f"{video['duration_seconds']}s clip even at 1.3x; shorten the text.")
+            return {"uri": fitted["uri"], "duration": fitted["fitted_duration"]}
+
+        narration = await run_step(journal, run_id, f"{prefix}/fit", fit)
+
+    end_time_offset = round(min(narration["duration"], float(video["duration_seconds"])), 3)
+
+    async def mux(record_operation) -> Dict:
+        job_name, output_uri = await start_mux_audio_job(video["uri"], narration["uri"], end_time_offset)
+        record_operation(job_name)
+        await wait_for_transcoder_job(job_name)
+        return {"uri": output_uri}
+
+    async def reattach_mux(job_name: str) -> Dict:
+        return {"uri": transcoder_output_uri(await wait_for_transcoder_job(job_name, poll_interval_seconds=1))}
+
+    muxed = await run_step(journal, run_id, f"{prefix}/mux", mux, reattach_mux)
+    return {
+        "video_uri": video["uri"],
+        "narration_uri": narration["uri"],
+        "narration_duration": round(narration["duration"], 3),
+        "video_duration_seconds": video["duration_seconds"],
+        "muxed_uri": muxed["uri"],
+    }
+
+
+def _plan_inputs(plan: Dict) -> Dict:
+    """The parts of a plan supplied by the caller (predicted clip lengths excluded)."""
+    return {
+        "scenes": [(scene["video_prompt"], scene["narration_text"]) for scene in plan["scenes"]],
+        "voice_category": plan["voice_category"],
+        "speaking_rate": plan["speaking_rate"],
+    }
+
+
+async def _run_plan(run_id: str, plan: Dict) -> Dict:
+    scenes = plan["scenes"]
+    results = await asyncio.gather(
+        *(
+            _produce_scene(run_id, i, scene["video_prompt"], scene["narration_text"],
+                           scene["video_duration_seconds"], plan["voice_category"], plan["speaking_rate"])
+            for i, scene in enumerate(scenes)
+        ),
+        return_exceptions=True,
+    )
+    report = []
+    for i, result in enumerate(results):
+        if isinstance(result, BaseException):
+            report.append({"scene": i + 1, "status": "failed", "error": f"{type(result).__name__}: {result}"})
+        else:
+            report.append({"scene": i + 1, "status": STATUS_DONE, **result})
+    failed = sum(1 for scene in report if scene["status"] == "failed")
+    return {"run_id": run_id, "scenes": report, "completed": len(report) - failed, "failed": failed}
+
+
+async def run_scene_pipeline(
+    run_id: str,
+    video_prompts: List[str],
+    narration_texts: List[str],
+    voice_category: str,
+    speaking_rate: float = 1.0,
+) -> dict:
+    """
+    Produces every scene (narration, video, narration fit and mux) concurrently with a durable journal.
+
+    Progress is checkpointed under run_id. If the session dies or some scenes fail, call
+    resume_scene_pipeline with the same run_id: finished work is kept, running video
+    generations and mux jobs are reattached, and only the failed scenes are redone.
+
+    Args:
+        run_id: A short unique name for this commercial (e.g. "puppy-adoption-v1").
+        video_prompts: The final video generation prompt for each scene, in order.
+        narration_texts: Plain narration text for each scene, in the same order.
+        voice_category: One of the Chirp 3 HD voice categories accepted by text_to_speech.
+        speaking_rate: Speed of speech (e.g., 1.0 for normal). Defaults to 1.0.
+
+    Returns:
+        dict: run_id, scenes (per scene: status and video_uri, narration_uri, narration_duration,
+              video_duration_seconds and muxed_uri, or error), completed and failed.
+              Or an error message string.
+    """
+    if not video_prompts or len(video_prompts) != len(narration_texts):
+        return "Error: video_prompts and narration_texts must be non-empty lists of the same length."
+    try:
+        # The clip length is fixed when the run is planned so a resumed run generates the same clips.
+        plan = {
+            "scenes": [
+                {
+                    "video_prompt": prompt,
+                    "narration_text": text,
+                    "video_duration_seconds": veo_duration_for(
+                        get_predictor().predict(text, voice_category, speaking_rate)
+                    ),
+                }
+                for prompt, text in zip(video_prompts, narration_texts)
+            ],
+            "voice_category": voice_category,
+            "speaking_rate": speaking_rate,
+        }
+    except ValueError as e:
+        return f"Error: {e}"
+    stored_plan = get_journal().create_run(run_id, plan)
+    if _plan_inputs(stored_plan) != _plan_inputs(plan):
+        return (f"Error: run '{run_id}' already exists with a different plan. "
+                f"Use resume_scene_pipeline to continue it, or choose a new run_id.")
+    plan = stored_plan
+    return await _run_plan(run_id, plan)
+
+
+async def resume_scene_pipeline(run_id: str) -> dict:
+    """
+    Resumes a scene pipeline run after a restart or failure, redoing only unfinished work.
+
+    Args:
+        run_id: The run_id previously passed to run_scene_pipeline.
+
+    Returns:
+        dict: The same report as run_scene_pipeline. Or an error message string.
+    """
+    plan = get_journal().get_plan(run_id)
+    if plan is None:
+        return f"Error: No pipeline run named '{run_id}' was found."
+    return await _run_plan(run_id, plan)
+
+
+def get_pipeline_status(run_id: str) -> dict:
+    """
+    Returns the journaled state of every step in a scene pipeline run.
+
+    Args:
+        run_id: The run_id previously passed to run_scene_pipeline.
+
+    Returns:
+        dict: run_id, scene_count and steps (step, status, artifacts, operation, error).
+              Or an error message string.
+    """
+    journal = get_journal()
+    plan = journal.get_plan(run_id)
+    if plan is None:
+        return f"Error: No pipeline run named '{run_id}' was found."
+    return {"run_id": run_id, "scene_count": len(plan["scenes"]), "steps": journal.steps(run_id)}
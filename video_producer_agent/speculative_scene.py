@@ -0,0 +1,229 @@
+"""
+Speculative scene production: overlap Veo generation with narration synthesis.
+
+Veo is almost always the slowest step of a scene and only accepts 5-8 second
+clips, so waiting for the narration to be synthesized and measured before
+starting it puts the TTS round trip on the critical path for nothing. Here Veo
+is started as soon as the scene prompt is final, at a duration predicted from
+the narration text, while the narration is synthesized in parallel. A
+corrective regeneration is only started when the measured narration does not
+fit the speculative clip and cannot be fitted to it locally (see audio_fit);
+the speculative generation is then cancelled (unless another caller shares
+it, see generation_ledger) and the Veo time it used is counted as wasted.
+Per-scene latency becomes max(TTS, Veo) on a hit.
+
+The speculative duration comes from the calibrated narration predictor, and
+every measured narration feeds back into its calibration.
+"""
+import asyncio
+import math
+import threading
+import time
+
+from .audio_fit import fit_narration_to_duration
+from .chirp_audio import text_to_speech
+from .mux_audio import get_mp3_audio_duration_gcs
+from .narration_predictor import get_predictor
+from .render_queue import offload
+from .tool_results import INVALID_ARGUMENT, ToolError
+from .veo_client import generate_videos
+
+MIN_VEO_SECONDS = 5
+MAX_VEO_SECONDS = 8
+# The agent never truncates more than this much narration when muxing.
+MAX_TRUNCATION_SECONDS = 1.0
+# Extra video requested on top of the predicted narration length.
+SPECULATION_MARGIN_SECONDS = 0.5
+
+# Maps a scene outcome to its counter in the metrics table.
+_OUTCOME_COUNTERS = {"hit": "hits", "fitted": "fitted", "miss": "misses", "unfittable": "unfittable"}
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "scenes": 0,
+    "hits": 0,
+    "fitted": 0,
+    "misses": 0,
+    "unfittable": 0,
+    "tts_seconds_total": 0.0,
+    "veo_seconds_total": 0.0,
+    "wall_seconds_total": 0.0,
+    "wasted_veo_seconds_total": 0.0,
+}
+
+
+def veo_duration_for(narration_seconds: float) -> int:
+    """Returns the shortest valid Veo duration that covers the narration."""
+    seconds = math.ceil(narration_seconds + SPECULATION_MARGIN_SECONDS)
+    return max(MIN_VEO_SECONDS, min(MAX_VEO_SECONDS, seconds))
+
+
+def clip_fits(narration_seconds: float, video_seconds: float) -> bool:
+    """A clip fits if at most MAX_TRUNCATION_SECONDS of narration would be cut off."""
+    return narration_seconds - video_seconds <= MAX_TRUNCATION_SECONDS
+
+
+def _record_metrics(outcome: str, tts_seconds: float, veo_seconds: float, wall_seconds: float,
+                    wasted_veo_seconds: float = 0.0) -> None:
+    with _metrics_lock:
+        _metrics["scenes"] += 1
+        _metrics[_OUTCOME_COUNTERS[outcome]] += 1
+        _metrics["tts_seconds_total"] += tts_seconds
+        _metrics["veo_seconds_total"] += veo_seconds
+        _metrics["wall_seconds_total"] += wall_seconds
+        _metrics["wasted_veo_seconds_total"] += wasted_veo_seconds
+
+
+def get_speculation_metrics() -> dict:
+    """
+    Returns how often speculative video generation hit or missed.
+
+    Returns:
+        dict: scenes, hits, fitted (narration fitted locally instead of regenerating video),
+              misses, unfittable, miss_rate and the average TTS, Veo and
+              wall-clock seconds per scene. saved_seconds_avg is how much faster the
+              overlapped scene was than running TTS and Veo back to back.
+              wasted_veo_seconds_total is how long cancelled speculative clips generated.
+    """
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    scenes = metrics["scenes"]
+    metrics["miss_rate"] = round((metrics["misses"] + metrics["unfittable"]) / scenes, 3) if scenes else 0.0
+    if scenes:
+        metrics["tts_seconds_avg"] = round(metrics["tts_seconds_total"] / scenes, 2)
+        metrics["veo_seconds_avg"] = round(metrics["veo_seconds_total"] / scenes, 2)
+        metrics["wall_seconds_avg"] = round(metrics["wall_seconds_total"] / scenes, 2)
+        metrics["saved_seconds_avg"] = round(
+            metrics["tts_seconds_avg"] + metrics["veo_seconds_avg"] - metrics["wall_seconds_avg"], 2
+        )
+    return metrics
+
+
+async def _generate_clip(prompt: str, duration_seconds: int, image_gcs_uri: str, image_mime_type: str) -> str:
+    """Runs one Veo generation (through the generation ledger) and returns the GCS URI of the clip."""
+    video_uris, _ = await generate_videos(
+        prompt=prompt,
+        duration_seconds=duration_seconds,
+        output_folder="veo_image_to_video" if image_gcs_uri else "veo2",
+        image_gcs_uri=image_gcs_uri or None,
+        image_mime_type=image_mime_type or None,
+        aspect_ratio="16:9" if image_gcs_uri else None,
+    )
+    return video_uris[0]
+
+
+@offload("tts")
+async def synthesize_and_measure(text: str, voice_category: str, speaking_rate: float):
+    """Synthesizes narration and returns (audio_uri, duration_seconds)."""
+    audio_uri = await asyncio.to_thread(text_to_speech, text, voice_category, speaking_rate)
+    duration = await asyncio.to_thread(get_mp3_audio_duration_gcs, audio_uri)
+    if not isinstance(duration, (int, float)):
+        raise RuntimeError(f"Could not measure narration duration: {duration}")
+    return audio_uri, float(duration)
+
+
+async def produce_scene_speculative(
+    video_prompt: str,
+    narration_text: str,
+    voice_category: str,
+    speaking_rate: float = 1.0,
+    image_gcs_uri: str = "",
+    image_mime_type: str = "",
+) -> dict:
+    """
+    Generates a scene's video clip and narration at the same time.
+
+    Veo starts immediately at a duration predicted from the narration text while the
+    narration is synthesized and measured in parallel. If the measured narration does
+    not fit the speculative clip, a corrective clip is generated at the right duration.
+    Use the returned video_uri, narration_uri and mux_end_time_offset with mux_audio.
+
+    Args:
+        video_prompt: The final video generation prompt for the scene.
+        narration_text: Plain narration text for the text to speech tool.
+        voice_category: One of the Chirp 3 HD voice categories accepted by text_to_speech.
+        speaking_rate: Speed of speech (e.g., 1.0 for normal). Defaults to 1.0.
+        image_gcs_uri: Optional GCS URI of a starting image for image-to-video.
+        image_mime_type: MIME type of the starting image (e.g. "image/png"), if any.
+
+    Returns:
+        dict: video_uri, narration_uri, narration_duration, video_duration_seconds,
+              mux_end_time_offset and speculation ("hit", "fitted", "miss" or "unfittable").
+              "fitted" means the narration was trimmed/time-stretched locally to the clip.
+              For "unfittable" the narration is longer than any Veo clip can cover and
+              should be shortened or sped up. Or an error dict with error_code, retryable and message.
+    """
+    started = time.monotonic()
+    try:
+        predicted = get_predictor().predict(narration_text, voice_category, speaking_rate)
+    except ValueError as e:
+        return ToolError(INVALID_ARGUMENT, str(e)).to_dict()
+    speculative_duration = veo_duration_for(predicted)
+    print(f"Predicted narration {predicted:.2f}s, starting speculative {speculative_duration}s Veo clip.")
+
+    async def timed(coro):
+        t0 = time.monotonic()
+        result = await coro
+        return result, time.monotonic() - t0
+
+    async def cancel_clip(task) -> None:
+        # Cancelling the only waiter cancels the Veo operation itself (see generation_ledger);
+        # waiting here makes sure the cancel went out before the caller moves on.
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    veo_started = time.monotonic()
+    veo_task = asyncio.create_task(
+        timed(_generate_clip(video_prompt, speculative_duration, image_gcs_uri, image_mime_type))
+    )
+    try:
+        (narration_uri, narration_duration), tts_seconds = await timed(
+            synthesize_and_measure(narration_text, voice_category, speaking_rate)
+        )
+    except Exception as e:
+        await cancel_clip(veo_task)
+        return ToolError.from_exception(e).to_dict()
+
+    video_duration = speculative_duration
+    outcome = "hit"
+    wasted_veo_seconds = 0.0
+    if not clip_fits(narration_duration, speculative_duration):
+        # Cheapest fix first: trim silence and speed the narration up locally to the clip length.
+        fitted = await asyncio.to_thread(fit_narration_to_duration, narration_uri, float(speculative_duration))
+        corrected_duration = veo_duration_for(narration_duration)
+        if isinstance(fitted, dict) and fitted["fits"]:
+            outcome = "fitted"
+            print(f"Narration of {narration_duration:.2f}s fitted locally to the {speculative_duration}s clip.")
+            narration_uri = fitted["uri"]
+            narration_duration = fitted["fitted_duration"]
+        elif not clip_fits(narration_duration, corrected_duration):
+            # No Veo clip is long enough; keep the speculative clip and tell the caller to shorten the text.
+            outcome = "unfittable"
+        else:
+            outcome = "miss"
+            print(f"Speculation missed: narration is {narration_duration:.2f}s, "
+                  f"regenerating a {corrected_duration}s clip.")
+            await cancel_clip(veo_task)
+            wasted_veo_seconds = time.monotonic() - veo_started
+            video_duration = corrected_duration
+            veo_task = asyncio.create_task(
+                timed(_generate_clip(video_prompt, corrected_duration, image_gcs_uri, image_mime_type))
+            )
+
+    try:
+        video_uri, veo_seconds = await veo_task
+    except Exception as e:
+        return ToolError.from_exception(e).to_dict()
+
+    wall_seconds = time.monotonic() - started
+    _record_metrics(outcome, tts_seconds, veo_seconds, wall_seconds, wasted_veo_seconds)
+    print(f"Scene ready in {wall_seconds:.1f}s (TTS {tts_seconds:.1f}s, Veo {veo_seconds:.1f}s, speculation {outcome}).")
+
+    return {
+        "video_uri": video_uri,
+        "narration_uri": narration_uri,
+        "narration_duration": round(narration_duration, 3),
+        "video_duration_seconds": video_duration,
+        "mux_end_time_offset": round(min(narration_duration, float(video_duration)), 3),
+        "speculation": outcome,
+    }
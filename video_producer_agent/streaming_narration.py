@@ -0,0 +1,255 @@
+"""
+Streaming narration: Chirp 3 HD streaming synthesis piped into a resumable GCS upload.
+
+`text_to_speech` waits for the whole `synthesize_speech` response, writes it to
+the working directory and only then uploads it, so a long voice-over holds the
+full audio in memory and nothing reaches GCS until synthesis is finished.
+`stream_text_to_speech` instead feeds the text sentence by sentence to the
+bidirectional `streaming_synthesize` API and writes each PCM chunk into a
+resumable upload as it arrives, counting the duration on the way. Memory use is
+bounded by the upload chunk size, whatever the length of the narration.
+
+The output is a 16-bit mono WAV file. Its length is unknown until synthesis
+ends, so the PCM data is streamed into a temporary object and the final WAV is
+composed in GCS from a 44-byte header with the real sizes and that data. A
+header with the streaming placeholder sizes (0xFFFFFFFF) would make every tool
+that reads the header (TinyTag in get_mp3_audio_duration_gcs, `wave`) report a
+length of hours.
+
+Set NARRATION_STREAM_BACKEND=stub to replace the API with a local generator
+that produces a tone of the predicted length per sentence, so the pipeline can
+be exercised without credentials.
+"""
+import asyncio
+import math
+import os
+import re
+import struct
+import time
+import uuid
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from .chirp_audio import get_tts_client, resolve_voice
+from .tool_results import MediaResult
+
+STREAM_SAMPLE_RATE = 24000
+# 16-bit mono PCM.
+BYTES_PER_SAMPLE = 2
+# Resumable upload chunk size; must be a multiple of 256 KiB. This bounds memory use.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Text sent per streaming request. Sentences are grouped up to this many characters.
+MAX_INPUT_CHARS = 400
+# Placeholder size for RIFF/data chunks of a WAV whose length is unknown while writing.
+STREAMING_WAV_SIZE = 0xFFFFFFFF
+WAV_HEADER_BYTES = 44
+
+_SENTENCE_RE = re.compile(r"[^.!?]+(?:[.!?]+|$)")
+
+
+def split_text_for_streaming(text: str, max_chars: int = MAX_INPUT_CHARS) -> List[str]:
+    """Groups sentences into input chunks of at most `max_chars` characters (longer sentences are kept whole)."""
+    chunks: List[str] = []
+    current = ""
+    for sentence in (s.strip() for s in _SENTENCE_RE.findall(text)):
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def streaming_wav_header(sample_rate: int = STREAM_SAMPLE_RATE, pcm_bytes: Optional[int] = None) -> bytes:
+    """
+    Returns a 44-byte PCM WAV header for `pcm_bytes` of audio data.
+
+    Without pcm_bytes the sizes are the placeholders of a stream of unknown length.
+    """
+    byte_rate = sample_rate * BYTES_PER_SAMPLE
+    riff_size = STREAMING_WAV_SIZE if pcm_bytes is None else 36 + pcm_bytes
+    data_size = STREAMING_WAV_SIZE if pcm_bytes is None else pcm_bytes
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, byte_rate, BYTES_PER_SAMPLE, 16)
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def _chirp_audio_chunks(text_chunks: List[str], voice_category: str) -> Iterator[bytes]:
+    """Yields raw 16-bit PCM chunks from the Chirp 3 HD streaming synthesis API."""
+    from google.cloud import texttospeech_v1beta1 as texttospeech
+
+    _, voice_config = resolve_voice(voice_category)
+    config = texttospeech.StreamingSynthesizeConfig(
+        voice=texttospeech.VoiceSelectionParams(
+            language_code=voice_config["language_code"],
+            name=voice_config["name"],
+        ),
+        streaming_audio_config=texttospeech.StreamingAudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.PCM,
+            sample_rate_hertz=STREAM_SAMPLE_RATE,
+        ),
+    )
+
+    def requests():
+        # The first request carries only the config; every later one carries text.
+        yield texttospeech.StreamingSynthesizeRequest(streaming_config=config)
+        for chunk in text_chunks:
+            yield texttospeech.StreamingSynthesizeRequest(input=texttospeech.StreamingSynthesisInput(text=chunk))
+
+    for response in get_tts_client().streaming_synthesize(requests=requests()):
+        if response.audio_content:
+            yield response.audio_content
+
+
+def _stub_audio_chunks(text_chunks: List[str], voice_category: str) -> Iterator[bytes]:
+    """Local stand-in for the streaming API: a quiet tone of the prior-predicted length per text chunk."""
+    import numpy as np
+
+    from .narration_predictor import PRIOR_COEFFICIENTS, text_features
+
+    resolve_voice(voice_category)
+    for chunk in text_chunks:
+        seconds = sum(b * x for b, x in zip(PRIOR_COEFFICIENTS, text_features(chunk)))
+        t = np.arange(int(seconds * STREAM_SAMPLE_RATE), dtype=np.float32) / STREAM_SAMPLE_RATE
+        tone = 0.2 * np.sin(2 * math.pi * 220.0 * t)
+        pcm = (tone * 32767.0).astype("<i2").tobytes()
+        # Deliver the tone in ~100 ms pieces like the real stream does.
+        step = STREAM_SAMPLE_RATE // 10 * BYTES_PER_SAMPLE
+        for offset in range(0, len(pcm), step):
+            yield pcm[offset: offset + step]
+
+
+_BACKENDS = {"chirp": _chirp_audio_chunks, "stub": _stub_audio_chunks}
+
+
+def stream_pcm(audio_chunks: Iterable[bytes], writer: BinaryIO, sample_rate: int = STREAM_SAMPLE_RATE) -> Dict:
+    """
+    Writes each PCM chunk to `writer` as it arrives, without a header.
+
+    Returns:
+        dict: bytes written, duration in seconds and first_audio_seconds (time until the first chunk).
+    """
+    started = time.monotonic()
+    first_audio_seconds = None
+    pcm_bytes = 0
+    # Odd-length chunks would split a sample; carry the spare byte into the next chunk.
+    carry = b""
+    for chunk in audio_chunks:
+        if first_audio_seconds is None:
+            first_audio_seconds = time.monotonic() - started
+        chunk = carry + chunk
+        usable = len(chunk) - len(chunk) % BYTES_PER_SAMPLE
+        carry = chunk[usable:]
+        writer.write(chunk[:usable])
+        pcm_bytes += usable
+    return {
+        "bytes": pcm_bytes,
+        "duration": round(pcm_bytes / (sample_rate * BYTES_PER_SAMPLE), 3),
+        "first_audio_seconds": round(first_audio_seconds or 0.0, 3),
+    }
+
+
+def stream_pcm_to_wav(audio_chunks: Iterable[bytes], writer: BinaryIO, sample_rate: int = STREAM_SAMPLE_RATE) -> Dict:
+    """
+    Writes a WAV header followed by each PCM chunk to a seekable `writer` as it arrives,
+    then rewrites the header with the real sizes.
+
+    Returns:
+        dict: bytes written (header included), duration in seconds and first_audio_seconds.
+    """
+    start = writer.tell()
+    writer.write(streaming_wav_header(sample_rate))
+    report = stream_pcm(audio_chunks, writer, sample_rate)
+    end = writer.tell()
+    writer.seek(start)
+    writer.write(streaming_wav_header(sample_rate, report["bytes"]))
+    writer.seek(end)
+    report["bytes"] += WAV_HEADER_BYTES
+    return report
+
+
+def _stream_to_gcs(gcs_bucket_name: str, blob_name: str, audio_chunks: Iterable[bytes]) -> Dict:
+    """
+    Streams the PCM data into a resumable upload, then composes gs://{gcs_bucket_name}/{blob_name}
+    from a header with the real sizes and that data. Blocking.
+    """
+    from google.cloud import storage
+
+    bucket = storage.Client().bucket(gcs_bucket_name)
+    data_blob = bucket.blob(f"{blob_name}.pcm", chunk_size=UPLOAD_CHUNK_SIZE)
+    header_blob = bucket.blob(f"{blob_name}.header")
+    try:
+        with data_blob.open("wb", content_type="application/octet-stream") as writer:
+            report = stream_pcm(audio_chunks, writer)
+        header_blob.upload_from_string(streaming_wav_header(STREAM_SAMPLE_RATE, report["bytes"]),
+                                       content_type="application/octet-stream")
+        wav_blob = bucket.blob(blob_name)
+        wav_blob.content_type = "audio/wav"
+        # Server-side concatenation; the audio is not downloaded or uploaded again.
+        wav_blob.compose([header_blob, data_blob])
+    finally:
+        for part in (header_blob, data_blob):
+            try:
+                part.delete()
+            except Exception:
+                pass # Never uploaded, or already gone.
+    report["bytes"] += WAV_HEADER_BYTES
+    return report
+
+
+async def stream_text_to_speech(text: str, voice_category: str) -> dict:
+    """
+    Synthesizes long narration with streaming Chirp 3 HD synthesis straight into GCS.
+
+    Audio is uploaded while it is being synthesized, so long voice-overs get their
+    URI sooner than with text_to_speech and memory use stays flat. The result is a
+    16-bit WAV and already includes its measured duration. Streaming synthesis has
+    no speaking rate; use fit_narration_to_duration to adjust the length afterwards.
+    SSML is NOT supported; the input 'text' must be plain text.
+
+    Args:
+        text: The plain text string to synthesize.
+        voice_category: One of the Chirp 3 HD voice categories accepted by text_to_speech.
+
+    Returns:
+        dict: uri and duration_s of the WAV (has_audio true). Or an error message string.
+    """
+    # "chirp" for the streaming API, "stub" for the local test generator.
+    backend = os.getenv("NARRATION_STREAM_BACKEND", "chirp").lower()
+    if backend not in _BACKENDS:
+        return f"Error: Unknown streaming backend '{backend}'. Valid options are: {', '.join(_BACKENDS)}"
+    try:
+        normalized_category, _ = resolve_voice(voice_category)
+    except ValueError as e:
+        return f"Error: {e}"
+    text_chunks = split_text_for_streaming(text)
+    if not text_chunks:
+        return "Error: text is empty."
+
+    gcs_bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET", "byron-alpha-vpagent")
+    blob_name = f"chirp_stream_{uuid.uuid4()}.wav"
+    started = time.monotonic()
+    print(f"Streaming {len(text_chunks)} text chunks with voice '{voice_category}' to gs://{gcs_bucket_name}/{blob_name}...")
+    try:
+        # The streaming call and the upload block, so they run off the event loop.
+        report = await asyncio.to_thread(
+            _stream_to_gcs, gcs_bucket_name, blob_name, _BACKENDS[backend](text_chunks, normalized_category))
+    except Exception as e:
+        return f"Error streaming narration: {type(e).__name__}: {e}"
+
+    gcs_uri = f"gs://{gcs_bucket_name}/{blob_name}"
+    report["wall_seconds"] = round(time.monotonic() - started, 2)
+    print(f"✅ Streamed narration uploaded to GCS: {gcs_uri} ({report})")
+
+    if backend == "chirp":
+        from .narration_predictor import get_predictor
+        try:
+            get_predictor().record(text, normalized_category, 1.0, report["duration"])
+        except Exception as e:
+            print(f"WARNING: Could not record narration measurement for '{gcs_uri}': {e}")
+    return MediaResult(gcs_uri, report["duration"], has_audio=True).to_dict()
@@ -4,17 +4,14 @@
 #              Requires all synthesis parameters to be explicitly provided.
 
 import uuid
-from google.cloud import texttospeech_v1 as texttospeech
-from google.api_core.exceptions import GoogleAPICallError, RetryError
-from google.cloud.texttospeech_v1.types import SsmlVoiceGender
 
 # --- Voice Category Definitions ---
-# (Same as before)
+# (Same as before; ssml_gender is the SsmlVoiceGender member name, resolved when synthesizing)
 VOICE_CATEGORY_DEFAULTS = {
-    "male_high": {"language_code": "en-US", "name": "en-US-Wavenet-D", "ssml_gender": SsmlVoiceGender.MALE},
-    "female_high": {"language_code": "en-US", "name": "en-US-Wavenet-F", "ssml_gender": SsmlVoiceGender.FEMALE},
-    "male_low": {"language_code": "en-US", "name": "en-US-Standard-D", "ssml_gender": SsmlVoiceGender.MALE},
-    "female_low": {"language_code": "en-US", "name": "en-US-Standard-F", "ssml_gender": SsmlVoiceGender.FEMALE},
+    "male_high": {"language_code": "en-US", "name": "en-US-Wavenet-D", "ssml_gender": "MALE"},
+    "female_high": {"language_code": "en-US", "name": "en-US-Wavenet-F", "ssml_gender": "FEMALE"},
+    "male_low": {"language_code": "en-US", "name": "en-US-Standard-D", "ssml_gender": "MALE"},
+    "female_low": {"language_code": "en-US", "name": "en-US-Standard-F", "ssml_gender": "FEMALE"},
 }
 #TODO: FIgure out how to not hard code these values!!
 
@@ -40,17 +37,20 @@ def text_to_speech(
 
     Returns:
     """
+    import os
+    from .gcp_auth import get_project_id
+
     return synthesize_text_to_gcs_sync(
         text=text,
-        gcs_bucket_name="byron-alpha-vpagent",
+        gcs_bucket_name=os.getenv("GOOGLE_CLOUD_BUCKET", "byron-alpha-vpagent"),
         voice_category=voice_category,
         speaking_rate=speaking_rate,
         pitch=0.0,
         volume_gain_db=0.0,
         timeout_seconds=300.0,
         is_ssml=True,
-        GOOGLE_CLOUD_PROJECT="byron-alpha", #TODO: parameterize
-        GOOGLE_CLOUD_LOCATION="us-central1"
+        GOOGLE_CLOUD_PROJECT=get_project_id(),
+        GOOGLE_CLOUD_LOCATION=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
     )
 
 # --- Core Synchronous Synthesis Function (NO Default Parameters) ---
@@ -92,6 +92,9 @@ def synthesize_text_to_gcs_sync(
         TimeoutError: If waiting for the synthesis operation exceeds timeout_seconds.
         Exception: For other unexpected errors.
     """
+    from google.cloud import texttospeech_v1 as texttospeech
+    from google.api_core.exceptions import GoogleAPICallError, RetryError
+
     normalized_category = voice_category.lower().replace(" ", "_")
     if normalized_category not in VOICE_CATEGORY_DEFAULTS:
         raise ValueError(
@@ -113,7 +116,7 @@ def synthesize_text_to_gcs_sync(
     voice = texttospeech.VoiceSelectionParams(
         language_code=voice_config["language_code"],
         name=voice_config["name"],
-        ssml_gender=voice_config["ssml_gender"],
+        ssml_gender=texttospeech.SsmlVoiceGender[voice_config["ssml_gender"]],
     )
 
     # Use the explicitly passed parameters
@@ -0,0 +1,320 @@
+"""
+Incremental, make-style rendering of a whole commercial timeline.
+
+Editing one scene's narration or prompt used to mean re-running mux_audio,
+video_join_tool and mux_music across every scene. `render_scenes` (which
+produce_commercial renders every plan with) treats the commercial as a
+dependency graph instead:
+
+    narration[i] --+--> (fit[i]) --+--> mux[i] --+--> join[g] --> music_mux[g] --> final join
+    video[i] ------+---------------+             |
+    music ---------------------------------------+
+
+Every node's output is cached under a hash of its inputs (the URIs or text it
+consumes plus the Transcoder encode settings it renders with). Rendering again
+only rebuilds nodes whose inputs changed: an edit to one scene regenerates that
+scene and its mux, then redoes the joins and music mux, reusing everything else.
+Veo and Lyria outputs also go through the generation ledger. The cache lives in
+a local SQLite database (RENDER_CACHE_DB).
+
+Every node that is rebuilt runs as a stage of the current deadline (see
+deadline) with the budget of its kind in STAGE_BUDGET_SECONDS, and the first
+node to fail cancels the rest of the render instead of letting it finish.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .audio_fit import fit_narration_to_duration
+from .chirp_audio import VOICE_CATEGORY_DEFAULTS
+from .deadline import Deadline, DeadlineExceeded, check_deadline, stage
+from .generation_ledger import generation_key, outputs_exist
+from .lyria_music import generate_lyria_music
+from .mux_audio import MUX_AUDIO_ENCODE_SETTINGS, get_mp3_audio_duration_gcs, start_mux_audio_job
+from .mux_music import MUX_MUSIC_ENCODE_SETTINGS, mux_music
+from .progress import report_artifact, report_progress
+from .speculative_scene import MAX_VEO_SECONDS, clip_fits, synthesize_and_measure, veo_duration_for
+from .tool_results import ToolError
+from .transcoder_jobs import wait_for_transcoder_job
+from .veo_client import VEO_MODEL_ID, generate_videos
+from .video_join_tool import JOIN_ENCODE_SETTINGS, video_join_tool
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".video_producer_agent", "render_cache.db")
+
+# Lyria renders 30 second clips.
+LYRIA_CLIP_SECONDS = 30.0
+# A failed Veo generation (e.g. blocked by a safety filter) is retried this many times in total.
+VEO_MAX_ATTEMPTS = 3
+# Time budget of one rebuilt node, by kind (capped by what is left of the run's deadline).
+STAGE_BUDGET_SECONDS = {
+    "narration": 120,
+    "video": 900,
+    "fit": 120,
+    "mux_audio": 300,
+    "join": 300,
+    "music": 300,
+    "mux_music": 300,
+}
+
+
+class RenderCache:
+    """SQLite table mapping a node's input hash to its output (a dict with at least "uri")."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("RENDER_CACHE_DB", DEFAULT_DB_PATH)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS renders ("
+                " key TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " inputs TEXT NOT NULL,"
+                " output TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT output FROM renders WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, key: str, kind: str, inputs: Dict, output: Dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO renders (key, kind, inputs, output, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(inputs, sort_keys=True), json.dumps(output), time.time()),
+            )
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[RenderCache] = None
+
+
+def get_render_cache() -> RenderCache:
+    """Returns the process-wide render cache backed by RENDER_CACHE_DB."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RenderCache()
+    return _cache
+
+
+class TimelineBuild:
+    """Tracks which nodes of one render were rebuilt and which were reused."""
+
+    def __init__(self):
+        self.cache = get_render_cache()
+        self.built: List[str] = []
+        self.reused: List[str] = []
+
+    async def node(self, name: str, kind: str, inputs: Dict, build: Callable[[], Awaitable[Dict]]) -> Dict:
+        key = generation_key(kind, inputs)
+        cached = await asyncio.to_thread(self.cache.lookup, key)
+        if cached is not None:
+            try:
+                still_there = await asyncio.to_thread(outputs_exist, [cached["uri"]])
+            except Exception as e:
+                print(f"WARNING: Could not verify cached {name}: {e}")
+                still_there = True
+            if still_there:
+                self.reused.append(name)
+                return cached
+        print(f"Rebuilding {name}...")
+        with stage(name, STAGE_BUDGET_SECONDS.get(kind)):
+            output = await build()
+        await asyncio.to_thread(self.cache.record, key, kind, inputs, output)
+        self.built.append(name)
+        return output
+
+
+def deadline_error(e: DeadlineExceeded, run: Deadline) -> dict:
+    """The ToolError of a run that missed its deadline, with the stage that used up the budget."""
+    return {**ToolError.from_exception(e).to_dict(), "stage": e.stage, "slowest_stages": run.report.slowest()}
+
+
+def _gcs_uri_or_raise(result) -> str:
+    """Tool functions return a GCS URI on success and an error string otherwise."""
+    if not isinstance(result, str) or not result.startswith("gs://"):
+        # The tools turn every exception into a string; report a missed deadline as one.
+        check_deadline()
+        raise RuntimeError(str(result))
+    return result
+
+
+async def _render_scene(build: TimelineBuild, index: int, scene: Dict) -> Dict:
+    """Renders one scene dict (video_prompt, narration_text, voice_category, speaking_rate and
+    optionally image_gcs_uri/image_mime_type) and returns its muxed clip."""
+    name = f"scene-{index + 1}"
+    narration_text = scene["narration_text"]
+    voice_category = scene["voice_category"]
+    speaking_rate = scene["speaking_rate"]
+    image_gcs_uri = scene.get("image_gcs_uri") or None
+    image_mime_type = scene.get("image_mime_type") or None
+
+    async def narrate() -> Dict:
+        uri, duration = await synthesize_and_measure(narration_text, voice_category, speaking_rate)
+        return {"uri": uri, "duration": duration}
+
+    narration = await build.node(f"{name}/narration", "narration", {
+        "text": narration_text,
+        "voice": VOICE_CATEGORY_DEFAULTS[voice_category]["name"],
+        "speaking_rate": speaking_rate,
+    }, narrate)
+
+    # The clip length follows the measured narration, so it only changes when the narration does.
+    video_duration = veo_duration_for(narration["duration"])
+
+    async def generate() -> Dict:
+        for attempt in range(1, VEO_MAX_ATTEMPTS + 1):
+            try:
+                video_uris, _ = await generate_videos(
+                    prompt=scene["video_prompt"],
+                    duration_seconds=video_duration,
+                    output_folder="veo_image_to_video" if image_gcs_uri else "veo2",
+                    image_gcs_uri=image_gcs_uri,
+                    image_mime_type=image_mime_type,
+                    aspect_ratio="16:9" if image_gcs_uri else None,
+                )
+                return {"uri": video_uris[0], "duration": float(video_duration)}
+            except Exception as e:
+                if attempt == VEO_MAX_ATTEMPTS:
+                    raise
+                print(f"{name}: video generation attempt {attempt} failed ({type(e).__name__}: {e}); retrying.")
+
+    video = await build.node(f"{name}/video", "video", {
+        "model": VEO_MODEL_ID, "prompt": scene["video_prompt"], "duration_seconds": video_duration,
+        "image_gcs_uri": image_gcs_uri,
+    }, generate)
+
+    if not clip_fits(narration["duration"], video["duration"]):
+        async def fit() -> Dict:
+            fitted = await asyncio.to_thread(fit_narration_to_duration, narration["uri"], video["duration"])
+            if isinstance(fitted, str):
+                raise RuntimeError(fitted)
+            if not fitted["fits"]:
+                raise RuntimeError(f"{name}: narration of {narration['duration']:.2f}s does not fit "
+                                   f"{MAX_VEO_SECONDS} seconds even at 1.3x; shorten the text.")
+            return {"uri": fitted["uri"], "duration": fitted["fitted_duration"]}
+
+        narration = await build.node(f"{name}/fit", "fit", {
+            "audio_uri": narration["uri"], "target_duration": video["duration"],
+        }, fit)
+
+    end_time_offset = round(min(narration["duration"], video["duration"]), 3)
+
+    async def mux() -> Dict:
+        job_name, output_uri = await start_mux_audio_job(video["uri"], narration["uri"], end_time_offset)
+        await wait_for_transcoder_job(job_name)
+        return {"uri": output_uri, "duration": end_time_offset}
+
+    muxed = await build.node(f"{name}/mux", "mux_audio", {
+        "video_uri": video["uri"], "audio_uri": narration["uri"], "end_time_offset": end_time_offset,
+        "settings": MUX_AUDIO_ENCODE_SETTINGS,
+    }, mux)
+    return {**muxed, "video_uri": video["uri"], "narration_uri": narration["uri"],
+            "narration_duration": round(narration["duration"], 3)}
+
+
+async def _join(build: TimelineBuild, name: str, clips: List[Dict]) -> Dict:
+    uris = [clip["uri"] for clip in clips]
+    duration = round(sum(clip["duration"] for clip in clips), 3)
+    if len(uris) == 1:
+        return clips[0]
+
+    async def join() -> Dict:
+        return {"uri": _gcs_uri_or_raise(await video_join_tool(uris)), "duration": duration}
+
+    return await build.node(name, "join", {"input_uris": uris, "settings": JOIN_ENCODE_SETTINGS}, join)
+
+
+async def gather_or_abort(*awaitables) -> List:
+    """asyncio.gather that cancels the remaining awaitables as soon as one of them fails."""
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        # Let them stop (and schedule the cleanup of their jobs) before the error is reported.
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _group_by_length(clips: List[Dict], max_seconds: float) -> List[List[Dict]]:
+    """Splits consecutive clips into groups that each fit within max_seconds (a longer clip gets its own group)."""
+    groups: List[List[Dict]] = [[]]
+    total = 0.0
+    for clip in clips:
+        if groups[-1] and total + clip["duration"] > max_seconds:
+            groups.append([])
+            total = 0.0
+        groups[-1].append(clip)
+        total += clip["duration"]
+    return groups
+
+
+async def render_scenes(build: TimelineBuild, scenes: List[Dict], music_prompt: str = "",
+                        music_negative_prompt: str = "", music_volume: float = 0.3):
+    """
+    Renders every scene concurrently and assembles them (with music if music_prompt is set).
+
+    Returns (rendered_scenes, final) where each entry has at least "uri" and "duration".
+    Raises on the first node that fails, after cancelling the nodes still running.
+    """
+    done = 0
+
+    async def render(index: int, scene: Dict) -> Dict:
+        nonlocal done
+        result = await _render_scene(build, index, scene)
+        done += 1
+        # Inside a background job each scene is published as soon as it is muxed; the
+        # assembly counts as one more step.
+        report_artifact(result["uri"], f"scene {index + 1}")
+        report_progress(processed=done / (len(scenes) + 1), detail=f"{done} of {len(scenes)} scenes rendered")
+        return result
+
+    rendered = list(await gather_or_abort(*(render(i, scene) for i, scene in enumerate(scenes))))
+
+    if not music_prompt:
+        return rendered, await _join(build, "final", rendered)
+
+    async def compose() -> Dict:
+        music_uri = _gcs_uri_or_raise(
+            await asyncio.to_thread(generate_lyria_music, music_prompt, music_negative_prompt)
+        )
+        duration = await asyncio.to_thread(get_mp3_audio_duration_gcs, music_uri)
+        return {"uri": music_uri, "duration": float(duration) if isinstance(duration, (int, float)) else LYRIA_CLIP_SECONDS}
+
+    music = await build.node("music", "music", {
+        "prompt": music_prompt, "negative_prompt": music_negative_prompt,
+        "model": os.getenv("LYRIA_MODEL_ID", "lyria-002"),
+    }, compose)
+
+    # Each group of scenes no longer than one music clip gets its own copy of the score.
+    async def score(group_index: int, group: List[Dict]) -> Dict:
+        joined = await _join(build, f"join-{group_index + 1}", group)
+
+        async def add_music() -> Dict:
+            result = await mux_music(joined["uri"], music["uri"], music_volume,
+                                     music["duration"], joined["duration"])
+            return {"uri": _gcs_uri_or_raise(result), "duration": joined["duration"]}
+
+        return await build.node(f"music-{group_index + 1}", "mux_music", {
+            "video_uri": joined["uri"], "music_uri": music["uri"], "volume": music_volume,
+            "music_duration": music["duration"], "video_duration": joined["duration"],
+            "settings": MUX_MUSIC_ENCODE_SETTINGS,
+        }, add_music)
+
+    groups = _group_by_length(rendered, music["duration"])
+    parts = await gather_or_abort(*(score(i, group) for i, group in enumerate(groups)))
+    return rendered, await _join(build, "final", list(parts))
@@ -0,0 +1,186 @@
+"""
+Small, typed results for every agent tool.
+
+Every tool result is serialized into the LLM context and resent on each later
+turn. The video tools used to return the whole Veo operation response and the
+other tools returned free-form strings, so a commercial's context grew by
+kilobytes per scene. Tools now return one of two fixed schemas:
+
+    MediaResult  {uri, duration_s, width, height, has_audio, alternates}
+    ToolError    {error_code, retryable, message}
+
+(fields that are unknown are left out). Tools with structured reports (metrics,
+pipeline status, timeline renders) keep their dicts but go through the same
+compaction. `compact_tool` applies this at the agent boundary, so the internal
+helpers that other modules call keep returning plain URIs and raising.
+"""
+import functools
+import inspect
+import json
+from typing import Any, Dict, List, Optional
+
+# Longest string (error message, status text) kept in a tool result.
+MAX_MESSAGE_CHARS = 300
+
+# Error codes, and whether retrying the same call can succeed.
+INVALID_ARGUMENT = "INVALID_ARGUMENT"
+NOT_FOUND = "NOT_FOUND"
+PERMISSION_DENIED = "PERMISSION_DENIED"
+QUOTA_EXHAUSTED = "QUOTA_EXHAUSTED"
+SAFETY_BLOCKED = "SAFETY_BLOCKED"
+TIMEOUT = "TIMEOUT"
+UNAVAILABLE = "UNAVAILABLE"
+CANCELLED = "CANCELLED"
+DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED"
+INTERNAL = "INTERNAL"
+
+RETRYABLE_CODES = {QUOTA_EXHAUSTED, TIMEOUT, UNAVAILABLE}
+
+_HTTP_STATUS_CODES = {400: INVALID_ARGUMENT, 403: PERMISSION_DENIED, 404: NOT_FOUND,
+                      408: TIMEOUT, 429: QUOTA_EXHAUSTED, 504: TIMEOUT}
+
+# First matching keyword group classifies a legacy error string.
+_MESSAGE_KEYWORDS = (
+    (CANCELLED, ("cancelled", "canceled")),
+    (DEADLINE_EXCEEDED, ("deadline exceeded",)),
+    (SAFETY_BLOCKED, ("safety", "blocked", "filtered", "responsible ai")),
+    (QUOTA_EXHAUSTED, ("quota", "resource exhausted", "resourceexhausted", "429")),
+    (TIMEOUT, ("timed out", "timeout", "deadline")),
+    (UNAVAILABLE, ("unavailable", "503", "connection", "try again")),
+    (PERMISSION_DENIED, ("permission", "403", "forbidden", "credentials", "adc not found")),
+    (NOT_FOUND, ("not found", "404", "does not exist")),
+    (INVALID_ARGUMENT, ("invalid", "must", "required", "expected", "does not fit", "empty")),
+)
+
+
+def _truncate(text: str, limit: int = MAX_MESSAGE_CHARS) -> str:
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+class MediaResult:
+    """A generated or processed media file."""
+
+    __slots__ = ("uri", "duration_s", "width", "height", "has_audio", "alternates")
+
+    def __init__(self, uri: str, duration_s: Optional[float] = None, width: Optional[int] = None,
+                 height: Optional[int] = None, has_audio: Optional[bool] = None,
+                 alternates: Optional[List[str]] = None):
+        self.uri = uri
+        self.duration_s = round(float(duration_s), 3) if duration_s is not None else None
+        self.width = width
+        self.height = height
+        self.has_audio = has_audio
+        self.alternates = alternates or None
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+
+class ToolError:
+    """A failed tool call: a stable code, whether retrying can help, and a short message."""
+
+    __slots__ = ("error_code", "retryable", "message")
+
+    def __init__(self, error_code: str, message: str, retryable: Optional[bool] = None):
+        self.error_code = error_code
+        self.retryable = error_code in RETRYABLE_CODES if retryable is None else retryable
+        self.message = _truncate(message)
+
+    def to_dict(self) -> Dict:
+        return {"error_code": self.error_code, "retryable": self.retryable, "message": self.message}
+
+    @classmethod
+    def from_exception(cls, e: BaseException) -> "ToolError":
+        message = f"{type(e).__name__}: {e}"
+        # Exceptions of this package (OperationCancelled, DeadlineExceeded) carry their own code.
+        if isinstance(getattr(e, "error_code", None), str):
+            return cls(e.error_code, message)
+        status = getattr(e, "code", None)
+        if isinstance(status, int):
+            if status in _HTTP_STATUS_CODES:
+                return cls(_HTTP_STATUS_CODES[status], message)
+            if status >= 500:
+                return cls(UNAVAILABLE, message)
+        if isinstance(e, TimeoutError):
+            return cls(TIMEOUT, message)
+        if isinstance(e, FileNotFoundError):
+            return cls(NOT_FOUND, message)
+        if isinstance(e, (ValueError, TypeError)):
+            return cls(INVALID_ARGUMENT, message)
+        return cls.from_message(message)
+
+    @classmethod
+    def from_message(cls, message: str) -> "ToolError":
+        lowered = message.lower()
+        for code, keywords in _MESSAGE_KEYWORDS:
+            if any(keyword in lowered for keyword in keywords):
+                return cls(code, message)
+        return cls(INTERNAL, message)
+
+
+def _is_error_message(text: str) -> bool:
+    lowered = text.lstrip().lower()
+    return lowered.startswith(("error", "an unexpected error", "failed")) or "cannot determine" in lowered
+
+
+def compact_result(value: Any) -> Any:
+    """Converts any tool return value to its compact, JSON-ready form."""
+    if isinstance(value, (MediaResult, ToolError)):
+        return value.to_dict()
+    if isinstance(value, BaseException):
+        return ToolError.from_exception(value).to_dict()
+    if isinstance(value, str):
+        if value.startswith("gs://"):
+            return MediaResult(value).to_dict()
+        if _is_error_message(value):
+            return ToolError.from_message(value).to_dict()
+        return {"result": _truncate(value)}
+    if isinstance(value, bool) or value is None:
+        return {"result": value}
+    if isinstance(value, (int, float)):
+        return {"duration_s": round(float(value), 3)}
+    if isinstance(value, dict):
+        return {key: _compact_value(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return {"results": [_compact_value(item) for item in value]}
+    if hasattr(value, "model_dump"):
+        return compact_result(value.model_dump(mode="json", exclude_none=True))
+    return {"result": _truncate(str(value))}
+
+
+def _compact_value(value: Any) -> Any:
+    if isinstance(value, (MediaResult, ToolError)):
+        return value.to_dict()
+    if isinstance(value, float):
+        return round(value, 3)
+    if isinstance(value, str):
+        return _truncate(value)
+    if isinstance(value, dict):
+        return {key: _compact_value(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_compact_value(item) for item in value]
+    return value
+
+
+def compact_tool(func):
+    """Wraps a tool function so it returns compact results (and a ToolError instead of raising)."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return compact_result(await func(*args, **kwargs))
+            except Exception as e:
+                return ToolError.from_exception(e).to_dict()
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return compact_result(func(*args, **kwargs))
+            except Exception as e:
+                return ToolError.from_exception(e).to_dict()
+    return wrapper
+
+
+def result_size(value: Any) -> int:
+    """Number of characters a tool result adds to the LLM context."""
+    return len(json.dumps(value, separators=(",", ":"), default=str))
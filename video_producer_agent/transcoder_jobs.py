@@ -0,0 +1,158 @@
+"""
+Shared helpers for waiting on Transcoder API jobs.
+
+A job is identified only by its resource name, so any process can wait on a
+job another one created; the pipeline journal relies on this to reattach to
+mux jobs after a restart. Inside a background job (see progress) every poll
+is reported as the job's progress, and a cancelled session (see cancellation)
+deletes the job being waited on. A wait is bounded by the run's deadline (see
+deadline) and never lasts longer than TRANSCODER_JOB_BUDGET_SECONDS. With
+render workers (see render_queue) the wait runs on a worker.
+
+Jobs are created with `submit_transcoder_job`, which picks their region (see
+transcoder_scheduler); the region's slot is freed when the wait ends. With
+Pub/Sub notifications (see transcoder_notifications) a wait sleeps until the
+job's completion message arrives instead of polling.
+"""
+import asyncio
+import datetime
+import time
+import uuid
+
+from .cancellation import TRANSCODER_JOB, cancellable_sleep, check_cancelled, in_flight
+from .deadline import call_timeout, stage
+from .gcp_auth import get_project_id
+from .progress import report_progress
+from .render_queue import offload
+from .transcoder_notifications import NOTIFICATION_FALLBACK_POLL_SECONDS, get_transcoder_notifications
+from .transcoder_scheduler import bucket_location, get_transcoder_scheduler, job_region
+
+TRANSCODER_POLL_INTERVAL_SECONDS = 15
+# Longest a single job may take (less if the run's deadline ends first).
+TRANSCODER_JOB_BUDGET_SECONDS = 900
+TRANSCODER_API_TIMEOUT_SECONDS = 60
+
+
+class TranscoderJobError(Exception):
+    """A Transcoder job finished in the FAILED state."""
+
+
+def _job_to_json(job) -> str:
+    return type(job).to_json(job)
+
+
+def _job_from_json(data: str):
+    from google.cloud.video.transcoder_v1.types import Job
+
+    return Job.from_json(data)
+
+
+async def submit_transcoder_job(job, client=None):
+    """
+    Creates a Transcoder job in the region the scheduler picks for its output bucket.
+
+    Waits for a free slot when every region is at its cap. Returns the created `Job`;
+    wait for it with `wait_for_transcoder_job`, which frees the slot. The job publishes
+    its completion to TRANSCODER_PUBSUB_TOPIC when notifications are on.
+    """
+    from google.cloud.video import transcoder_v1
+
+    client = client or transcoder_v1.TranscoderServiceAsyncClient()
+    notifications = await asyncio.to_thread(get_transcoder_notifications)
+    if notifications:
+        job.config.pubsub_destination = transcoder_v1.types.PubsubDestination(topic=notifications.topic)
+    scheduler = get_transcoder_scheduler()
+    bucket = job.output_uri[len("gs://"):].split("/", 1)[0]
+    location = await asyncio.to_thread(bucket_location, bucket)
+    key = uuid.uuid4().hex
+    region = await scheduler.acquire(key, location)
+    try:
+        check_cancelled()
+        created = await client.create_job(parent=f"projects/{get_project_id()}/locations/{region}", job=job,
+                                          timeout=call_timeout(TRANSCODER_API_TIMEOUT_SECONDS))
+    except BaseException:
+        scheduler.release(key)
+        raise
+    scheduler.assign(key, created.name)
+    return created
+
+
+async def wait_for_transcoder_job(job_name: str, client=None, poll_interval_seconds: float = TRANSCODER_POLL_INTERVAL_SECONDS):
+    """
+    Waits for a Transcoder job to finish (by notification, else by polling) and returns the final `Job`.
+
+    Raises:
+        TranscoderJobError: If the job fails.
+        OperationCancelled: If the session was cancelled (the job is deleted).
+        DeadlineExceeded: If the deadline passed first (the job is deleted).
+    """
+    job = None
+    try:
+        job = await _wait_for_transcoder_job(job_name, client, poll_interval_seconds)
+        return job
+    finally:
+        get_transcoder_scheduler().job_finished(job_name, job)
+
+
+@offload("transcoder", encode=_job_to_json, decode=_job_from_json)
+async def _wait_for_transcoder_job(job_name: str, client=None,
+                                   poll_interval_seconds: float = TRANSCODER_POLL_INTERVAL_SECONDS):
+    with stage("transcoder job", TRANSCODER_JOB_BUDGET_SECONDS), in_flight(TRANSCODER_JOB, job_name):
+        return await _poll_transcoder_job(job_name, client, poll_interval_seconds)
+
+
+async def _poll_transcoder_job(job_name: str, client, poll_interval_seconds: float):
+    from google.cloud.video import transcoder_v1
+    from google.cloud.video.transcoder_v1.types import Job
+
+    client = client or transcoder_v1.TranscoderServiceAsyncClient()
+    wait_started = time.monotonic()
+    notifications = await asyncio.to_thread(get_transcoder_notifications)
+    # A subscriber started by this wait missed anything the job published before; look once first.
+    poll_now = notifications is not None and notifications.started_at >= wait_started
+    while True:
+        if notifications is None or not notifications.active:
+            await cancellable_sleep(poll_interval_seconds)
+        elif poll_now:
+            poll_now = False
+        else:
+            report_progress(detail=f"Transcoder job {job_name.rsplit('/', 1)[-1]} running")
+            await notifications.wait(job_name, NOTIFICATION_FALLBACK_POLL_SECONDS)
+        print(f"Polling status for job {job_name}...")
+        response = await client.get_job(name=job_name, timeout=call_timeout(TRANSCODER_API_TIMEOUT_SECONDS))
+        current_state_name = Job.ProcessingState(response.state).name
+        print(f"Job status: {current_state_name}")
+        report_progress(detail=f"Transcoder job {job_name.rsplit('/', 1)[-1]} {current_state_name}")
+
+        if response.state == Job.ProcessingState.SUCCEEDED:
+            print(f"Transcoder job '{job_name}' succeeded.")
+            return response
+
+        elif response.state == Job.ProcessingState.FAILED:
+            error_message = "Unknown error"
+            error_details_str = ""
+            if response.error:
+                error_message = getattr(response.error, 'message', str(response.error))
+                details_list = getattr(response.error, 'details', [])
+                if details_list:
+                    error_details_str = f" | Details: {details_list}"
+            raise TranscoderJobError(f"Transcoder job '{job_name}' failed: {error_message}{error_details_str}")
+
+        elif response.state == Job.ProcessingState.RUNNING:
+            progress = getattr(response, 'progress', None)
+            progress_percent_str = "N/A"
+            if progress and hasattr(progress, 'processed') and progress.processed is not None:
+                progress_percent_str = f"{progress.processed:.1%}"
+                report_progress(processed=progress.processed)
+            print(f"Transcoder job '{job_name}' is RUNNING. Progress: {progress_percent_str}. Waiting...")
+
+        else:
+            print(f"Transcoder job '{job_name}' is {current_state_name}. Waiting...")
+            if response.state == Job.ProcessingState.PENDING and response.create_time:
+                pending = datetime.datetime.now(datetime.timezone.utc) - response.create_time
+                get_transcoder_scheduler().observe_pending(job_region(job_name), pending.total_seconds())
+
+
+def transcoder_output_uri(job) -> str:
+    """Returns the GCS URI of the first mux stream a job writes."""
+    return job.output_uri.rstrip("/") + "/" + job.config.mux_streams[0].file_name
@@ -0,0 +1,219 @@
+"""
+Transcoder job completion through Pub/Sub notifications.
+
+Waiting on a Transcoder job used to mean calling `get_job` every
+TRANSCODER_POLL_INTERVAL_SECONDS until it finished, which costs an API call
+per poll and notices the end of a job up to one interval late. With
+TRANSCODER_PUBSUB_TOPIC set, `submit_transcoder_job` points every job's
+`pubsub_destination` at that topic, and one subscriber per process resolves
+the waits of the jobs whose completion messages arrive. A wait then makes a
+single `get_job` call, to read the finished job; polling remains only as a
+slow fallback (NOTIFICATION_FALLBACK_POLL_SECONDS) for a lost message or a
+job created without notifications.
+
+Each process subscribes with its own subscription (deleted on exit, and
+expiring after a day unused otherwise), because the web process and every
+render worker need to see every message. Set TRANSCODER_PUBSUB_SUBSCRIPTION
+to use a fixed one instead (e.g. for a single process). The topic must exist
+and the Transcoder service agent needs permission to publish to it. With
+PUBSUB_EMULATOR_HOST set the Pub/Sub clients use the local emulator, where
+the topic and subscription are created on first use.
+"""
+import asyncio
+import atexit
+import collections
+import json
+import os
+import re
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .cancellation import CANCEL_CHECK_INTERVAL_SECONDS, check_cancelled
+from .deadline import check_deadline
+from .gcp_auth import get_project_id
+
+# How often a job is still polled while waiting for its notification.
+NOTIFICATION_FALLBACK_POLL_SECONDS = 120.0
+# Unused per-process subscriptions are deleted by Pub/Sub after this long.
+SUBSCRIPTION_TTL_SECONDS = 86400
+# Completion messages kept for waits that start after their job's message arrived.
+RECENT_EVENTS = 1024
+
+
+def notification_topic() -> Optional[str]:
+    """TRANSCODER_PUBSUB_TOPIC as a full topic path, or None if notifications are off."""
+    topic = os.getenv("TRANSCODER_PUBSUB_TOPIC", "").strip()
+    if not topic or topic.startswith("projects/"):
+        return topic or None
+    return f"projects/{get_project_id()}/topics/{topic}"
+
+
+def _job_id(job_name: str) -> str:
+    # Job names may carry the project ID or number; the job ID alone is unique.
+    return job_name.rsplit("/", 1)[-1]
+
+
+class TranscoderNotifications:
+    """
+    Streaming pull subscriber for Transcoder completion messages and the waits they resolve.
+    """
+
+    def __init__(self, topic: str, subscription: Optional[str] = None):
+        self.topic = topic
+        project = topic.split("/")[1]
+        if subscription:
+            self.subscription = subscription if subscription.startswith("projects/") else (
+                f"projects/{project}/subscriptions/{subscription}")
+            self._owns_subscription = False
+        else:
+            name = re.sub(r"[^A-Za-z0-9._~+%-]", "-", f"{topic.rsplit('/', 1)[-1]}-{socket.gethostname()}-{os.getpid()}")
+            self.subscription = f"projects/{project}/subscriptions/{name}"
+            self._owns_subscription = True
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, List] = {}
+        self._recent: "collections.OrderedDict[str, Dict]" = collections.OrderedDict()
+        self._subscriber = None
+        self._streaming_pull = None
+        self.started_at: Optional[float] = None
+        self.received = 0
+
+    @property
+    def active(self) -> bool:
+        return self._streaming_pull is not None and not self._streaming_pull.done()
+
+    def start(self) -> None:
+        """
+        Creates the subscription if needed and starts pulling.
+
+        Raises:
+            google.api_core.exceptions.GoogleAPIError: If the topic or subscription cannot be set up.
+        """
+        from google.api_core.exceptions import AlreadyExists
+        from google.cloud import pubsub_v1
+
+        if os.getenv("PUBSUB_EMULATOR_HOST"):
+            try:
+                pubsub_v1.PublisherClient().create_topic(request={"name": self.topic})
+            except AlreadyExists:
+                pass
+        subscriber = pubsub_v1.SubscriberClient()
+        request = {"name": self.subscription, "topic": self.topic, "ack_deadline_seconds": 10}
+        if self._owns_subscription:
+            request["expiration_policy"] = {"ttl": {"seconds": SUBSCRIPTION_TTL_SECONDS}}
+        try:
+            subscriber.create_subscription(request=request)
+        except AlreadyExists:
+            pass
+        self._subscriber = subscriber
+        self._streaming_pull = subscriber.subscribe(self.subscription, callback=self._on_message)
+        self._streaming_pull.add_done_callback(self._on_stopped)
+        self.started_at = time.monotonic()
+        print(f"Listening for Transcoder notifications on {self.subscription}.")
+
+    def close(self) -> None:
+        """Stops pulling and deletes this process's own subscription."""
+        if self._streaming_pull is not None:
+            self._streaming_pull.cancel()
+        if self._subscriber is not None and self._owns_subscription:
+            try:
+                self._subscriber.delete_subscription(request={"subscription": self.subscription})
+            except Exception as e:
+                print(f"Could not delete subscription {self.subscription}: {e}")
+
+    def _on_stopped(self, future) -> None:
+        if not future.cancelled() and future.exception():
+            # Waits fall back to polling from here on.
+            print(f"Transcoder notifications stopped: {future.exception()}")
+
+    def _on_message(self, message) -> None:
+        # Runs on the subscriber's threads.
+        message.ack()
+        try:
+            job = json.loads(message.data.decode("utf-8")).get("job", {})
+        except (ValueError, AttributeError):
+            return
+        if not job.get("name"):
+            return
+        self.deliver(job)
+
+    def deliver(self, job: Dict) -> None:
+        """Resolves the waits on one job from its notification ({"name": ..., "state": ...})."""
+        job_id = _job_id(job["name"])
+        with self._lock:
+            self.received += 1
+            self._recent[job_id] = job
+            while len(self._recent) > RECENT_EVENTS:
+                self._recent.popitem(last=False)
+            waiters = self._waiters.pop(job_id, [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, job)
+
+    async def wait(self, job_name: str, timeout: float) -> Optional[Dict]:
+        """
+        Waits up to `timeout` seconds for the job's notification and returns it (None on timeout).
+
+        Raises:
+            OperationCancelled: If the session is cancelled meanwhile.
+            DeadlineExceeded: If the current deadline passes meanwhile.
+        """
+        job_id = _job_id(job_name)
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            if job_id in self._recent:
+                return self._recent[job_id]
+            self._waiters.setdefault(job_id, []).append((asyncio.get_running_loop(), future))
+        wake_at = time.monotonic() + timeout
+        try:
+            while not future.done():
+                check_cancelled()
+                check_deadline()
+                remaining = wake_at - time.monotonic()
+                if remaining <= 0 or not self.active:
+                    return None
+                await asyncio.wait({future}, timeout=min(remaining, CANCEL_CHECK_INTERVAL_SECONDS))
+            return future.result()
+        finally:
+            with self._lock:
+                waiters = [w for w in self._waiters.get(job_id, []) if w[1] is not future]
+                if waiters:
+                    self._waiters[job_id] = waiters
+                else:
+                    self._waiters.pop(job_id, None)
+
+
+def _resolve(future, job: Dict) -> None:
+    if not future.done():
+        future.set_result(job)
+
+
+_notifications_lock = threading.Lock()
+_notifications: Optional[TranscoderNotifications] = None
+_notifications_failed = False
+
+
+def get_transcoder_notifications() -> Optional[TranscoderNotifications]:
+    """
+    Returns the process's started subscriber, or None if notifications are off or could not start.
+
+    Starting it makes network calls; call it from a thread in async code.
+    """
+    global _notifications, _notifications_failed
+    if _notifications is None and not _notifications_failed:
+        with _notifications_lock:
+            if _notifications is None and not _notifications_failed:
+                topic = notification_topic()
+                if not topic:
+                    _notifications_failed = True
+                    return None
+                notifications = TranscoderNotifications(topic, os.getenv("TRANSCODER_PUBSUB_SUBSCRIPTION"))
+                try:
+                    notifications.start()
+                except Exception as e:
+                    print(f"Transcoder notifications unavailable, polling jobs instead: {e}")
+                    _notifications_failed = True
+                    return None
+                atexit.register(notifications.close)
+                _notifications = notifications
+    return _notifications
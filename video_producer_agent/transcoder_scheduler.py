@@ -0,0 +1,218 @@
+"""
+Placement of Transcoder jobs across regions.
+
+Every Transcoder job used to be created in GOOGLE_CLOUD_LOCATION (or in the
+region the LLM passed to video_join_tool), whatever the bucket's location and
+however long that region's jobs were waiting to start. The scheduler spreads
+jobs over the regions in TRANSCODER_REGIONS:
+
+- it prefers the regions co-located with the bucket the job reads and writes
+  (its location is looked up once per bucket and cached), since a job in
+  another region reads every input across regions;
+- it runs at most TRANSCODER_REGION_MAX_JOBS jobs at once per region, and a
+  job that finds every region full waits for a slot;
+- it tracks each region's queue latency (how long its jobs wait before they
+  start) and moves jobs to another region once the preferred region's latency
+  exceeds the other's by more than TRANSCODER_REMOTE_PENALTY_SECONDS. The
+  estimate decays, so a region that was slow is tried again later.
+
+Jobs are submitted with `transcoder_jobs.submit_transcoder_job`, which holds
+the region's slot until `wait_for_transcoder_job` sees the job finish. Slots
+and latencies are per process: with render workers (see render_queue) jobs
+are still created, and therefore placed, by the calling process.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .cancellation import cancellable_sleep
+from .progress import report_progress
+
+DEFAULT_REGION_MAX_JOBS = 20
+DEFAULT_REMOTE_PENALTY_SECONDS = 60.0
+# How often a job waiting for a slot looks again.
+SLOT_POLL_SECONDS = 1.0
+# A slot whose job was never waited on is reclaimed after this long.
+SLOT_TTL_SECONDS = 1200.0
+# Weight of the newest queue latency sample, and how fast an old estimate fades.
+LATENCY_SMOOTHING = 0.3
+LATENCY_HALF_LIFE_SECONDS = 600.0
+
+# GCS multi-region and dual-region locations and the regions inside them.
+MULTI_REGION_PREFIXES = {"US": "us-", "EU": "europe-", "ASIA": "asia-"}
+DUAL_REGIONS = {
+    "NAM4": ("us-central1", "us-east1"),
+    "EUR4": ("europe-north1", "europe-west4"),
+    "ASIA1": ("asia-northeast1", "asia-northeast2"),
+}
+
+
+def transcoder_regions() -> List[str]:
+    """The regions jobs may run in: TRANSCODER_REGIONS (comma-separated), else GOOGLE_CLOUD_LOCATION."""
+    configured = os.getenv("TRANSCODER_REGIONS") or os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+    return [region.strip() for region in configured.split(",") if region.strip()]
+
+
+def co_located(region: str, bucket_location: Optional[str]) -> bool:
+    """Whether a bucket in `bucket_location` (e.g. "US-CENTRAL1", "US", "NAM4") is in `region`."""
+    if not bucket_location:
+        return False
+    location = bucket_location.upper()
+    if location in MULTI_REGION_PREFIXES:
+        return region.startswith(MULTI_REGION_PREFIXES[location])
+    if location in DUAL_REGIONS:
+        return region in DUAL_REGIONS[location]
+    return region.upper() == location
+
+
+_bucket_locations_lock = threading.Lock()
+_bucket_locations: Dict[str, Optional[str]] = {}
+
+
+def bucket_location(bucket_name: str) -> Optional[str]:
+    """
+    Returns a bucket's location (cached per process), or None if it cannot be read.
+    """
+    with _bucket_locations_lock:
+        if bucket_name in _bucket_locations:
+            return _bucket_locations[bucket_name]
+    from google.cloud import storage
+
+    try:
+        location = storage.Client().get_bucket(bucket_name).location
+    except Exception as e:
+        # Without the location every region is equally remote; remember that too.
+        print(f"Could not read the location of bucket '{bucket_name}': {e}")
+        location = None
+    with _bucket_locations_lock:
+        _bucket_locations[bucket_name] = location
+    return location
+
+
+class TranscoderScheduler:
+    """
+    Chooses the region of each Transcoder job and holds a slot there until the job finishes.
+    """
+
+    def __init__(self, regions: Optional[List[str]] = None, max_jobs_per_region: Optional[int] = None,
+                 remote_penalty_seconds: Optional[float] = None):
+        self.regions = regions or transcoder_regions()
+        self.max_jobs_per_region = max(1, max_jobs_per_region or int(
+            os.getenv("TRANSCODER_REGION_MAX_JOBS", str(DEFAULT_REGION_MAX_JOBS))))
+        self.remote_penalty_seconds = remote_penalty_seconds if remote_penalty_seconds is not None else float(
+            os.getenv("TRANSCODER_REMOTE_PENALTY_SECONDS", str(DEFAULT_REMOTE_PENALTY_SECONDS)))
+        self._lock = threading.Lock()
+        # Slot key (a placeholder until the job exists, then the job name) -> region and when it was taken.
+        self._slots: Dict[str, Dict] = {}
+        # Region -> (queue latency estimate in seconds, when it was last updated).
+        self._latency: Dict[str, tuple] = {}
+        self.placed: Dict[str, int] = {region: 0 for region in self.regions}
+
+    def _running_locked(self, region: str) -> int:
+        return sum(1 for slot in self._slots.values() if slot["region"] == region)
+
+    def _reclaim_locked(self, now: float) -> None:
+        for key in [key for key, slot in self._slots.items() if now - slot["acquired_at"] > SLOT_TTL_SECONDS]:
+            del self._slots[key]
+
+    def _latency_locked(self, region: str, now: float) -> float:
+        seconds, updated_at = self._latency.get(region, (0.0, now))
+        return seconds * 0.5 ** ((now - updated_at) / LATENCY_HALF_LIFE_SECONDS)
+
+    def _score_locked(self, region: str, location: Optional[str], now: float) -> float:
+        # Expected wait of a job in `region`: its queue latency, plus the penalty if it is remote.
+        return self._latency_locked(region, now) + (
+            0.0 if co_located(region, location) else self.remote_penalty_seconds)
+
+    def try_acquire(self, key: str, location: Optional[str]) -> Optional[str]:
+        """Takes a slot in the best region with room and returns the region, or None if all are full."""
+        now = time.monotonic()
+        with self._lock:
+            self._reclaim_locked(now)
+            candidates = []
+            for order, region in enumerate(self.regions):
+                running = self._running_locked(region)
+                if running >= self.max_jobs_per_region:
+                    continue
+                # Ties go to the less busy region, then to the one listed first.
+                candidates.append((self._score_locked(region, location, now), running, order, region))
+            if not candidates:
+                return None
+            region = min(candidates)[-1]
+            self._slots[key] = {"region": region, "acquired_at": now}
+            self.placed[region] = self.placed.get(region, 0) + 1
+            return region
+
+    async def acquire(self, key: str, location: Optional[str]) -> str:
+        """Takes a slot, waiting while every region is full. Returns the region."""
+        while True:
+            region = self.try_acquire(key, location)
+            if region:
+                return region
+            report_progress(detail=f"waiting for a Transcoder slot ({self.max_jobs_per_region} jobs per region)")
+            await cancellable_sleep(SLOT_POLL_SECONDS)
+
+    def assign(self, key: str, job_name: str) -> None:
+        """Keys a slot by the job it was taken for, once the job exists."""
+        with self._lock:
+            if key in self._slots:
+                self._slots[job_name] = self._slots.pop(key)
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._slots.pop(key, None)
+
+    def record_queue_latency(self, region: str, seconds: float) -> None:
+        """Adds one job's wait before it started to the region's estimate."""
+        now = time.monotonic()
+        with self._lock:
+            current = self._latency_locked(region, now) if region in self._latency else seconds
+            self._latency[region] = (LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * current, now)
+
+    def observe_pending(self, region: str, pending_seconds: float) -> None:
+        """A job of `region` still waits after pending_seconds: its latency is at least that."""
+        now = time.monotonic()
+        with self._lock:
+            if pending_seconds > self._latency_locked(region, now):
+                self._latency[region] = (pending_seconds, now)
+
+    def job_finished(self, job_name: str, job=None) -> None:
+        """Frees the job's slot and records its queue latency from the finished `Job`."""
+        self.release(job_name)
+        started = getattr(job, "start_time", None)
+        created = getattr(job, "create_time", None)
+        if started and created:
+            self.record_queue_latency(job_region(job_name), max((started - created).total_seconds(), 0.0))
+
+    def snapshot(self) -> List[Dict]:
+        """Running jobs, queue latency and placed job count per region."""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "region": region,
+                "running": self._running_locked(region),
+                "max_jobs": self.max_jobs_per_region,
+                "queue_latency_s": round(self._latency_locked(region, now), 1),
+                "placed": self.placed.get(region, 0),
+            } for region in self.regions]
+
+
+def job_region(job_name: str) -> str:
+    """The region of a job name: projects/{project}/locations/{region}/jobs/{id}."""
+    parts = job_name.split("/")
+    return parts[parts.index("locations") + 1] if "locations" in parts else ""
+
+
+_scheduler_lock = threading.Lock()
+_scheduler: Optional[TranscoderScheduler] = None
+
+
+def get_transcoder_scheduler() -> TranscoderScheduler:
+    """Returns the process-wide `TranscoderScheduler` singleton."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = TranscoderScheduler()
+    return _scheduler
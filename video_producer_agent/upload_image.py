@@ -1,9 +1,6 @@
 import os
 import mimetypes # Standard library for MIME type guessing
 
-# GCP SDK for storage
-from google.cloud import storage
-from google.auth.exceptions import DefaultCredentialsError
 import base64
                
 
@@ -125,6 +122,10 @@ def store_image_artifact_in_gcs(
         return error_prefix + error_msg
 
     # --- GCS Configuration and Client Initialization ---
+    # GCP SDK for storage (imported here so the agent can load without it)
+    from google.cloud import storage
+    from google.auth.exceptions import DefaultCredentialsError
+
     gcs_bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET")
     gcp_project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
 
@@ -0,0 +1,244 @@
+"""
+Shared helpers for starting and waiting on Veo video generation operations.
+
+Both `video_generation_tool` and `image_and_text_to_video_tool` submit the same
+kind of long-running operation; this module owns the genai client, the polling
+loop and the extraction of output URIs from a finished operation.
+`generate_videos` runs the whole generation through the generation ledger so
+identical requests are served from (or join) an earlier generation. Inside a
+background job (see progress) every poll is reported as the job's progress, and
+a cancelled session (see cancellation) cancels the operation being waited on.
+Requests and waits are bounded by the run's deadline (see deadline); a wait
+never lasts longer than VEO_OPERATION_BUDGET_SECONDS.
+"""
+import os
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .cancellation import VEO_OPERATION, cancellable_sleep, check_cancelled, in_flight
+from .deadline import stage, within_deadline
+from .progress import report_progress
+from .render_queue import offload
+
+VEO_MODEL_ID = os.getenv("VEO_MODEL_ID", "veo-2.0-generate-001")
+VEO_POLL_INTERVAL_SECONDS = 5
+# Longest a single generation may take (less if the run's deadline ends first).
+VEO_OPERATION_BUDGET_SECONDS = 900
+VEO_API_TIMEOUT_SECONDS = 120
+
+# Veo 2 accepts between 1 and 4 samples per request.
+MAX_VIDEOS_PER_REQUEST = 4
+# Veo 2 renders silent 720p clips.
+VEO_FRAME_SIZES = {"16:9": (1280, 720), "9:16": (720, 1280)}
+
+_client_lock = threading.Lock()
+_client = None
+
+
+def get_genai_client():
+    """Returns a process-wide `genai.Client` (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                from dotenv import load_dotenv
+
+                load_dotenv()
+                _client = genai.Client()
+    return _client
+
+
+async def start_video_generation(
+    prompt: str,
+    duration_seconds: int,
+    output_gcs_uri: str,
+    number_of_videos: int = 1,
+    image_gcs_uri: Optional[str] = None,
+    image_mime_type: Optional[str] = None,
+    aspect_ratio: Optional[str] = None,
+    negative_prompt: Optional[str] = None,
+    seed: Optional[int] = None,
+    model: str = VEO_MODEL_ID,
+):
+    """
+    Submits a Veo generation request and returns the (unfinished) operation.
+
+    Args:
+        prompt: The video generation prompt.
+        duration_seconds: Clip length in seconds (5-8 for Veo 2).
+        output_gcs_uri: GCS prefix the generated samples are written under.
+        number_of_videos: Number of candidate samples to generate (1-4).
+        image_gcs_uri: Optional GCS URI of a starting image.
+        image_mime_type: MIME type of the starting image, required with image_gcs_uri.
+        aspect_ratio: Optional aspect ratio such as "16:9".
+        negative_prompt: Optional description of what to avoid.
+        seed: Optional seed for reproducible samples.
+        model: The Veo model ID.
+
+    Returns:
+        The genai `GenerateVideosOperation`.
+    """
+    from google.genai import types
+
+    check_cancelled()
+    if not 1 <= number_of_videos <= MAX_VIDEOS_PER_REQUEST:
+        raise ValueError(f"number_of_videos must be between 1 and {MAX_VIDEOS_PER_REQUEST}, got {number_of_videos}.")
+
+    config_kwargs = dict(
+        duration_seconds=duration_seconds,
+        number_of_videos=number_of_videos,
+        output_gcs_uri=output_gcs_uri,
+        person_generation="allow_adult",
+        enhance_prompt=True,
+    )
+    if aspect_ratio:
+        config_kwargs["aspect_ratio"] = aspect_ratio
+    if negative_prompt:
+        config_kwargs["negative_prompt"] = negative_prompt
+    if seed is not None:
+        config_kwargs["seed"] = seed
+
+    request_kwargs = dict(
+        model=model,
+        prompt=prompt,
+        config=types.GenerateVideosConfig(**config_kwargs),
+    )
+    if image_gcs_uri:
+        request_kwargs["image"] = types.Image(gcs_uri=image_gcs_uri, mime_type=image_mime_type)
+
+    client = get_genai_client()
+    operation = await within_deadline(client.aio.models.generate_videos(**request_kwargs), VEO_API_TIMEOUT_SECONDS)
+    print(f"Video generation operation started. Name: {operation.name}")
+    return operation
+
+
+async def wait_for_operation(operation, poll_interval_seconds: float = VEO_POLL_INTERVAL_SECONDS):
+    """Polls a Veo operation until it is done and returns the refreshed operation."""
+    client = get_genai_client()
+    with stage("veo operation", VEO_OPERATION_BUDGET_SECONDS):
+        while not operation.done:
+            await cancellable_sleep(poll_interval_seconds)
+            operation = await within_deadline(client.aio.operations.get(operation), VEO_API_TIMEOUT_SECONDS)
+            print(f"Waiting for video generation operation {operation.name} to complete...")
+            report_progress(detail=f"Veo operation {operation.name.rsplit('/', 1)[-1]} generating")
+    return operation
+
+
+def generated_video_uris(operation) -> List[str]:
+    """
+    Returns the GCS URIs of every sample in a finished Veo operation.
+
+    Raises:
+        RuntimeError: If the operation finished with an error or without videos.
+    """
+    if operation.error:
+        raise RuntimeError(f"Video generation operation failed: {operation.error}")
+    response = operation.response or operation.result
+    videos = getattr(response, "generated_videos", None) or []
+    uris = [video.video.uri for video in videos if video.video and video.video.uri]
+    if not uris:
+        raise RuntimeError("Video generation operation finished without any generated videos "
+                           "(the prompt may have been blocked by safety filters).")
+    return uris
+
+
+@offload("veo")
+async def generate_videos(
+    prompt: str,
+    duration_seconds: int,
+    output_folder: str,
+    number_of_videos: int = 1,
+    image_gcs_uri: Optional[str] = None,
+    image_mime_type: Optional[str] = None,
+    aspect_ratio: Optional[str] = None,
+    negative_prompt: Optional[str] = None,
+    seed: Optional[int] = None,
+    model: str = VEO_MODEL_ID,
+    on_operation_started: Optional[Callable[[str], None]] = None,
+    regenerate: bool = False,
+) -> Tuple[List[str], str]:
+    """
+    Generates videos through the generation ledger and returns (video_uris, ledger_status).
+
+    Identical requests reuse a completed generation ("cached") or join one that is still
+    running ("joined"); otherwise a new generation is written under
+    gs://<GOOGLE_CLOUD_BUCKET>/<output_folder>/<uuid> ("generated"). on_operation_started
+    is called with the operation name when a new generation is submitted, so callers can
+    persist it and reattach with `reattach_video_operation` after a restart. regenerate
+    skips the ledger's stored videos (e.g. the user rejected them) and replaces them.
+    """
+    from .generation_ledger import coalesce_async
+
+    params = dict(
+        model=model,
+        prompt=prompt,
+        negative_prompt=negative_prompt or None,
+        duration_seconds=duration_seconds,
+        number_of_videos=number_of_videos,
+        image_gcs_uri=image_gcs_uri or None,
+        image_mime_type=image_mime_type or None,
+        aspect_ratio=aspect_ratio,
+        seed=seed,
+        person_generation="allow_adult",
+        enhance_prompt=True,
+    )
+
+    async def produce() -> List[str]:
+        gcs_bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET", "byron-alpha-vpagent")
+        output_gcs_uri = f"gs://{gcs_bucket_name}/{output_folder}/{uuid.uuid4().hex}"
+        operation = await start_video_generation(
+            prompt=prompt,
+            duration_seconds=duration_seconds,
+            output_gcs_uri=output_gcs_uri,
+            number_of_videos=number_of_videos,
+            image_gcs_uri=image_gcs_uri or None,
+            image_mime_type=image_mime_type or None,
+            aspect_ratio=aspect_ratio,
+            negative_prompt=negative_prompt or None,
+            seed=seed,
+            model=model,
+        )
+        if on_operation_started:
+            on_operation_started(operation.name)
+        with in_flight(VEO_OPERATION, operation.name, output_gcs_uri):
+            operation = await wait_for_operation(operation)
+        return generated_video_uris(operation)
+
+    return await coalesce_async("veo", params, produce, refresh=regenerate)
+
+
+async def reattach_video_operation(operation_name: str) -> List[str]:
+    """Waits for a Veo operation started by an earlier process and returns its video URIs."""
+    from google.genai import types
+
+    operation = await get_genai_client().aio.operations.get(types.GenerateVideosOperation(name=operation_name))
+    with in_flight(VEO_OPERATION, operation_name):
+        operation = await wait_for_operation(operation)
+    return generated_video_uris(operation)
+
+
+def video_result(video_uris: List[str], duration_seconds: int, aspect_ratio: Optional[str] = None,
+                 selection: Optional[Dict] = None):
+    """
+    Returns the compact `MediaResult` of a generation.
+
+    With a candidate `selection` (see candidate_selection) the best candidate is the result,
+    with its probed duration and size, and the other candidates are listed as alternates.
+    """
+    from .tool_results import MediaResult
+
+    width, height = VEO_FRAME_SIZES.get(aspect_ratio or "16:9", (None, None))
+    if selection is None:
+        return MediaResult(video_uris[0], duration_seconds, width, height, has_audio=False,
+                           alternates=video_uris[1:])
+    best = selection["best"]
+    return MediaResult(
+        best["uri"],
+        best.get("duration_seconds", duration_seconds),
+        best.get("width", width),
+        best.get("height", height),
+        has_audio=False,
+        alternates=[candidate["uri"] for candidate in selection["alternates"]],
+    )
@@ -1,65 +1,57 @@
-import asyncio
-import pprint
-
-from google import genai
-from google.genai import types
-
-from dotenv import load_dotenv
-
-import os
-
-
-import uuid
+from .candidate_selection import select_best_candidate
+from .progress import report_artifact
+from .tool_results import ToolError
+from .veo_client import generate_videos, video_result
 
 async def video_generation_tool(
     prompt: str,
-    duration_seconds: int 
+    duration_seconds: int,
+    number_of_videos: int = 1,
+    narration_duration: float = 0.0,
+    regenerate: bool = False,
     ):
     """Tool to generate an 8 second video clip from an description using Veo2.
-    
+
+    Set number_of_videos to 2-4 to get several candidates from a single generation. Every
+    candidate is probed (duration fit against narration_duration, black and frozen frames)
+    and the best one is returned together with the others as alternates. If the best clip
+    is rejected, use an alternate instead of regenerating. An identical call returns the
+    same clip again; set regenerate to true to get a new clip for the same prompt.
+
     Args:
         prompt (str): The prompt to be sent to the video generation tool
         duration_seconds (int): Desired duration of the generated video in seconds valid values are (5,6,7,8).
+        number_of_videos (int): Number of candidates to generate (1-4). Defaults to 1.
+        narration_duration (float): Length in seconds of the scene narration the clip must cover,
+                                    used to rank candidates. 0 skips the duration fit check.
+        regenerate (bool): Generate a new clip even if this exact request was generated before,
+                           e.g. after the user rejected it. Defaults to false.
     Returns:
-        types.GenerateVideosResponse: The response from the video generation tool. or string error
+        dict: uri, duration_s, width, height and has_audio of the (best) clip, plus alternates
+        (the other candidates' URIs, best first) when number_of_videos is more than 1.
+        Or an error dict with error_code, retryable and message.
     """
     try:
+        # Identical requests are served from the generation ledger or join the running generation
+        video_uris, ledger_status = await generate_videos(
+            prompt=prompt,
+            duration_seconds=duration_seconds,
+            output_folder="veo2",
+            number_of_videos=number_of_videos,
+            regenerate=regenerate,
+        )
+        print(f"Video generation {ledger_status}: {video_uris}")
+        for uri in video_uris:
+            report_artifact(uri, "clip")
 
-        load_dotenv()   
-
-        gcs_bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET", "byron-alpha-vpagent")
-
-        output_gcs_uri=f"gs://{gcs_bucket_name}/veo2/"+ uuid.uuid4().hex
-
+        if number_of_videos == 1:
+            return video_result(video_uris, duration_seconds).to_dict()
 
-        # Initialize the client for the Generative AI API
-        client = genai.Client()
+        selection = await select_best_candidate(video_uris, narration_duration)
+        return video_result(video_uris, duration_seconds, selection=selection).to_dict()
 
-        # Create the GenerateVideosConfig object
-        generate_video_config = types.GenerateVideosConfig(
-            duration_seconds=duration_seconds,
-            number_of_videos=1,
-            output_gcs_uri=output_gcs_uri,
-            person_generation="allow_adult",
-            enhance_prompt=True,
-        )
 
-        # Create an operation to generate a video
-        operation =  client.models.generate_videos(
-            model="veo-2.0-generate-001",
-            prompt=prompt,
-            config=generate_video_config,
-        )
-        # Wait for video generation to complete
-        while not operation.done:
-            await asyncio.sleep(5) # Polling interval (e.g., 15 seconds)
-            #operation = client.operations.get(operation)
-        pprint.pprint(operation)
-        
-        return operation.response
-        
-        
     except Exception as e:
         # Catch any other general exceptions that might occur during the process
-        return f"Error generating video: {str(e)}"
-        #raise e
\ No newline at end of file
+        return ToolError.from_exception(e).to_dict()
+        #raise e
@@ -1,9 +1,6 @@
 import os
-from google.cloud import storage
-from google.cloud.exceptions import NotFound
 import tempfile
 import logging
-from mutagen.mp4 import MP4, MP4StreamInfoError # For MP4 parsing
 from urllib.parse import urlparse
 
 def get_duration_with_mutagen(file_path: str) -> float:
@@ -16,6 +13,8 @@ def get_duration_with_mutagen(file_path: str) -> float:
     Returns:
         float: Duration in seconds, or None if an error occurs.
     """
+    from mutagen.mp4 import MP4, MP4StreamInfoError # For MP4 parsing
+
     try:
         video = MP4(file_path)
         if video.info:
@@ -66,6 +65,9 @@ def get_video_length_gcs_partial_download(gcs_uri: str ) -> str :
     Returns:
         str: The duration of the video in (float)seconds, or an error message if an error occurs.
     """
+    from google.cloud import storage
+    from google.cloud.exceptions import NotFound
+
     read_bytes = 1 * 1024 * 1024  # 1MB
 
     parsed_uri = parse_gcs_uri(gcs_uri)
@@ -0,0 +1,332 @@
+"""
+Multi-agent production: planner -> parallel scene producers -> assembler.
+
+A single agent producing a commercial one scene at a time carried every scene's
+tool calls and results in one ever-growing context. The production is now split
+across ADK workflow agents:
+
+    root_agent (planner, agent.py)
+        plans with the user, stores the confirmed plan with save_scene_plan
+        and transfers to "production"
+    production (SequentialAgent)
+        scene_fan_out   builds a ParallelAgent with one scene producer per
+                        planned scene; each only has the narration, Veo, probe,
+                        fit and mux tools and sees only its own scene
+        assembler       joins the muxed scenes, adds the Lyria score and
+                        returns the public URLs
+    operator (LlmAgent)
+        runs the mechanical steps the planner asks for outside a production
+        (mux, join, probe, fit, public URLs, pipeline status) and transfers back
+
+Scene producers run concurrently and their contexts hold a single scene, so
+each turn stays small. Everything below the planner only executes tools and
+retries, so it runs on the executor model (see model_config). A production
+run has one deadline (COMMERCIAL_SLO_SECONDS, see deadline) from the moment
+the scenes start; every scene and assembler tool call runs under it and is
+refused once it has passed.
+"""
+import time
+import uuid
+from typing import AsyncGenerator, Dict, List
+
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent, SequentialAgent
+from google.adk.events import Event, EventActions
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from .audio_fit import fit_narration_to_duration
+from .cancellation import bind_cancellation
+from .commercial import normalize_scene
+from .deadline import Deadline, DeadlineExceeded, bind_deadline, production_slo_seconds
+from .image_video_generation_tool import image_and_text_to_video_tool
+from .lyria_music import generate_lyria_music
+from .model_config import EXECUTOR_MODEL
+from .mux_audio import get_mp3_audio_duration_gcs, mux_audio, mux_audio_batch
+from .mux_music import mux_music
+from .narration_engine import synthesize_narration
+from .progress import get_progress, long_running_tool
+from .render_queue import PRIORITY_FINAL, bind_render_priority
+from .scene_pipeline import get_pipeline_status, resume_scene_pipeline
+from .speculative_scene import get_speculation_metrics
+from .tool_results import ToolError, compact_tool
+from .tools import gcs_uri_to_public_url
+from .video_generation_tool import video_generation_tool
+from .video_join_tool import video_join_tool
+from .video_length_tool import get_video_length_gcs_partial_download
+
+SCENE_PLAN_STATE_KEY = "scene_plan"
+# Per plan version, so a scene that fails in a re-run never shows an earlier run's result.
+SCENE_RESULT_STATE_KEY = "scene_result_{version}_{number}"
+
+SCENE_TOOLS = [
+    synthesize_narration,
+    video_generation_tool,
+    image_and_text_to_video_tool,
+    get_video_length_gcs_partial_download,
+    fit_narration_to_duration,
+    mux_audio,
+]
+ASSEMBLY_TOOLS = [
+    video_join_tool,
+    generate_lyria_music,
+    get_mp3_audio_duration_gcs,
+    mux_music,
+    gcs_uri_to_public_url,
+]
+# Operator tools that take minutes; they run as background jobs followed with get_progress.
+OPERATOR_LONG_RUNNING_TOOLS = [
+    video_join_tool,
+    mux_audio,
+    mux_audio_batch,
+    mux_music,
+]
+OPERATOR_TOOLS = [
+    gcs_uri_to_public_url,
+    get_mp3_audio_duration_gcs,
+    get_video_length_gcs_partial_download,
+    fit_narration_to_duration,
+    resume_scene_pipeline,
+    get_pipeline_status,
+    get_speculation_metrics,
+    get_progress,
+]
+
+
+def save_scene_plan(
+    scenes: List[dict],
+    tool_context: ToolContext,
+    music_prompt: str = "",
+    music_negative_prompt: str = "",
+    music_volume: float = 0.3,
+) -> dict:
+    """
+    Stores the confirmed commercial plan for the production agent.
+
+    Call this once the user has confirmed the plan, then transfer to the production agent.
+
+    Args:
+        scenes: One object per scene, in order, with the keys video_prompt, narration,
+                voice_category, speaking_rate (optional, 0 for automatic) and image_gcs_uri
+                (optional, an uploaded image to animate).
+        music_prompt: Optional Lyria prompt for the background score. Empty for no music.
+        music_negative_prompt: Optional description of what to exclude from the music.
+        music_volume: Volume of the music track (0.0 to 1.0). Defaults to 0.3.
+
+    Returns:
+        dict: scenes (the number of scenes saved) and speaking_rates. Or an error message string.
+    """
+    if not scenes:
+        return "Error: scenes must be a non-empty list."
+    try:
+        plan = [normalize_scene(i, scene) for i, scene in enumerate(scenes)]
+    except (ValueError, TypeError) as e:
+        return f"Error: {e}"
+    tool_context.state[SCENE_PLAN_STATE_KEY] = {
+        "version": uuid.uuid4().hex[:8],
+        "scenes": plan,
+        "music_prompt": music_prompt,
+        "music_negative_prompt": music_negative_prompt,
+        "music_volume": music_volume,
+    }
+    return {"scenes": len(plan), "speaking_rates": [scene["speaking_rate"] for scene in plan]}
+
+
+def _plain(text: str) -> str:
+    """ADK treats {name} in instructions as a state placeholder; plan text must not contain braces."""
+    return str(text).replace("{", "(").replace("}", ")")
+
+
+def _own_turns_only(callback_context, llm_request):
+    """
+    before_model_callback for the production agents: drops the planning conversation.
+
+    Everything another agent or the user said reaches this agent as "user" content, so its
+    own work starts at its first "model" content. The instruction already holds its task.
+    """
+    contents = llm_request.contents
+    first_own = next((i for i, content in enumerate(contents) if content.role == "model"), len(contents))
+    llm_request.contents = [
+        types.Content(role="user", parts=[types.Part.from_text(text="Start the task in your instructions.")])
+    ] + contents[first_own:]
+    return None
+
+
+def _bind_production_run(tool, args, tool_context):
+    """
+    before_tool_callback of the scene producers and the assembler: runs the tool under the
+    session's cancellation token and the production run's deadline (queuing its render
+    work as a final render), and refuses it once the deadline has passed.
+    """
+    bind_cancellation(tool, args, tool_context)
+    bind_render_priority(PRIORITY_FINAL)
+    plan = tool_context.state.get(SCENE_PLAN_STATE_KEY) or {}
+    if not plan.get("started_at"):
+        return None
+    deadline = bind_deadline(Deadline.resume(
+        f"production/{tool_context.agent_name}", plan["deadline_s"], plan["started_at"]
+    ))
+    try:
+        deadline.check()
+    except DeadlineExceeded as e:
+        return ToolError.from_exception(e).to_dict()
+    return None
+
+
+def scene_instruction(index: int, scene: Dict) -> str:
+    if scene.get("image_gcs_uri"):
+        source = (f"generate the clip from the image {scene['image_gcs_uri']} ({scene['image_mime_type']}) "
+                  f"with image_and_text_to_video_tool")
+    else:
+        source = "generate the clip with video_generation_tool"
+    return f"""
+  You produce scene {index + 1} of a TV commercial. Work only on this scene.
+
+  Video prompt: {_plain(scene['video_prompt'])}
+  Narration: {_plain(scene['narration_text'])}
+  Voice category: {scene['voice_category']}, speaking rate: {scene['speaking_rate']}
+
+  1. synthesize the narration with synthesize_narration using exactly this text, voice and speaking rate.
+  2. {source} using the video prompt above. duration_seconds is the narration duration_s plus 0.5,
+     rounded up, and between 5 and 8.
+  3. if the narration is more than 1 second longer than the clip, call fit_narration_to_duration
+     with the clip duration and use the fitted narration. if it reports fits false, stop and report it.
+  4. call mux_audio with the clip, the narration and end_time_offset equal to the shorter of the
+     narration and clip durations.
+  if a tool returns retryable true, call it again, at most 3 attempts. if a clip is SAFETY_BLOCKED,
+  make the video prompt safer once and try again. never use first or last names in the video prompt.
+  if a tool returns DEADLINE_EXCEEDED, stop at once and reply with its message.
+  when done, reply with only the muxed gs:// uri and the end_time_offset, separated by a space.
+  """
+
+
+def build_scene_agent(index: int, scene: Dict, version: str = "default") -> LlmAgent:
+    return LlmAgent(
+        name=f"scene_{index + 1}",
+        model=EXECUTOR_MODEL,
+        description=f"Produces scene {index + 1} of the commercial.",
+        instruction=scene_instruction(index, scene),
+        tools=[compact_tool(tool) for tool in SCENE_TOOLS],
+        output_key=SCENE_RESULT_STATE_KEY.format(version=version, number=index + 1),
+        before_model_callback=_own_turns_only,
+        before_tool_callback=_bind_production_run,
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+
+
+class SceneFanOut(BaseAgent):
+    """Runs one scene producer per planned scene concurrently."""
+
+    async def _run_async_impl(self, ctx) -> AsyncGenerator[Event, None]:
+        plan = ctx.session.state.get(SCENE_PLAN_STATE_KEY)
+        if not plan or not plan.get("scenes"):
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part.from_text(
+                    text="No scene plan was saved. Save the confirmed plan with save_scene_plan first."
+                )]),
+            )
+            return
+        # The scene list is only known at run time, so the ParallelAgent is built per run. Its
+        # name sets the scene agents' branch, so naming it after the plan version keeps the
+        # events of an earlier production out of their contexts.
+        version = plan.get("version", "default")
+        # The run's deadline starts now; the scene producers and the assembler read it from the plan.
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={SCENE_PLAN_STATE_KEY: {
+                **plan, "started_at": time.time(), "deadline_s": production_slo_seconds(),
+            }}),
+        )
+        scenes = ParallelAgent(
+            name=f"scenes_{version}",
+            sub_agents=[build_scene_agent(i, scene, version) for i, scene in enumerate(plan["scenes"])],
+        )
+        async for event in scenes.run_async(ctx):
+            yield event
+
+
+def assembler_instruction(context) -> str:
+    plan = context.state.get(SCENE_PLAN_STATE_KEY) or {"scenes": []}
+    lines = []
+    for i in range(len(plan["scenes"])):
+        result = context.state.get(
+            SCENE_RESULT_STATE_KEY.format(version=plan.get("version", "default"), number=i + 1)
+        )
+        lines.append(f"  scene {i + 1}: {_plain(result).strip() if result else 'not produced'}")
+    scenes = "\n".join(lines)
+    if plan.get("music_prompt"):
+        music = f"""then call generate_lyria_music with the prompt "{_plain(plan['music_prompt'])}" and the
+  negative prompt "{_plain(plan.get('music_negative_prompt', ''))}", measure it with get_mp3_audio_duration_gcs
+  and mux it into the joined video with mux_music at volume {plan.get('music_volume', 0.3)}. if the video is
+  longer than the music, join and mux consecutive scenes up to the music length separately, then join the results."""
+    else:
+        music = "there is no music for this commercial."
+    return f"""
+  You assemble the finished scenes of a TV commercial. Each line is the muxed scene uri and its duration:
+{scenes}
+
+  join the produced scenes in order with video_join_tool.
+  {music}
+  convert each scene and the final video to public URLs with gcs_uri_to_public_url and reply with them.
+  list any scene that was not produced so the user can retry it. if a tool returns DEADLINE_EXCEEDED,
+  stop and report it with the stage it names.
+  """
+
+
+def build_production_agent() -> SequentialAgent:
+    assembler = LlmAgent(
+        name="assembler",
+        model=EXECUTOR_MODEL,
+        description="Joins the produced scenes, adds the music and returns the public URLs.",
+        instruction=assembler_instruction,
+        tools=[compact_tool(tool) for tool in ASSEMBLY_TOOLS],
+        before_model_callback=_own_turns_only,
+        before_tool_callback=_bind_production_run,
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+    return SequentialAgent(
+        name="production",
+        description="Produces every scene of the saved plan in parallel, then joins them and adds the music. "
+                    "Transfer here after save_scene_plan.",
+        sub_agents=[SceneFanOut(name="scene_fan_out"), assembler],
+    )
+
+
+OPERATOR_INSTRUCTION = """
+  You are the operator of a TV commercial production. The producer plans the commercial and hands
+  you mechanical steps: muxing narration into clips, joining clips, muxing music, measuring audio and
+  video durations, fitting narration to a clip, converting gs:// uris to public URLs and checking or
+  resuming scene pipelines.
+
+  do exactly the steps you were asked for, with exactly the uris, durations and options given. never
+  change a prompt, a narration text or the order of the scenes. if a tool returns retryable true, call
+  it again, at most 3 attempts. if a step fails otherwise, stop.
+  mux_audio, mux_audio_batch, video_join_tool and mux_music run in the background and return a job_id:
+  call get_progress with it until the state is SUCCEEDED or FAILED and use the result. start independent
+  muxes before following any of them.
+  to mux the narration of several scenes, make one mux_audio_batch call with every scene (parallel lists
+  of video uris, audio uris and end time offsets, in scene order) instead of one mux_audio call per scene. if the scenes are only muxed to be joined, pass join true: one job muxes and
+  joins them, so no video_join_tool call is needed. retry only the scenes whose result is an error.
+  when done, reply with one line per result (the uri or URL and its duration where known) and any
+  error, then transfer back to video_producer_agent.
+  """
+
+
+def build_operator_agent() -> LlmAgent:
+    return LlmAgent(
+        name="operator",
+        model=EXECUTOR_MODEL,
+        description="Runs mechanical production steps: mux, join, duration checks, narration fitting, "
+                    "public URLs and pipeline status. Transfer here with the exact uris and steps.",
+        instruction=OPERATOR_INSTRUCTION,
+        before_tool_callback=bind_cancellation,
+        tools=[compact_tool(tool) for tool in OPERATOR_TOOLS]
+              + [long_running_tool(tool) for tool in OPERATOR_LONG_RUNNING_TOOLS],
+        disallow_transfer_to_peers=True,
+    )
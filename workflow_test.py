@@ -0,0 +1,91 @@
+"""
+This script tests the planner -> parallel scene producers -> assembler topology.
+
+It first builds the production agents for a three-scene plan offline and
+prints each scene agent's tools and instruction size next to the size of the
+single-agent instruction in agent.py. It then runs the production agent with an
+in-memory runner on a session that already holds the saved plan, printing each
+event's author so the scenes can be seen progressing concurrently.
+Requires GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_BUCKET and Gemini access for the second part.
+"""
+import asyncio
+from dotenv import load_dotenv
+
+from google.genai import types
+
+from video_producer_agent.commercial import normalize_scene
+from video_producer_agent.workflow import (
+    SCENE_PLAN_STATE_KEY,
+    build_production_agent,
+    build_scene_agent,
+)
+
+load_dotenv()
+
+SCENES = [
+    {
+        "video_prompt": "A close-up of a girl holding adorable golden retriever puppy in the park, sunlight.",
+        "narration": "Some friendships... start with a single look.",
+        "voice_category": "chirp_female_leda",
+    },
+    {
+        "video_prompt": "A golden retriever puppy running across a sunny meadow, slow motion, cinematic.",
+        "narration": "Every day, a new adventure... and a reason to smile.",
+        "voice_category": "chirp_female_leda",
+    },
+    {
+        "video_prompt": "A puppy asleep on a cozy blanket by a window at sunset, warm tones.",
+        "narration": "Find your new best friend today.",
+        "voice_category": "chirp_female_leda",
+    },
+]
+
+
+def _plan() -> dict:
+    return {
+        "version": "test",
+        "scenes": [normalize_scene(i, scene) for i, scene in enumerate(SCENES)],
+        "music_prompt": "A warm, uplifting acoustic guitar piece with light percussion.",
+        "music_negative_prompt": "",
+        "music_volume": 0.3,
+    }
+
+
+def run_topology_example():
+    """
+    Builds the scene agents for the plan and compares their instruction size with the single agent's.
+    """
+    print("\n--- Topology Example (offline) ---")
+    with open("video_producer_agent/agent.py") as f:
+        source = f.read()
+    single_agent_chars = len(source.split('prompt="""', 1)[1].split('"""', 1)[0])
+    for i, scene in enumerate(_plan()["scenes"]):
+        agent = build_scene_agent(i, scene, "test")
+        tool_names = [tool.__name__ for tool in agent.tools]
+        print(f"{agent.name}: {len(agent.instruction)} instruction chars (single agent: {single_agent_chars}), tools {tool_names}")
+    production = build_production_agent()
+    print(f"{production.name}: {[agent.name for agent in production.sub_agents]}")
+
+
+async def run_production_example():
+    """
+    Runs the production agent on a session holding the saved plan.
+    """
+    from google.adk.runners import InMemoryRunner
+
+    print("\n--- Production Example ---")
+    runner = InMemoryRunner(agent=build_production_agent(), app_name="workflow_test")
+    session = runner.session_service.create_session(
+        app_name="workflow_test", user_id="tester", state={SCENE_PLAN_STATE_KEY: _plan()}
+    )
+    message = types.Content(role="user", parts=[types.Part.from_text(text="Produce the saved plan.")])
+    async for event in runner.run_async(user_id="tester", session_id=session.id, new_message=message):
+        calls = [call.name for call in event.get_function_calls()]
+        text = "".join(part.text or "" for part in event.content.parts) if event.content and event.content.parts else ""
+        print(f"[{event.author}] {calls or text[:200]}")
+
+
+# --- Script Execution ---
+if __name__ == "__main__":
+    run_topology_example()
+    asyncio.run(run_production_example())